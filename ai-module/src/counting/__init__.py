@@ -0,0 +1,7 @@
+"""
+Shared counting package for the SmartEye counters.
+"""
+
+from .lines import (CountingLine, CrossingEvent, LineCrossing, axis_line, direction_mode_lines,
+                    extend_to_frame, moved_along)
+from .zones import Zone, ZoneEvent, ZoneMask, ZoneOccupancy, load_zones, zone_from_config
@@ -0,0 +1,231 @@
+"""
+lines.py
+Vectorized line-crossing engine for the counters.
+
+LineCrossing holds any number of counting lines (arbitrary segments, diagonal
+ones included), each with its own direction rule. update() takes the position
+of every track on this frame, forms each track's displacement since its
+previous position and tests all displacements against all lines in one NumPy
+segment-intersection pass, returning typed CrossingEvents. One detection and
+tracking pass feeds every line configured on a camera.
+
+    crossing = LineCrossing([CountingLine('door', (0, 400), (1280, 400), direction='down'),
+                             CountingLine('aisle', (900, 0), (1200, 720), count='in')])
+    for event in crossing.update(track_ids, centroids, frame_idx):
+        print(event.line, event.track_id, event.direction)
+    crossing.counts['door']   # {'in': ..., 'out': ...}
+
+A point exactly on a line counts as having crossed it (prev < line <= curr,
+as in the per-script checks this replaces). Tracks missing from an update()
+are forgotten, so pass every live track each frame.
+"""
+
+from collections import namedtuple
+
+import numpy as np
+
+DIRECTIONS = {'up': (0.0, -1.0), 'down': (0.0, 1.0), 'left': (-1.0, 0.0), 'right': (1.0, 0.0)}
+COUNT_RULES = ('any', 'in', 'out')
+REPEAT_RULES = ('once', 'alternate', 'every')
+
+# name: key in LineCrossing.counts and in the events
+# p1, p2: segment end points (x, y) in frame coordinates
+# direction: 'up' / 'down' / 'left' / 'right': crossings moving that way are 'in',
+#            the others 'out'; None: crossing onto the right-hand side of p1 -> p2
+#            (image coordinates, y down) is 'in'
+# count: which crossings are reported, 'any', 'in' or 'out'
+# repeat: 'once' (a track counts once per line), 'alternate' (never twice in a
+#         row in the same direction) or 'every'
+CountingLine = namedtuple('CountingLine', 'name p1 p2 direction count repeat', defaults=(None, 'any', 'once'))
+
+# direction: 'in' or 'out' (see CountingLine); x, y: where the track crossed the line
+CrossingEvent = namedtuple('CrossingEvent', 'line track_id frame direction x y')
+
+
+def axis_line(name, orientation, position, length, **rule):
+    """
+    Full-frame counting line: 'horizontal' at y=position across length pixels
+    (the frame width) or 'vertical' at x=position down length pixels (the height).
+    rule: direction / count / repeat of CountingLine.
+    """
+    if orientation == 'horizontal':
+        return CountingLine(name, (0, position), (length, position), **rule)
+    if orientation == 'vertical':
+        return CountingLine(name, (position, 0), (position, length), **rule)
+    raise ValueError(f"Unknown line orientation '{orientation}', expected 'horizontal' or 'vertical'")
+
+
+def direction_mode_lines(direction_mode, line_pos, width, height, repeat='every'):
+    """
+    Lines for the people counters' direction modes: LEFT_RIGHT / RIGHT_LEFT
+    (vertical line at x=line_pos), UP_DOWN / DOWN_UP (horizontal line at
+    y=line_pos), the first direction being 'in'; BOTH: both lines, every crossing.
+    """
+    modes = {'LEFT_RIGHT': ('vertical', 'right'), 'RIGHT_LEFT': ('vertical', 'left'),
+             'UP_DOWN': ('horizontal', 'down'), 'DOWN_UP': ('horizontal', 'up')}
+    if direction_mode in modes:
+        orientation, direction = modes[direction_mode]
+        length = height if orientation == 'vertical' else width
+        return [axis_line(direction_mode, orientation, line_pos, length, direction=direction, repeat=repeat)]
+    return [axis_line('BOTH_X', 'vertical', line_pos, height, repeat=repeat),
+            axis_line('BOTH_Y', 'horizontal', line_pos, width, repeat=repeat)]
+
+
+def extend_to_frame(p1, p2, width, height):
+    """
+    End points of the line through p1, p2 stretched across the whole
+    width x height frame (never shorter than p1 -> p2)
+    """
+    p1 = np.asarray(p1, dtype=np.float64)
+    v = np.asarray(p2, dtype=np.float64) - p1
+    corners = np.array([(0, 0), (width, 0), (0, height), (width, height)], dtype=np.float64)
+    t = (corners - p1) @ v / (v @ v)
+    return tuple((p1 + min(t.min(), 0.0) * v).tolist()), tuple((p1 + max(t.max(), 1.0) * v).tolist())
+
+
+def moved_along(points, direction, min_move, lookback=2):
+    """
+    Whether a trajectory (sequence of (x, y), oldest first) moved more than
+    min_move pixels in a compass direction over its last lookback steps
+    """
+    if len(points) < 2:
+        return False
+    start = points[-1 - lookback] if len(points) > lookback else points[0]
+    dx, dy = DIRECTIONS[direction]
+    return (points[-1][0] - start[0]) * dx + (points[-1][1] - start[1]) * dy > min_move
+
+
+class LineCrossing:
+    """
+    Line-crossing counter over any number of CountingLines.
+    Per-track state (previous position, last counted direction on each line)
+    lives in arrays aligned with the ascending track ids of the last update().
+    """
+
+    def __init__(self, lines=()):
+        self.lines = []
+        self.counts = {}
+        self.frame_idx = -1
+
+        self._start = np.empty((0, 2))
+        self._vector = np.empty((0, 2))
+        self._direction = np.empty((0, 2))  # compass vector; (0, 0) for side-based lines
+        self._count = np.empty(0, dtype=np.int8)   # index into COUNT_RULES
+        self._repeat = np.empty(0, dtype=np.int8)  # index into REPEAT_RULES
+
+        self.ids = np.empty(0, dtype=np.int64)
+        self.points = np.empty((0, 2))
+        self.last = np.empty((0, 0), dtype=np.int8)  # (tracks, lines): +1 in, -1 out, 0 not counted
+        for line in lines:
+            self.add_line(line)
+
+    def __len__(self):
+        return len(self.lines)
+
+    def add_line(self, line):
+        """Add a CountingLine (or its fields as a tuple); returns it"""
+        line = CountingLine(*line)
+        if line.name in self.counts:
+            raise ValueError(f"Duplicate counting line '{line.name}'")
+        if line.direction is not None and line.direction not in DIRECTIONS:
+            raise ValueError(f"Unknown direction '{line.direction}', expected one of {tuple(DIRECTIONS)} or None")
+        if line.count not in COUNT_RULES:
+            raise ValueError(f"Unknown count rule '{line.count}', expected one of {COUNT_RULES}")
+        if line.repeat not in REPEAT_RULES:
+            raise ValueError(f"Unknown repeat rule '{line.repeat}', expected one of {REPEAT_RULES}")
+        p1 = np.asarray(line.p1, dtype=np.float64).reshape(2)
+        p2 = np.asarray(line.p2, dtype=np.float64).reshape(2)
+        if np.array_equal(p1, p2):
+            raise ValueError(f"Counting line '{line.name}' has zero length")
+
+        self.lines.append(line)
+        self.counts[line.name] = {'in': 0, 'out': 0}
+        self._start = np.vstack([self._start, p1])
+        self._vector = np.vstack([self._vector, p2 - p1])
+        self._direction = np.vstack([self._direction, DIRECTIONS.get(line.direction, (0.0, 0.0))])
+        self._count = np.append(self._count, np.int8(COUNT_RULES.index(line.count)))
+        self._repeat = np.append(self._repeat, np.int8(REPEAT_RULES.index(line.repeat)))
+        self.last = np.hstack([self.last, np.zeros((len(self.ids), 1), dtype=np.int8)])
+        return line
+
+    def total(self, name=None):
+        """Reported crossings on one line (all lines by default)"""
+        counts = [self.counts[name]] if name is not None else self.counts.values()
+        return sum(c['in'] + c['out'] for c in counts)
+
+    def _crossings(self, prev, curr):
+        """
+        (tracks, lines) crossing matrices for the displacements prev -> curr:
+        hit, sense (+1 in, -1 out) and the fraction of the displacement at the crossing
+        """
+        a, v = self._start[None, :, :], self._vector[None, :, :]
+        p, d = prev[:, None, :], (curr - prev)[:, None, :]
+        # Side of each line (cross product with the line vector), before and after
+        side_prev = v[..., 0] * (p[..., 1] - a[..., 1]) - v[..., 1] * (p[..., 0] - a[..., 0])
+        side_curr = side_prev + v[..., 0] * d[..., 1] - v[..., 1] * d[..., 0]
+        to_pos = (side_prev < 0) & (side_curr >= 0)
+        to_neg = (side_prev > 0) & (side_curr <= 0)
+
+        # Where along the line the displacement crosses it: u in [0, 1] is on the segment
+        denom = side_curr - side_prev
+        along = (p[..., 0] - a[..., 0]) * d[..., 1] - (p[..., 1] - a[..., 1]) * d[..., 0]
+        along = np.where(denom < 0, -along, along)
+        hit = (to_pos | to_neg) & (along >= 0) & (along <= np.abs(denom))
+
+        # Compass lines: the displacement's component along the direction;
+        # side-based lines: onto the positive (right-hand) side is 'in'
+        component = (d * self._direction[None, :, :]).sum(axis=2)
+        compass = self._direction.any(axis=1)[None, :]
+        sense = np.where(compass, np.where(component > 0, 1, -1), np.where(to_pos, 1, -1)).astype(np.int8)
+        fraction = np.divide(-side_prev, denom, out=np.zeros_like(denom), where=denom != 0)
+        return hit, sense, fraction
+
+    def update(self, track_ids, points, frame_idx=None, eligible=None):
+        """
+        track_ids: (N,) ids of the live tracks
+        points: (N, 2) their positions on this frame (usually box centroids)
+        frame_idx: frame number (defaults to the previous one + 1)
+        eligible: optional (N,) bool; other tracks move but are not counted
+        Returns the CrossingEvents of this frame, ordered by track id then line.
+        """
+        self.frame_idx = self.frame_idx + 1 if frame_idx is None else int(frame_idx)
+        track_ids = np.asarray(track_ids, dtype=np.int64).reshape(-1)
+        order = np.argsort(track_ids, kind='stable')
+        track_ids = track_ids[order]
+        curr = np.asarray(points, dtype=np.float64).reshape(-1, 2)[order]
+        n = len(track_ids)
+
+        # Previous state of the tracks seen on the last update()
+        pos = np.searchsorted(self.ids, track_ids)
+        pos = np.minimum(pos, max(len(self.ids) - 1, 0))
+        known = (self.ids[pos] == track_ids) if len(self.ids) else np.zeros(n, dtype=bool)
+        prev = curr.copy()
+        prev[known] = self.points[pos[known]]
+        last = np.zeros((n, len(self.lines)), dtype=np.int8)
+        last[known] = self.last[pos[known]]
+
+        candidates = known & (prev != curr).any(axis=1)
+        if eligible is not None:
+            candidates &= np.asarray(eligible, dtype=bool).reshape(-1)[order]
+        rows = np.flatnonzero(candidates)
+
+        events = []
+        if len(rows) and len(self.lines):
+            hit, sense, fraction = self._crossings(prev[rows], curr[rows])
+            count, repeat = self._count[None, :], self._repeat[None, :]
+            reported = (count == 0) | ((count == 1) & (sense > 0)) | ((count == 2) & (sense < 0))
+            seen = last[rows]
+            allowed = (((repeat == 0) & (seen == 0)) | ((repeat == 1) & (seen != sense)) | (repeat == 2))
+            r, l = np.nonzero(hit & reported & allowed)
+            if len(r):
+                last[rows[r], l] = sense[r, l]
+                at = prev[rows[r]] + fraction[r, l][:, None] * (curr[rows[r]] - prev[rows[r]])
+                for track_id, line, s, (x, y) in zip(track_ids[rows[r]].tolist(), l.tolist(),
+                                                     sense[r, l].tolist(), at.tolist()):
+                    name = self.lines[line].name
+                    direction = 'in' if s > 0 else 'out'
+                    self.counts[name][direction] += 1
+                    events.append(CrossingEvent(name, track_id, self.frame_idx, direction, x, y))
+
+        self.ids, self.points, self.last = track_ids, curr, last
+        return events
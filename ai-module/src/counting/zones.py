@@ -0,0 +1,252 @@
+"""
+zones.py
+Polygon zone occupancy from the backend ZoneConfig rows.
+
+Each zone's polygon_json (normalised {x, y} points, as the backend validator
+enforces) is rasterised once into a bit mask at inference resolution: bit k
+of mask[y, x] is set when the pixel lies in zone k, so overlapping zones need
+no special case. Zone membership of every centroid is then one array lookup
+per frame, whatever the number of zones and tracks. ZoneOccupancy turns
+membership changes into enter / exit / dwell events; zones with a
+direction_line_json also count crossings of that line, entry_direction
+being 'in' (counting.lines).
+
+    zones = load_zones('http://localhost:3000/api/zones/camera/3?is_active=true&limit=100')
+    occupancy = ZoneOccupancy(zones, width, height, dwell_frames=150)
+    for event in occupancy.update(track_ids, centroids, frame_idx):
+        print(event.zone, event.track_id, event.kind)
+    occupancy.occupancy['Entry Zone']   # tracks inside now
+
+load_zones() also takes a JSON file (a list of ZoneConfig rows or the
+backend response) or the rows themselves.
+"""
+
+import json
+import urllib.request
+from collections import namedtuple
+
+import cv2
+import numpy as np
+
+from .lines import LineCrossing, CountingLine
+
+ENTRY_DIRECTIONS = ('UP', 'DOWN', 'LEFT', 'RIGHT')
+EVENT_KINDS = ('enter', 'exit', 'dwell', 'in', 'out')
+# Frames inside a zone before its dwell event (5 s at 30 fps)
+DWELL_FRAMES = 150
+MAX_ZONES = 64
+REQUEST_TIMEOUT = 5.0
+
+# polygon: (K, 2) normalised points; direction_line: (2, 2) normalised end
+# points or None; entry_direction: crossings of direction_line going that way are 'in'
+Zone = namedtuple('Zone', 'zone_id name polygon direction_line entry_direction')
+
+# kind: one of EVENT_KINDS ('in' / 'out': crossing of the zone's direction line);
+# frames: frames the track has been inside the zone (0 on enter and crossings)
+ZoneEvent = namedtuple('ZoneEvent', 'zone track_id frame kind frames')
+
+
+def _points(value):
+    """(K, 2) array from a JSON string or a list of {x, y} / [x, y] points"""
+    if isinstance(value, str):
+        value = json.loads(value)
+    if not value:
+        return np.empty((0, 2))
+    return np.array([(p['x'], p['y']) if isinstance(p, dict) else p for p in value], dtype=np.float64).reshape(-1, 2)
+
+
+def zone_from_config(config):
+    """Zone from one ZoneConfig row (dict with the model's field names)"""
+    zone_id = config.get('zone_id')
+    name = config.get('zone_name') or f"zone_{zone_id}"
+    polygon = _points(config.get('polygon_json'))
+    if len(polygon) < 3:
+        raise ValueError(f"Zone '{name}' needs at least 3 polygon points, got {len(polygon)}")
+    line = _points(config.get('direction_line_json'))
+    entry_direction = (config.get('entry_direction') or 'UP').upper()
+    if entry_direction not in ENTRY_DIRECTIONS:
+        raise ValueError(f"Unknown entry direction '{entry_direction}', expected one of {ENTRY_DIRECTIONS}")
+    return Zone(zone_id, name, polygon, line[:2] if len(line) >= 2 else None, entry_direction)
+
+
+def load_zones(source, active_only=True):
+    """
+    Zones of a camera from the backend (URL of GET /zones/camera/<id>), a JSON
+    file or a list of ZoneConfig rows. Inactive zones are skipped unless
+    active_only is False; repeated names get the zone id appended.
+    """
+    if isinstance(source, str):
+        if source.startswith(('http://', 'https://')):
+            with urllib.request.urlopen(source, timeout=REQUEST_TIMEOUT) as response:
+                source = json.load(response)
+        else:
+            with open(source) as f:
+                source = json.load(f)
+    # Backend responses: {"success", "message", "data": {"count", "rows"}}
+    if isinstance(source, dict):
+        source = source.get('data', source)
+    if isinstance(source, dict):
+        source = source.get('rows', [source])
+
+    zones, names = [], set()
+    for config in source:
+        if active_only and not config.get('is_active', True):
+            continue
+        zone = zone_from_config(config)
+        if zone.name in names:
+            zone = zone._replace(name=f"{zone.name}#{zone.zone_id}")
+        names.add(zone.name)
+        zones.append(zone)
+    return zones
+
+
+class ZoneMask:
+    """
+    Zones rasterised at width x height: mask[y, x] has bit k set inside zones[k].
+    polygons: the zones' polygons in pixels (int32, for cv2.polylines).
+    """
+
+    def __init__(self, zones, width, height):
+        self.zones = list(zones)
+        if len(self.zones) > MAX_ZONES:
+            raise ValueError(f"At most {MAX_ZONES} zones per camera, got {len(self.zones)}")
+        self.width, self.height = int(width), int(height)
+        self.dtype = next(np.dtype(t) for t in (np.uint8, np.uint16, np.uint32, np.uint64)
+                          if np.dtype(t).itemsize * 8 >= len(self.zones))
+        self.scale = np.array([self.width, self.height], dtype=np.float64)
+
+        self.mask = np.zeros((self.height, self.width), dtype=self.dtype)
+        self.polygons = []
+        for k, zone in enumerate(self.zones):
+            polygon = np.round(zone.polygon * self.scale).astype(np.int32)
+            self.polygons.append(polygon)
+            # Rasterise inside the polygon's bounding box only
+            x0, y0 = np.maximum(polygon.min(axis=0), 0)
+            x1, y1 = np.minimum(polygon.max(axis=0) + 1, (self.width, self.height))
+            if x1 <= x0 or y1 <= y0:
+                continue
+            fill = np.zeros((y1 - y0, x1 - x0), dtype=np.uint8)
+            cv2.fillPoly(fill, [polygon], 1, offset=(-int(x0), -int(y0)))
+            self.mask[y0:y1, x0:x1][fill > 0] |= self.dtype.type(1 << k)
+
+    def lookup(self, points):
+        """(N,) zone bits of each (x, y) point; 0 outside every zone and off the frame"""
+        points = np.asarray(points, dtype=np.float64).reshape(-1, 2)
+        x = np.floor(points[:, 0]).astype(np.intp)
+        y = np.floor(points[:, 1]).astype(np.intp)
+        on_frame = (x >= 0) & (x < self.width) & (y >= 0) & (y < self.height)
+        bits = np.zeros(len(points), dtype=self.dtype)
+        bits[on_frame] = self.mask[y[on_frame], x[on_frame]]
+        return bits
+
+    def contains(self, points):
+        """(N, zones) bool membership of each point"""
+        bits = self.lookup(points).astype(np.uint64)
+        return ((bits[:, None] >> np.arange(len(self.zones), dtype=np.uint64)[None, :]) & np.uint64(1)).astype(bool)
+
+
+class ZoneOccupancy:
+    """
+    Enter / exit / dwell events of tracks over a camera's zones.
+    zones: Zones (load_zones()); width, height: inference resolution, the
+    coordinate space of the points given to update()
+    dwell_frames: frames inside a zone before its (one) dwell event; 0 disables them
+    Per-track state lives in arrays aligned with the ascending track ids of
+    the last update(); a track missing from an update() exits its zones.
+    """
+
+    def __init__(self, zones, width, height, dwell_frames=DWELL_FRAMES):
+        self.zone_mask = ZoneMask(zones, width, height)
+        self.zones = self.zone_mask.zones
+        self.names = [zone.name for zone in self.zones]
+        if len(set(self.names)) != len(self.names):
+            raise ValueError(f"Duplicate zone names in {self.names}")
+        self.dwell_frames = int(dwell_frames)
+        self.frame_idx = -1
+
+        self.occupancy = {name: 0 for name in self.names}
+        self.counts = {name: {kind: 0 for kind in EVENT_KINDS} for name in self.names}
+
+        # Direction lines in pixels; entry_direction is the 'in' crossing
+        scale = self.zone_mask.scale
+        self.crossing = LineCrossing(
+            CountingLine(zone.name, tuple(zone.direction_line[0] * scale), tuple(zone.direction_line[1] * scale),
+                         direction=zone.entry_direction.lower(), repeat='alternate')
+            for zone in self.zones if zone.direction_line is not None)
+
+        n = len(self.zones)
+        self.ids = np.empty(0, dtype=np.int64)
+        self.inside = np.zeros((0, n), dtype=bool)
+        self.since = np.zeros((0, n), dtype=np.int64)   # frame the track entered each zone
+        self.dwelled = np.zeros((0, n), dtype=bool)     # dwell event already sent
+
+    def _events(self, kind, track_ids, rows, zones, frames):
+        """Count and build the kind events of track_ids[rows] in zones"""
+        events = []
+        for track_id, zone, count in zip(track_ids[rows].tolist(), zones.tolist(), frames.tolist()):
+            name = self.names[zone]
+            self.counts[name][kind] += 1
+            events.append(ZoneEvent(name, track_id, self.frame_idx, kind, count))
+        return events
+
+    def update(self, track_ids, points, frame_idx=None):
+        """
+        track_ids: (N,) ids of the live tracks
+        points: (N, 2) their positions on this frame (usually box centroids)
+        frame_idx: frame number (defaults to the previous one + 1)
+        Returns the ZoneEvents of this frame, ordered by track id.
+        """
+        self.frame_idx = self.frame_idx + 1 if frame_idx is None else int(frame_idx)
+        frame = self.frame_idx
+        track_ids = np.asarray(track_ids, dtype=np.int64).reshape(-1)
+        order = np.argsort(track_ids, kind='stable')
+        track_ids = track_ids[order]
+        points = np.asarray(points, dtype=np.float64).reshape(-1, 2)[order]
+        inside = self.zone_mask.contains(points)
+        n = len(track_ids)
+
+        # Previous state of the tracks seen on the last update()
+        pos = np.searchsorted(self.ids, track_ids)
+        pos = np.minimum(pos, max(len(self.ids) - 1, 0))
+        known = (self.ids[pos] == track_ids) if len(self.ids) else np.zeros(n, dtype=bool)
+        was_inside = np.zeros_like(inside)
+        since = np.full(inside.shape, frame, dtype=np.int64)
+        dwelled = np.zeros_like(inside)
+        was_inside[known] = self.inside[pos[known]]
+        since[known] = self.since[pos[known]]
+        dwelled[known] = self.dwelled[pos[known]]
+
+        # Tracks gone since the last update() leave their zones
+        gone = np.ones(len(self.ids), dtype=bool)
+        gone[pos[known]] = False
+        r, z = np.nonzero(self.inside & gone[:, None])
+        events = self._events('exit', self.ids, r, z, frame - self.since[r, z])
+
+        r, z = np.nonzero(was_inside & ~inside)
+        events += self._events('exit', track_ids, r, z, frame - since[r, z])
+
+        entered = inside & ~was_inside
+        since[entered] = frame
+        dwelled[entered] = False
+        r, z = np.nonzero(entered)
+        events += self._events('enter', track_ids, r, z, np.zeros(len(r), dtype=np.int64))
+
+        if self.dwell_frames > 0:
+            dwell = inside & ~dwelled & (frame - since >= self.dwell_frames)
+            dwelled |= dwell
+            r, z = np.nonzero(dwell)
+            events += self._events('dwell', track_ids, r, z, frame - since[r, z])
+
+        if len(self.crossing):
+            for crossing in self.crossing.update(track_ids, points, frame):
+                self.counts[crossing.line][crossing.direction] += 1
+                events.append(ZoneEvent(crossing.line, crossing.track_id, frame, crossing.direction, 0))
+
+        self.ids, self.inside, self.since, self.dwelled = track_ids, inside, since, dwelled
+        self.occupancy = dict(zip(self.names, inside.sum(axis=0).tolist()))
+        events.sort(key=lambda event: event.track_id)
+        return events
+
+    def summary(self):
+        """{zone name: {'inside': tracks now, 'enter': ..., 'exit': ..., 'dwell': ..., 'in': ..., 'out': ...}}"""
+        return {name: {'inside': self.occupancy[name], **self.counts[name]} for name in self.names}
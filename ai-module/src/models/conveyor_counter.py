@@ -23,11 +23,20 @@ import argparse
 import cv2
 import numpy as np
 from ultralytics import YOLO
-from collections import defaultdict
 import os
 import math
 import sys
 
+# ai-module/src on the path for the shared tracking package
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from tracking.tracker import TRACKER_KIND, TRACKER_KINDS
+from tracking.adapters import SharedCentroidTracker
+from tracking.history import TrajectoryStore
+from counting.lines import LineCrossing, CountingLine, extend_to_frame, moved_along
+
+# Pixels an object must move in --direction over its last two steps to count
+MIN_MOVE = 2.0
+
 # -------------------------
 # CentroidTracker
 # -------------------------
@@ -36,7 +45,7 @@ class CentroidTracker:
         self.next_id = 0
         self.objects = {}      # id -> bbox
         self.disappeared = {}  # id -> frames missed
-        self.history = defaultdict(list)  # id -> list of centroids
+        self.history = TrajectoryStore()  # id -> bounded ring of centroids
         self.iou_threshold = iou_threshold
         self.max_disappeared = max_disappeared
 
@@ -145,10 +154,6 @@ def parse_line(s):
         raise ValueError("line must be x1,y1,x2,y2")
     return tuple(int(p) for p in parts)
 
-def point_line_side(px, py, x1, y1, x2, y2):
-    # signed area (positive one side, negative other)
-    return (x2 - x1)*(py - y1) - (y2 - y1)*(px - x1)
-
 # auto-line: choose horizontal line across width at given fraction of height
 def auto_line_from_image(image_path, frac=0.60):
     if not os.path.exists(image_path):
@@ -188,13 +193,14 @@ def main():
     ap.add_argument("--model", default="yolov8s.pt", help="YOLO model")
     ap.add_argument("--start-frame", type=int, default=0, help="Frame index to start processing from")
     ap.add_argument("--save-start-frame", default=None, help="If set, save the start-frame as image for drawing line")
-    ap.add_argument("--line", default=None, help="Crossing line in format x1,y1,x2,y2")
+    ap.add_argument("--line", default=None, help="Crossing line in format x1,y1,x2,y2 (extended across the frame)")
     ap.add_argument("--auto-line", action='store_true', help="Auto compute horizontal line using saved frame or default uploaded frame")
     ap.add_argument("--auto-line-frame", default="/mnt/data/frame150.jpg", help="Frame path to use for auto-line (default uses uploaded frame)")
     ap.add_argument("--direction", choices=['left','right','up','down'], default='right', help="Expected crossing direction")
     ap.add_argument("--conf", type=float, default=0.35, help="YOLO confidence threshold")
     ap.add_argument("--min-frames", type=int, default=3, help="Min frames seen to be counted")
     ap.add_argument("--freeze-sec", type=float, default=2.0, help="Seconds to freeze final frame in output")
+    ap.add_argument("--tracker", choices=TRACKER_KINDS, default=TRACKER_KIND, help="legacy (built-in CentroidTracker) or a shared tracker")
     args = ap.parse_args()
 
     # load model
@@ -247,7 +253,13 @@ def main():
     fourcc = cv2.VideoWriter_fourcc(*'mp4v')
     out = cv2.VideoWriter(args.output, fourcc, fps, (w, h))
 
-    tracker = CentroidTracker(max_disappeared=30, iou_threshold=0.25)
+    tracker = (CentroidTracker(max_disappeared=30, iou_threshold=0.25) if args.tracker == "legacy"
+               else SharedCentroidTracker(args.tracker, max_disappeared=30, iou_threshold=0.25))
+    # Crossings of the segment moving in --direction, once per object
+    # The line is extended across the frame: objects crossing beside the drawn
+    # segment still count
+    crossing = LineCrossing([CountingLine('line', *extend_to_frame((x1, y1), (x2, y2), w, h),
+                                          direction=args.direction, count='in')])
     counted_ids = set()
     total_count = 0
 
@@ -269,40 +281,18 @@ def main():
 
         active_ids = tracker.update(detections)
         active_count = len(active_ids)
-
-        # For each active id, check crossing
-        for oid in active_ids:
-            hist = tracker.history.get(oid, [])
-            if len(hist) < 2:
-                continue
-            prev_cent = hist[-2]
-            curr_cent = hist[-1]
-            prev_side = point_line_side(prev_cent[0], prev_cent[1], x1, y1, x2, y2)
-            curr_side = point_line_side(curr_cent[0], curr_cent[1], x1, y1, x2, y2)
-
-            crossed = (prev_side <= 0 and curr_side > 0) or (prev_side >= 0 and curr_side < 0)
-            if crossed and oid not in counted_ids and len(hist) >= args.min_frames:
-                # direction check using movement vector
-                # take a slightly earlier point for robust direction calculation
-                if len(hist) >= 3:
-                    p_prev = hist[-3]
-                else:
-                    p_prev = hist[0]
-                dx = curr_cent[0] - p_prev[0]
-                dy = curr_cent[1] - p_prev[1]
-                ok = False
-                if args.direction == 'right' and dx > 2.0:
-                    ok = True
-                elif args.direction == 'left' and dx < -2.0:
-                    ok = True
-                elif args.direction == 'down' and dy > 2.0:
-                    ok = True
-                elif args.direction == 'up' and dy < -2.0:
-                    ok = True
-
-                if ok:
-                    counted_ids.add(oid)
-                    total_count += 1
+        # Dead ids never come back; keep the set as small as the live tracks
+        counted_ids.intersection_update(active_ids)
+
+        # Check every active id against the line in one pass; ids need
+        # min_frames of history and real movement in --direction to count
+        ids = [oid for oid in active_ids if tracker.history.get(oid)]
+        points = [tracker.history[oid][-1] for oid in ids]
+        eligible = [len(tracker.history[oid]) >= args.min_frames
+                    and moved_along(tracker.history[oid], args.direction, MIN_MOVE) for oid in ids]
+        for event in crossing.update(ids, points, frame_idx, eligible=eligible):
+            counted_ids.add(event.track_id)
+            total_count += 1
 
         # annotate frame: line, boxes, text
         # draw line
@@ -5,37 +5,122 @@ Uses DeepSORT/ByteTrack for tracking unique individuals
 """
 
 import os
+import sys
+import json
 import cv2
 import numpy as np
 from datetime import datetime, timedelta
-from flask import Flask, request, jsonify
+from flask import Flask, Request, Response, request, jsonify, stream_with_context
 from flask_cors import CORS
+from video_jobs import VideoJobManager, QueueFullError, FINISHED_STATES
+from result_cache import ResultCache, make_key, model_version
 import tempfile
 import traceback
+import time
+import threading
+import multiprocessing
+from concurrent.futures import ThreadPoolExecutor
 from collections import defaultdict
 import math
 
-# Try to import DeepFace
+# ai-module/src on the path for the shared utils package
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from utils.video_utils import FrameSampler
+from utils.image_utils import resize_to_max_dim, unscale_box, decode_image
+from utils.upload_utils import HashingTempFile, UploadTooLargeError, stream_to_temp, read_length_prefixed
+from utils.progress import ProgressReporter, log_sink
+from utils.yolo_backend import load_yolo, INFERENCE_BACKEND
+from utils.box_utils import (xywh_to_xyxy, pairwise_iou, pairwise_centroid_distance,
+                             greedy_assignment, optimal_assignment, grid_candidates)
+from tracking.store import TrackStore, TrackView, TrackArchive, column
+
+# DeepFace (TensorFlow) and ultralytics (PyTorch) are imported on first use by
+# DetectionService.load_models(), not at module import, so the server can bind
+# before the heavy frameworks are in memory.
 DEEPFACE_AVAILABLE = False
-try:
-    os.environ['TF_CPP_MIN_LOG_LEVEL'] = '3'
-    from deepface import DeepFace
-    DEEPFACE_AVAILABLE = True
-    print("✅ DeepFace available")
-except Exception as e:
-    print("⚠️ DeepFace not available:", e)
-
-# Try to import ultralytics YOLO
+DeepFace = None
 YOLO_AVAILABLE = False
-try:
-    from ultralytics import YOLO
-    YOLO_AVAILABLE = True
-    print("✅ ultralytics YOLO imported")
-except Exception as e:
-    print("⚠️ ultralytics not available:", e)
+YOLO = None
+
+
+def import_deepface():
+    """Import DeepFace once; returns True if it is usable"""
+    global DEEPFACE_AVAILABLE, DeepFace
+    if DeepFace is None:
+        try:
+            os.environ['TF_CPP_MIN_LOG_LEVEL'] = '3'
+            from deepface import DeepFace as _DeepFace
+            DeepFace = _DeepFace
+            DEEPFACE_AVAILABLE = True
+            print("✅ DeepFace available")
+        except Exception as e:
+            print("⚠️ DeepFace not available:", e)
+    return DEEPFACE_AVAILABLE
+
+
+def import_yolo():
+    """Import ultralytics YOLO once; returns True if it is usable"""
+    global YOLO_AVAILABLE, YOLO
+    if YOLO is None:
+        try:
+            from ultralytics import YOLO as _YOLO
+            YOLO = _YOLO
+            YOLO_AVAILABLE = True
+            print("✅ ultralytics YOLO imported")
+        except Exception as e:
+            print("⚠️ ultralytics not available:", e)
+    return YOLO_AVAILABLE
 
 DEFAULT_FACE_CASCADE = cv2.data.haarcascades + "haarcascade_frontalface_default.xml"
 
+# Number of sampled frames sent to YOLO in a single call during video processing
+DEFAULT_VIDEO_BATCH_SIZE = int(os.environ.get('DETECTION_VIDEO_BATCH_SIZE', 8))
+MAX_VIDEO_BATCH_SIZE = 32
+
+# Frames analysed per second of video
+VIDEO_SAMPLE_FPS = 4.0
+
+# Longest side of the image given to the person/face detectors. Face and gender
+# crops are still cut from the full-resolution frame, and all output boxes are
+# in original frame coordinates.
+DEFAULT_INFERENCE_SIZE = int(os.environ.get('DETECTION_INFERENCE_SIZE', 1280))
+MIN_INFERENCE_SIZE = 320
+
+# Face detection only looks at the top FACE_BAND_RATIO of each person box;
+# YOLO-face runs on those bands at FACE_BAND_IMGSZ instead of the whole frame
+FACE_BAND_RATIO = float(os.environ.get('DETECTION_FACE_BAND_RATIO', 0.4))
+FACE_BAND_IMGSZ = int(os.environ.get('DETECTION_FACE_BAND_IMGSZ', 256))
+
+# Per-track gender/age classification: how many face-based classifications a track
+# may receive, and how much better a new face crop must score to trigger a refresh
+DEFAULT_GENDER_REFRESH_BUDGET = int(os.environ.get('DETECTION_GENDER_REFRESH_BUDGET', 3))
+GENDER_REFRESH_MIN_GAIN = 1.3
+# Face detector DeepFace runs inside analyze(); the warm-up uses the same one
+DEEPFACE_DETECTOR_BACKEND = 'opencv'
+
+# Run one inference per model on a synthetic frame after loading, so the first
+# real request does not pay for lazy graph/kernel initialisation
+WARMUP_ENABLED = os.environ.get('DETECTION_WARMUP', '1').lower() not in ('0', 'false', 'no')
+WARMUP_FRAME_SIZE = (480, 640)
+
+# PersonTracker association: 'hungarian' (optimal, scipy) or 'greedy' (sorted-greedy)
+TRACKER_ASSIGNMENT = os.environ.get('DETECTION_TRACKER_ASSIGNMENT', 'hungarian').lower()
+
+# PersonTracker spatial-grid gating for crowded wide frames: only pairs whose
+# boxes are within TRACKER_GRID_REACH px are scored. Farther apart they cannot
+# reach the 0.3 match threshold: (1 - 0.3 / 0.4) * 1920 = 480 px.
+TRACKER_GRID = os.environ.get('DETECTION_TRACKER_GRID', '0').lower() in ('1', 'true', 'yes')
+TRACKER_GRID_REACH = 480.0
+TRACKER_GRID_MIN_PAIRS = 256 * 256
+
+# Track genders are stored as small integer codes
+GENDER_LABELS = ('unknown', 'male', 'female')
+GENDER_CODES = {label: code for code, label in enumerate(GENDER_LABELS)}
+
+# Caffe gender_net preprocessing
+GENDER_NET_INPUT_SIZE = (227, 227)
+GENDER_NET_MEAN = (78.4263377603, 87.7689143744, 114.895847746)
+
 
 def convert_to_serializable(obj):
     """Convert NumPy types to Python native types"""
@@ -52,136 +137,292 @@ def convert_to_serializable(obj):
     return obj
 
 
+def face_quality(face_info):
+    """
+    Score a face crop for gender classification: larger and closer to a frontal
+    aspect ratio (w/h ~ 0.8) is better. Returns 0.0 when there is no face.
+    """
+    if not face_info or not face_info.get('bbox'):
+        return 0.0
+    _, _, w, h = face_info['bbox']
+    if w <= 0 or h <= 0:
+        return 0.0
+    frontal = max(0.0, 1.0 - abs(w / h - 0.8) / 0.8)
+    return float(w * h) * frontal * float(face_info.get('confidence', 1.0))
+
+
+# PersonTracker state, one row per live track (tracking.store)
+PERSON_COLUMNS = {
+    'boxes': ('float32', (4,)),        # x1, y1, x2, y2
+    'gender': ('int8',),               # index into GENDER_LABELS
+    'confidence': ('float32',),
+    'age': ('float32', (), np.nan),    # NaN when unknown
+    'face_quality': ('float32',),
+    'classifications': ('int16',),
+    'first_seen': ('int64',),
+    'last_seen': ('int64',),
+    'frames_seen': ('int32',),
+    'disappeared': ('int32',),
+}
+
+
+# What is kept of a track once it is dropped: enough for the final counts
+# and unique_persons (~30 bytes per person)
+FINISHED_COLUMNS = {
+    'gender': ('int8',),
+    'confidence': ('float32',),
+    'age': ('float32', (), np.nan),
+    'first_seen': ('int64',),
+    'last_seen': ('int64',),
+    'frames_seen': ('int32',),
+}
+
+
+class PersonTrack(TrackView):
+    """One tracked person: a row of PersonTracker.tracks"""
+    __slots__ = ()
+
+    confidence = column('confidence')
+    face_quality = column('face_quality')
+    classifications = column('classifications')
+    first_seen = column('first_seen')
+    last_seen = column('last_seen')
+    frames_seen = column('frames_seen')
+    disappeared = column('disappeared')
+
+    @property
+    def gender(self):
+        return GENDER_LABELS[self.store.gender[self.row]]
+
+    @property
+    def age(self):
+        age = self.store.age[self.row]
+        return None if np.isnan(age) else int(age)
+
+    def as_dict(self):
+        x1, y1, x2, y2 = self.store.boxes[self.row].tolist()
+        return {
+            'bbox': {'x': x1, 'y': y1, 'width': x2 - x1, 'height': y2 - y1},
+            'gender': self.gender,
+            'confidence': self.confidence,
+            'age': self.age,
+            'face_quality': self.face_quality,
+            'classifications': self.classifications,
+            'first_seen': self.first_seen,
+            'last_seen': self.last_seen,
+            'frames_seen': self.frames_seen,
+            'disappeared': self.disappeared,
+        }
+
+
 class PersonTracker:
-    """Simple person tracker using IoU and centroid distance"""
-    
-    def __init__(self, max_disappeared=30, min_confidence=0.6):
+    """
+    Person tracker using IoU and centroid distance.
+
+    Track state lives in a struct-of-arrays TrackStore (stable rows, reused
+    through a free-list) and each frame is associated in one shot: pairwise
+    IoU and centroid-distance matrices, then Hungarian (or sorted-greedy)
+    assignment.
+
+    Tracks gone for more than max_disappeared frames leave the store for the
+    finished-track archive, so counts cover everyone seen in the video while
+    memory only grows by one compact record per person.
+    """
+
+    def __init__(self, max_disappeared=30, min_confidence=0.6,
+                 max_classifications=DEFAULT_GENDER_REFRESH_BUDGET, refresh_gain=GENDER_REFRESH_MIN_GAIN,
+                 assignment=TRACKER_ASSIGNMENT, grid=TRACKER_GRID):
         self.next_person_id = 0
-        self.tracked_persons = {}  # {track_id: {'bbox', 'gender', 'confidence', 'last_seen', 'frames_seen'}}
         self.max_disappeared = max_disappeared
         self.min_confidence = min_confidence
         self.counted_persons = set()  # Track IDs that have been counted
-        
-    def calculate_centroid(self, bbox):
-        """Calculate center point of bounding box"""
-        x, y, w, h = bbox['x'], bbox['y'], bbox['width'], bbox['height']
-        cx = x + w / 2
-        cy = y + h / 2
-        return (cx, cy)
-    
-    def calculate_distance(self, centroid1, centroid2):
-        """Euclidean distance between two centroids"""
-        return math.sqrt((centroid1[0] - centroid2[0])**2 + (centroid1[1] - centroid2[1])**2)
-    
-    def calculate_iou(self, bbox1, bbox2):
-        """Calculate IoU between two bboxes"""
-        x1 = max(bbox1['x'], bbox2['x'])
-        y1 = max(bbox1['y'], bbox2['y'])
-        x2 = min(bbox1['x'] + bbox1['width'], bbox2['x'] + bbox2['width'])
-        y2 = min(bbox1['y'] + bbox1['height'], bbox2['y'] + bbox2['height'])
-        
-        inter_area = max(0, x2 - x1) * max(0, y2 - y1)
-        bbox1_area = bbox1['width'] * bbox1['height']
-        bbox2_area = bbox2['width'] * bbox2['height']
-        union_area = bbox1_area + bbox2_area - inter_area
-        
-        return inter_area / union_area if union_area > 0 else 0
-    
-    def update(self, detections, frame_number):
+        self.max_classifications = max_classifications
+        self.refresh_gain = refresh_gain
+        self.classification_calls = 0
+        self.assign = greedy_assignment if assignment == 'greedy' else optimal_assignment
+        self.grid = grid
+        self.tracks = TrackStore(PERSON_COLUMNS, view=PersonTrack)
+        self.finished = TrackArchive(FINISHED_COLUMNS)
+        self._finished_counted = 0  # finished records already seen by get_unique_counts
+
+    def __len__(self):
+        return len(self.tracks)
+
+    @staticmethod
+    def _gender_code(gender):
+        return GENDER_CODES.get(gender, 0)
+
+    @staticmethod
+    def _age_value(age):
+        return np.nan if age is None else float(age)
+
+    def _classify(self, dets, classify):
+        """Run the batch classifier once for all detections that need it"""
+        if not dets:
+            return []
+        self.classification_calls += len(dets)
+        infos = classify(dets) or [None] * len(dets)
+        return [info or {'gender': 'unknown', 'confidence': 0.0, 'age': None} for info in infos]
+
+    def _apply_refresh(self, row, det, info):
+        t = self.tracks
+        if 'gender' in info:
+            t.gender[row] = self._gender_code(info['gender'])
+        t.confidence[row] = float(info.get('confidence', t.confidence[row]))
+        if info.get('age'):
+            t.age[row] = float(info['age'])
+        t.face_quality[row] = det['metadata'].get('face_quality', 0.0)
+        t.classifications[row] += 1
+
+    def _append(self, ids, boxes, gender, confidence, age, quality, frame_number):
+        quality = np.asarray(quality, dtype=np.float32)
+        self.tracks.add(ids, boxes=np.asarray(boxes, dtype=np.float32).reshape(-1, 4), gender=gender,
+                        confidence=confidence, age=age, face_quality=quality,
+                        classifications=(quality > 0), first_seen=frame_number, last_seen=frame_number,
+                        frames_seen=1)
+
+    def _drop_disappeared(self, rows):
+        gone = rows[self.tracks.disappeared[rows] > self.max_disappeared]
+        self.finished.record(self.tracks, gone)
+        self.tracks.remove(gone)
+
+    def _counted_genders(self, min_frames_seen):
+        """Gender codes of live and finished tracks seen for at least min_frames_seen frames"""
+        t, f = self.tracks, self.finished
+        live = t.rows()
+        live = live[t.frames_seen[live] >= min_frames_seen]
+        return np.concatenate([f.gender[f.frames_seen >= min_frames_seen], t.gender[live]])
+
+    def association_scores(self, rows, det_boxes, det_gender):
+        """
+        Score matrix (tracks at rows x detections): 0.6 * IoU + 0.4 * (1 - centroid distance / 1920),
+        zeroed where a classified detection disagrees with the track's gender.
+        With grid gating, pairs out of reach are not computed and score -inf.
+        """
+        boxes = self.tracks.boxes[rows]
+        gender = self.tracks.gender[rows]
+        pairs = None
+        if self.grid and len(boxes) * len(det_boxes) >= TRACKER_GRID_MIN_PAIRS:
+            pairs = grid_candidates(boxes, det_boxes, TRACKER_GRID_REACH)
+        iou = pairwise_iou(boxes, det_boxes, pairs)
+        # Normalize distance (assume max frame dimension is 1920)
+        distance = pairwise_centroid_distance(boxes, det_boxes, pairs) / 1920.0
+        score = iou * 0.6 + (1.0 - distance) * 0.4
+
+        # Unclassified detections match any track
+        gender_match = (det_gender[None, :] == 0) | (gender[:, None] == det_gender[None, :])
+        return np.where(gender_match, score, 0.0)
+
+    def update(self, detections, frame_number, classify=None):
         """
         Update tracker with new detections
+        classify: optional callable(list of det) -> list of {'gender', 'confidence', 'age'}.
+                  When given, detections arrive unclassified and gender/age live on the track:
+                  a new track is classified once, then refreshed only for better face crops
+                  (at most max_classifications face-based calls per track). All crops that
+                  need classification in this frame go to a single classify call.
         Returns list of unique persons detected in this frame
         """
-        current_frame_tracks = []
-        
+        t = self.tracks
+        live = t.rows()
         if len(detections) == 0:
             # Mark all as disappeared
-            disappeared_ids = []
-            for track_id, person in self.tracked_persons.items():
-                person['disappeared'] = person.get('disappeared', 0) + 1
-                if person['disappeared'] > self.max_disappeared:
-                    disappeared_ids.append(track_id)
-            
-            for track_id in disappeared_ids:
-                del self.tracked_persons[track_id]
-            
+            t.disappeared[live] += 1
+            self._drop_disappeared(live)
             return []
-        
-        # Match detections to existing tracks
-        matched_detections = set()
-        
-        for track_id, person in self.tracked_persons.items():
-            best_match_idx = -1
-            best_score = 0
-            
-            for idx, det in enumerate(detections):
-                if idx in matched_detections:
-                    continue
-                
-                # Calculate IoU and centroid distance
-                iou = self.calculate_iou(person['bbox'], det['bbox'])
-                
-                centroid_old = self.calculate_centroid(person['bbox'])
-                centroid_new = self.calculate_centroid(det['bbox'])
-                distance = self.calculate_distance(centroid_old, centroid_new)
-                
-                # Normalize distance (assume max frame dimension is 1920)
-                normalized_distance = distance / 1920.0
-                
-                # Combined score: IoU + (1 - normalized_distance)
-                # Also check if gender matches
-                gender_match = (person['gender'] == det['gender'])
-                
-                score = 0
-                if gender_match:
-                    score = (iou * 0.6) + ((1 - normalized_distance) * 0.4)
-                
-                if score > best_score and score > 0.3:  # Threshold for matching
-                    best_score = score
-                    best_match_idx = idx
-            
-            if best_match_idx >= 0:
-                # Update existing track
-                det = detections[best_match_idx]
-                person['bbox'] = det['bbox']
-                person['gender'] = det['gender']
-                person['confidence'] = max(person['confidence'], det['confidence_score'])
-                person['last_seen'] = frame_number
-                person['frames_seen'] = person.get('frames_seen', 0) + 1
-                person['disappeared'] = 0
-                
-                matched_detections.add(best_match_idx)
-                current_frame_tracks.append(track_id)
-        
+
+        det_boxes = xywh_to_xyxy([[d['bbox']['x'], d['bbox']['y'], d['bbox']['width'], d['bbox']['height']]
+                                  for d in detections])
+        det_gender = np.array([self._gender_code(d['gender']) for d in detections], dtype=np.int8)
+
+        # Match detections to existing tracks (threshold 0.3 on the combined score)
+        rows, cols = self.assign(self.association_scores(live, det_boxes, det_gender), 0.3)
+        order = np.argsort(rows, kind='stable')
+        rows, cols = live[rows[order]], cols[order]
+
+        # Update existing tracks
+        t.boxes[rows] = det_boxes[cols]
+        t.last_seen[rows] = frame_number
+        t.frames_seen[rows] += 1
+        t.disappeared[rows] = 0
+        # Age the live tracks no detection matched
+        t.disappeared[np.setdiff1d(live, rows)] += 1
+
+        refresh = []  # (row, det) pairs waiting for the batched classifier
+        if classify is not None:
+            quality = np.array([d['metadata'].get('face_quality', 0.0) for d in detections], dtype=np.float32)
+            needs = ((quality[cols] > 0)
+                     & (t.classifications[rows] < self.max_classifications)
+                     & (quality[cols] > t.face_quality[rows] * self.refresh_gain))
+            refresh = [(int(r), detections[int(c)]) for r, c in zip(rows[needs], cols[needs])]
+        elif len(rows):
+            det_conf = np.array([d['confidence_score'] for d in detections], dtype=np.float32)
+            t.gender[rows] = det_gender[cols]
+            t.confidence[rows] = np.maximum(t.confidence[rows], det_conf[cols])
+
+        current_frame_tracks = t.ids[rows].tolist()
+
+        matched = np.zeros(len(detections), dtype=bool)
+        matched[cols] = True
+        unmatched = np.flatnonzero(~matched).tolist()
+
+        new_infos = {}
+        if classify is not None:
+            pending = [det for _, det in refresh] + [detections[idx] for idx in unmatched]
+            infos = self._classify(pending, classify)
+            for (row, det), info in zip(refresh, infos):
+                self._apply_refresh(row, det, info)
+            new_infos = dict(zip(unmatched, infos[len(refresh):]))
+
         # Create new tracks for unmatched detections
-        for idx, det in enumerate(detections):
-            if idx not in matched_detections:
-                # Only create new track if confidence is high enough
-                if det['confidence_score'] >= self.min_confidence:
-                    track_id = self.next_person_id
-                    self.next_person_id += 1
-                    
-                    self.tracked_persons[track_id] = {
-                        'bbox': det['bbox'],
-                        'gender': det['gender'],
-                        'confidence': det['confidence_score'],
-                        'first_seen': frame_number,
-                        'last_seen': frame_number,
-                        'frames_seen': 1,
-                        'disappeared': 0
-                    }
-                    current_frame_tracks.append(track_id)
-        
+        new = {'ids': [], 'boxes': [], 'gender': [], 'confidence': [], 'age': [], 'quality': []}
+        for idx in unmatched:
+            det = detections[idx]
+            quality = 0.0
+            if classify is not None:
+                info = new_infos[idx]
+                quality = det['metadata'].get('face_quality', 0.0)
+                gender = info.get('gender', 'unknown')
+                confidence = float(info.get('confidence', 0.0))
+                age = info.get('age')
+            else:
+                gender = det['gender']
+                confidence = det['confidence_score']
+                age = det['metadata'].get('age')
+
+            # Only create new track if confidence is high enough
+            if confidence >= self.min_confidence:
+                track_id = self.next_person_id
+                self.next_person_id += 1
+                new['ids'].append(track_id)
+                new['boxes'].append(det_boxes[idx])
+                new['gender'].append(self._gender_code(gender))
+                new['confidence'].append(confidence)
+                new['age'].append(self._age_value(age))
+                new['quality'].append(quality)
+                current_frame_tracks.append(track_id)
+
+        if new['ids']:
+            self._append(new['ids'], new['boxes'], new['gender'], new['confidence'],
+                         new['age'], new['quality'], frame_number)
+
         # Remove tracks that have disappeared for too long
-        disappeared_ids = []
-        for track_id, person in self.tracked_persons.items():
-            if person.get('disappeared', 0) > self.max_disappeared:
-                disappeared_ids.append(track_id)
-        
-        for track_id in disappeared_ids:
-            del self.tracked_persons[track_id]
-        
+        self._drop_disappeared(live)
+
         return current_frame_tracks
+
+    def running_counts(self, min_frames_seen=3):
+        """Cheap running counts for progress events (same filter as get_final_counts)"""
+        genders = self._counted_genders(min_frames_seen)
+        male = int((genders == GENDER_CODES['male']).sum())
+        female = int((genders == GENDER_CODES['female']).sum())
+        return {'male_count': male, 'female_count': female, 'total_count': male + female,
+                'active_tracks': len(self.tracks), 'finished_tracks': len(self.finished)}
+
+    @property
+    def tracked_persons(self):
+        """{track_id: PersonTrack} __slots__ views of the live tracks"""
+        return dict(self.tracks.items())
     
     def get_unique_counts(self, min_frames_seen=5):
         """
@@ -191,14 +432,27 @@ class PersonTracker:
         male_count = 0
         female_count = 0
         
-        for track_id, person in self.tracked_persons.items():
-            if person.get('frames_seen', 0) >= min_frames_seen:
-                if track_id not in self.counted_persons:
-                    self.counted_persons.add(track_id)
-                    if person['gender'] == 'male':
-                        male_count += 1
-                    elif person['gender'] == 'female':
-                        female_count += 1
+        t, f = self.tracks, self.finished
+        live = t.rows()
+        # Tracks finished since the last call, then the live ones
+        new = slice(self._finished_counted, len(f))
+        self._finished_counted = len(f)
+        ids = np.concatenate([f.ids[new], t.ids[live]])
+        genders = np.concatenate([f.gender[new], t.gender[live]])
+        seen = np.concatenate([f.frames_seen[new], t.frames_seen[live]]) >= min_frames_seen
+        n_finished = new.stop - new.start
+        for i, (track_id, code) in enumerate(zip(ids.tolist(), genders.tolist())):
+            if not seen[i]:
+                continue
+            if track_id not in self.counted_persons:
+                self.counted_persons.add(track_id)
+                gender = GENDER_LABELS[code]
+                if gender == 'male':
+                    male_count += 1
+                elif gender == 'female':
+                    female_count += 1
+        # Finished ids never come back: keep the set to the live tracks
+        self.counted_persons.difference_update(ids[:n_finished].tolist())
         
         return {
             'male_count': male_count,
@@ -207,27 +461,36 @@ class PersonTracker:
         }
     
     def get_final_counts(self, min_frames_seen=3):
-        """Get final unique counts after video processing"""
-        male_count = 0
-        female_count = 0
+        """Get final unique counts after video processing (live and finished tracks)"""
+        # Only count persons who appeared for minimum frames (reduces false positives)
+        t, f = self.tracks, self.finished
+        live = t.rows()
+        live = live[t.frames_seen[live] >= min_frames_seen]
+        done = np.flatnonzero(f.frames_seen >= min_frames_seen)
+
+        def both(name):
+            return np.concatenate([getattr(f, name)[done], getattr(t, name)[live]])
+
+        ids = both('ids')
+        order = np.argsort(ids, kind='stable')
+        genders = both('gender')[order]
+        male_count = int((genders == GENDER_CODES['male']).sum())
+        female_count = int((genders == GENDER_CODES['female']).sum())
+
         unique_persons = []
-        
-        for track_id, person in self.tracked_persons.items():
-            # Only count persons who appeared for minimum frames (reduces false positives)
-            if person.get('frames_seen', 0) >= min_frames_seen:
-                if person['gender'] == 'male':
-                    male_count += 1
-                elif person['gender'] == 'female':
-                    female_count += 1
-                
-                unique_persons.append({
-                    'person_id': f"person_{track_id}",
-                    'gender': person['gender'],
-                    'confidence': person['confidence'],
-                    'frames_seen': person['frames_seen'],
-                    'first_seen_frame': person.get('first_seen', 0),
-                    'last_seen_frame': person.get('last_seen', 0)
-                })
+        for track_id, gender, age, confidence, frames_seen, first_seen, last_seen in zip(
+                ids[order].tolist(), genders.tolist(), both('age')[order].tolist(),
+                both('confidence')[order].tolist(), both('frames_seen')[order].tolist(),
+                both('first_seen')[order].tolist(), both('last_seen')[order].tolist()):
+            unique_persons.append({
+                'person_id': f"person_{track_id}",
+                'gender': GENDER_LABELS[gender],
+                'age': None if math.isnan(age) else int(age),
+                'confidence': confidence,
+                'frames_seen': frames_seen,
+                'first_seen_frame': first_seen,
+                'last_seen_frame': last_seen
+            })
         
         return {
             'male_count': male_count,
@@ -238,30 +501,143 @@ class PersonTracker:
 
 
 class DetectionService:
-    def __init__(self):
+    def __init__(self, lazy=False, warmup=WARMUP_ENABLED):
+        """
+        lazy: only set up attributes; call load_models() (or start_loading()) later
+        warmup: run one synthetic inference per model after loading
+        """
         print("🔧 Initializing Detection Service with Tracking...")
         self.models_dir = os.path.join(os.path.dirname(__file__), "models")
         os.makedirs(self.models_dir, exist_ok=True)
 
         self.yolo_person = None
         self.yolo_face = None
-        self._try_load_yolo_models()
-
         self.hog = None
         self.face_cascade = None
-        if not self.yolo_person:
-            self._init_hog()
-        if not self.yolo_face:
-            self.face_cascade = cv2.CascadeClassifier(DEFAULT_FACE_CASCADE)
-            print("✅ Haar cascade face detector loaded as fallback")
-
         self.gender_net = None
         self.gender_list = ['male', 'female']
-        self._try_load_gender_model()
-        self.use_deepface = DEEPFACE_AVAILABLE
+        self.use_deepface = False
+
+        self.warmup = warmup
+        # Set once load_models() has finished, successfully or not
+        self.loaded = threading.Event()
+        self.load_state = 'pending'
+        self.load_started_at = None
+        self.load_finished_at = None
+        self.load_error = None
+        self.load_seconds = None
+        # name -> {'loaded', 'load_ms', 'warmup_ms', 'error'}
+        self.model_status = {}
+
+        if not lazy:
+            self.load_models()
+
+    def start_loading(self):
+        """Load (and warm up) the models on a daemon thread"""
+        thread = threading.Thread(target=self.load_models, name='model-loader', daemon=True)
+        thread.start()
+        return thread
+
+    def _record_model(self, name, loaded, load_ms=None, warmup_ms=None, error=None):
+        entry = self.model_status.setdefault(name, {'loaded': False, 'load_ms': None, 'warmup_ms': None, 'error': None})
+        entry['loaded'] = bool(loaded)
+        model = getattr(self, name, None)
+        if hasattr(model, 'inference_backend'):
+            entry['backend'] = model.inference_backend
+        if load_ms is not None:
+            entry['load_ms'] = round(load_ms, 1)
+        if warmup_ms is not None:
+            entry['warmup_ms'] = round(warmup_ms, 1)
+        if error is not None:
+            entry['error'] = str(error)
+
+    def _timed_load(self, name, loader):
+        """loader returns whether the model is usable"""
+        start = time.perf_counter()
+        try:
+            loaded, error = bool(loader()), None
+        except Exception as e:
+            loaded, error = False, e
+        self._record_model(name, loaded, load_ms=(time.perf_counter() - start) * 1000, error=error)
+
+    def load_models(self):
+        """Import frameworks, load every model and run the warm-up pass"""
+        if self.load_state in ('loading', 'ready'):
+            return
+        self.load_state = 'loading'
+        self.load_started_at = datetime.now().isoformat()
+        started = time.perf_counter()
+
+        try:
+            self._timed_load('ultralytics', import_yolo)
+            self._try_load_yolo_models()
+
+            if not self.yolo_person:
+                self._timed_load('hog', lambda: self._init_hog() or self.hog is not None)
+            if not self.yolo_face:
+                self._timed_load('haar_face', lambda: self._init_face_cascade() or not self.face_cascade.empty())
 
-        print(f"🎯 Mode: {'YOLOv8 (person+face)' if self.yolo_person or self.yolo_face else 'HOG+Haar fallback'}")
-        print("🔍 Detection service ready with tracking\n")
+            self._timed_load('gender_net', lambda: self._try_load_gender_model() or self.gender_net is not None)
+            self._timed_load('deepface', import_deepface)
+            self.use_deepface = DEEPFACE_AVAILABLE
+
+            if self.warmup:
+                self.warm_up()
+
+            self.load_state = 'ready'
+            print(f"🎯 Mode: {'YOLOv8 (person+face)' if self.yolo_person or self.yolo_face else 'HOG+Haar fallback'}")
+            print(f"🔍 Detection service ready with tracking ({(time.perf_counter() - started):.1f}s)\n")
+        except Exception as e:
+            traceback.print_exc()
+            self.load_state = 'failed'
+            self.load_error = str(e)
+        finally:
+            self.load_finished_at = datetime.now().isoformat()
+            self.load_seconds = round(time.perf_counter() - started, 2)
+            self.loaded.set()
+
+    def _timed_warmup(self, name, fn):
+        start = time.perf_counter()
+        try:
+            fn()
+            self._record_model(name, True, warmup_ms=(time.perf_counter() - start) * 1000)
+        except Exception as e:
+            print(f"⚠️ Warm-up failed for {name}:", e)
+            self._record_model(name, self.model_status.get(name, {}).get('loaded', False),
+                               warmup_ms=(time.perf_counter() - start) * 1000, error=e)
+
+    def warm_up(self):
+        """Run one inference per loaded model on a synthetic frame"""
+        h, w = WARMUP_FRAME_SIZE
+        frame = np.random.RandomState(0).randint(0, 255, (h, w, 3), dtype=np.uint8)
+        face = cv2.resize(frame[:h // 2, :w // 4], GENDER_NET_INPUT_SIZE)
+
+        if self.yolo_person:
+            self._timed_warmup('yolo_person', lambda: self.yolo_person(frame, verbose=False))
+        if self.yolo_face:
+            self._timed_warmup('yolo_face', lambda: self.yolo_face(frame, verbose=False))
+        if self.hog is not None:
+            self._timed_warmup('hog', lambda: self.hog.detectMultiScale(frame, winStride=(8, 8)))
+        if self.face_cascade is not None:
+            self._timed_warmup('haar_face', lambda: self.face_cascade.detectMultiScale(cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)))
+        if self.gender_net is not None:
+            self._timed_warmup('gender_net', lambda: self.classify_gender_opencv_batch([face]))
+        if self.use_deepface:
+            # First analyze() call builds the face detector and the gender and age networks
+            self._timed_warmup('deepface', lambda: DeepFace.analyze(
+                face, actions=['gender', 'age'], enforce_detection=False,
+                detector_backend=DEEPFACE_DETECTOR_BACKEND, silent=True))
+
+    def readiness(self):
+        return {
+            'ready': self.load_state == 'ready',
+            'state': self.load_state,
+            'load_started_at': self.load_started_at,
+            'load_finished_at': self.load_finished_at,
+            'load_seconds': self.load_seconds,
+            'error': self.load_error,
+            'models': self.model_status,
+        }
 
     def _try_load_yolo_models(self):
         if not YOLO_AVAILABLE:
@@ -269,24 +645,30 @@ class DetectionService:
 
         person_weights_local = os.path.join(self.models_dir, "yolov8n.pt")
         
+        start = time.perf_counter()
         try:
             if os.path.exists(person_weights_local):
-                self.yolo_person = YOLO(person_weights_local)
+                self.yolo_person = load_yolo(person_weights_local)
             else:
-                self.yolo_person = YOLO("yolov8n.pt")
+                self.yolo_person = load_yolo("yolov8n.pt")
             if self.yolo_person:
-                print("✅ YOLO person model loaded")
+                print(f"✅ YOLO person model loaded ({self.yolo_person.inference_backend})")
+            self._record_model('yolo_person', True, load_ms=(time.perf_counter() - start) * 1000)
         except Exception as e:
             print("⚠️ Failed to load YOLO person model:", e)
             self.yolo_person = None
+            self._record_model('yolo_person', False, load_ms=(time.perf_counter() - start) * 1000, error=e)
 
         face_weights_local = os.path.join(self.models_dir, "yolov8n-face.pt")
+        start = time.perf_counter()
         try:
             if os.path.exists(face_weights_local):
-                self.yolo_face = YOLO(face_weights_local)
-                print("✅ YOLO face model loaded")
+                self.yolo_face = load_yolo(face_weights_local)
+                print(f"✅ YOLO face model loaded ({self.yolo_face.inference_backend})")
+                self._record_model('yolo_face', True, load_ms=(time.perf_counter() - start) * 1000)
         except Exception as e:
             self.yolo_face = None
+            self._record_model('yolo_face', False, load_ms=(time.perf_counter() - start) * 1000, error=e)
 
     def _init_hog(self):
         try:
@@ -296,6 +678,10 @@ class DetectionService:
         except Exception as e:
             print("⚠️ Failed to initialize HOG:", e)
 
+    def _init_face_cascade(self):
+        self.face_cascade = cv2.CascadeClassifier(DEFAULT_FACE_CASCADE)
+        print("✅ Haar cascade face detector loaded as fallback")
+
     def _try_load_gender_model(self):
         try:
             model_path = os.path.join(self.models_dir, 'gender_net.caffemodel')
@@ -320,29 +706,50 @@ class DetectionService:
         union = boxAArea + boxBArea - interArea
         return interArea / union if union > 0 else 0
 
+    @staticmethod
+    def _parse_person_result(r):
+        """Extract person boxes from a single ultralytics result"""
+        people = []
+        boxes = getattr(r.boxes, 'xyxy', None)
+        if boxes is None:
+            return people
+        confs = r.boxes.conf.cpu().numpy() if hasattr(r.boxes, 'conf') else None
+        cls_ids = r.boxes.cls.cpu().numpy() if hasattr(r.boxes, 'cls') else None
+        boxes_xyxy = boxes.cpu().numpy() if hasattr(boxes, 'cpu') else np.array(boxes)
+
+        for i, b in enumerate(boxes_xyxy):
+            x1, y1, x2, y2 = map(float, b)
+            conf = float(confs[i]) if confs is not None else 0.0
+            cls_id = int(cls_ids[i]) if cls_ids is not None else 0
+
+            if conf > 0.4 and cls_id == 0:  # Increased confidence threshold
+                people.append(([int(x1), int(y1), int(x2), int(y2)], float(conf)))
+        return people
+
     def detect_people_yolo(self, frame):
         try:
             results = self.yolo_person(frame, verbose=False)
             people = []
             for r in results:
-                boxes = getattr(r.boxes, 'xyxy', None)
-                if boxes is None:
-                    continue
-                confs = r.boxes.conf.cpu().numpy() if hasattr(r.boxes, 'conf') else None
-                cls_ids = r.boxes.cls.cpu().numpy() if hasattr(r.boxes, 'cls') else None
-                boxes_xyxy = boxes.cpu().numpy() if hasattr(boxes, 'cpu') else np.array(boxes)
-                
-                for i, b in enumerate(boxes_xyxy):
-                    x1, y1, x2, y2 = map(float, b)
-                    conf = float(confs[i]) if confs is not None else 0.0
-                    cls_id = int(cls_ids[i]) if cls_ids is not None else 0
-                    
-                    if conf > 0.4 and cls_id == 0:  # Increased confidence threshold
-                        people.append(([int(x1), int(y1), int(x2), int(y2)], float(conf)))
+                people.extend(self._parse_person_result(r))
             return people
         except Exception as e:
             return []
 
+    def detect_people_yolo_batch(self, frames):
+        """
+        Run person detection on several frames with a single YOLO call.
+        Returns one list of (box, conf) per input frame, in the same order.
+        """
+        if not frames:
+            return []
+        try:
+            results = self.yolo_person(list(frames), verbose=False)
+            return [self._parse_person_result(r) for r in results]
+        except Exception as e:
+            print("⚠️ Batched YOLO inference failed, falling back to per-frame:", e)
+            return [self.detect_people_yolo(f) for f in frames]
+
     def detect_faces_yolo(self, frame):
         faces = []
         try:
@@ -363,6 +770,49 @@ class DetectionService:
         except Exception as e:
             return []
 
+    @staticmethod
+    def _face_band(box, frame_shape):
+        """Upper-body band (x1, y1, x2, y2) of a person box, where a face can be"""
+        x1, y1, x2, y2 = box
+        band_h = max(1, int(round((y2 - y1) * FACE_BAND_RATIO)))
+        return (x1, y1, x2, min(frame_shape[0], y1 + band_h))
+
+    def detect_faces_yolo_bands(self, frame, bands):
+        """
+        Best face per upper-body band from one batched YOLO-face call.
+        Returns a list aligned with bands of ([x1, y1, x2, y2], conf) in frame coordinates, or None.
+        """
+        best = [None] * len(bands)
+        crops = [frame[by1:by2, bx1:bx2] for (bx1, by1, bx2, by2) in bands]
+        if not crops:
+            return best
+        try:
+            results = self.yolo_face(crops, imgsz=FACE_BAND_IMGSZ, verbose=False)
+        except Exception as e:
+            return best
+
+        for i, (r, (bx1, by1, _, _)) in enumerate(zip(results, bands)):
+            boxes = getattr(r.boxes, 'xyxy', None)
+            if boxes is None:
+                continue
+            boxes_xyxy = boxes.cpu().numpy() if hasattr(boxes, 'cpu') else np.array(boxes)
+            confs = r.boxes.conf.cpu().numpy() if hasattr(r.boxes, 'conf') else None
+            for j, b in enumerate(boxes_xyxy):
+                conf = float(confs[j]) if confs is not None else 0.0
+                if conf > 0.5 and (best[i] is None or conf > best[i][1]):  # Higher threshold
+                    fx1, fy1, fx2, fy2 = map(int, b)
+                    best[i] = ([fx1 + bx1, fy1 + by1, fx2 + bx1, fy2 + by1], conf)
+        return best
+
+    def _detect_face_haar_band(self, frame, band):
+        """Largest Haar face inside an upper-body band, in frame coordinates, or None"""
+        bx1, by1, bx2, by2 = band
+        haar_faces = self.detect_faces_haar(frame[by1:by2, bx1:bx2])
+        if not haar_faces:
+            return None
+        (fx1, fy1, fx2, fy2), fconf = max(haar_faces, key=lambda t: (t[0][2]-t[0][0])*(t[0][3]-t[0][1]))
+        return ([bx1 + fx1, by1 + fy1, bx1 + fx2, by1 + fy2], fconf)
+
     def detect_people_hog(self, frame):
         try:
             boxes, weights = self.hog.detectMultiScale(frame, winStride=(8, 8), padding=(8, 8), scale=1.05)
@@ -386,7 +836,8 @@ class DetectionService:
         if not self.use_deepface or face_roi is None or face_roi.size == 0:
             return None
         try:
-            analysis = DeepFace.analyze(face_roi, actions=['gender', 'age'], enforce_detection=False, detector_backend='opencv', silent=True)
+            analysis = DeepFace.analyze(face_roi, actions=['gender', 'age'], enforce_detection=False,
+                                        detector_backend=DEEPFACE_DETECTOR_BACKEND, silent=True)
             if isinstance(analysis, list):
                 analysis = analysis[0]
             
@@ -403,18 +854,33 @@ class DetectionService:
             return None
 
     def classify_gender_opencv(self, face_roi):
+        return self.classify_gender_opencv_batch([face_roi])[0]
+
+    def classify_gender_opencv_batch(self, face_rois):
+        """
+        Classify many face crops with one blobFromImages tensor and one forward pass.
+        Returns one result (or None) per input crop, in order.
+        """
+        results = [None] * len(face_rois)
         if self.gender_net is None:
-            return None
+            return results
+
+        valid = [i for i, roi in enumerate(face_rois) if roi is not None and roi.size > 0]
+        if not valid:
+            return results
         try:
-            blob = cv2.dnn.blobFromImage(face_roi, 1.0, (227, 227), (78.4263377603, 87.7689143744, 114.895847746), swapRB=False)
+            blob = cv2.dnn.blobFromImages([face_rois[i] for i in valid], 1.0, GENDER_NET_INPUT_SIZE,
+                                          GENDER_NET_MEAN, swapRB=False)
             self.gender_net.setInput(blob)
             preds = self.gender_net.forward()
-            idx = int(np.argmax(preds[0]))
-            conf = float(preds[0][idx])
-            gender = self.gender_list[idx] if idx < len(self.gender_list) else 'male'
-            return {'gender': gender, 'confidence': conf, 'age': None}
+            for i, pred in zip(valid, preds):
+                idx = int(np.argmax(pred))
+                conf = float(pred[idx])
+                gender = self.gender_list[idx] if idx < len(self.gender_list) else 'male'
+                results[i] = {'gender': gender, 'confidence': conf, 'age': None}
         except Exception as e:
-            return None
+            pass
+        return results
 
     def classify_gender_heuristic(self, roi):
         try:
@@ -424,16 +890,87 @@ class DetectionService:
         except Exception:
             return {'gender': 'unknown', 'confidence': 0.5, 'age': None}
 
-    def detect_and_classify(self, frame):
+    def detect_people(self, frame):
+        if self.yolo_person:
+            return self.detect_people_yolo(frame)
+        elif self.hog:
+            return self.detect_people_hog(frame)
+        return []
+
+    def classify_persons(self, items):
+        """
+        Gender/age for many persons at once.
+        items: list of (frame, person_roi, face_info)
+        Face crops go to DeepFace (one call per crop; the pinned DeepFace has no batch API),
+        whatever is left goes to the OpenCV gender net in a single batched forward pass,
+        and persons without a usable face fall back to the body heuristic.
+        """
+        results = [None] * len(items)
+
+        face_crops = []  # (item index, face roi)
+        for i, (frame, person_roi, face_info) in enumerate(items):
+            if not face_info:
+                continue
+            try:
+                fid = face_info['bbox']
+                fr = frame[fid[1]:fid[1]+fid[3], fid[0]:fid[0]+fid[2]]
+                if fr.size == 0:
+                    fr = person_roi
+            except:
+                fr = person_roi
+            face_crops.append((i, fr))
+
+        if self.use_deepface:
+            for i, fr in face_crops:
+                results[i] = self.classify_gender_deepface(fr)
+
+        pending = [(i, fr) for i, fr in face_crops if results[i] is None]
+        if pending and self.gender_net is not None:
+            batch = self.classify_gender_opencv_batch([fr for _, fr in pending])
+            for (i, _), info in zip(pending, batch):
+                results[i] = info
+
+        for i, (frame, person_roi, face_info) in enumerate(items):
+            if results[i] is None:
+                results[i] = self.classify_gender_heuristic(person_roi)
+        return results
+
+    def classify_person(self, frame, person_roi, face_info):
+        """Gender/age for one person: face model(s) when a face is known, body heuristic otherwise"""
+        return self.classify_persons([(frame, person_roi, face_info)])[0]
+
+    def classify_detections(self, dets):
+        """Batch classifier callback for PersonTracker.update on detections built with classify=False"""
+        items = []
+        for det in dets:
+            crops = det['_crops']
+            items.append((crops['frame'], crops['person_roi'], crops['face_info']))
+        return self.classify_persons(items)
+
+    @staticmethod
+    def _inference_size(inference_size):
+        size = int(inference_size or DEFAULT_INFERENCE_SIZE)
+        return max(MIN_INFERENCE_SIZE, size)
+
+    @staticmethod
+    def _unscale_detections(dets, scale):
+        return [(unscale_box(box, scale), conf) for (box, conf) in dets]
+
+    def detect_and_classify(self, frame, people=None, classify=True, inference_size=None):
+        """
+        Detect persons, faces and gender in a frame.
+        people: optional precomputed [(box, conf)] in full-frame coordinates (e.g. from a batched call)
+        classify: False skips gender/age and attaches face quality + crops so the
+                  tracker can classify once per track instead of once per frame
+        inference_size: longest side used for the person detector; face bands, crops
+                        and returned boxes always use the full-resolution frame
+        """
         detections = []
 
         # Detect people
-        if self.yolo_person:
-            people = self.detect_people_yolo(frame)
-        elif self.hog:
-            people = self.detect_people_hog(frame)
-        else:
-            people = []
+        if people is None:
+            infer_frame, scale = resize_to_max_dim(frame, self._inference_size(inference_size))
+            people = self._unscale_detections(self.detect_people(infer_frame), scale)
 
         # Normalize person boxes
         peoplexy = []
@@ -445,70 +982,29 @@ class DetectionService:
                 if x2 > x1 and y2 > y1:
                     peoplexy.append(((x1, y1, x2, y2), float(conf)))
 
-        # Detect faces globally
-        face_boxes = []
+        # Faces are only searched in the upper-body band of each person; with
+        # YOLO-face all bands of the frame go through one batched call
+        bands = [self._face_band(pbox, frame.shape) for pbox, _ in peoplexy]
         if self.yolo_face:
-            face_boxes = self.detect_faces_yolo(frame)
+            band_faces = self.detect_faces_yolo_bands(frame, bands)
+        else:
+            band_faces = [self._detect_face_haar_band(frame, band) for band in bands]
 
         # Process each person
         for idx, (pbox, pconf) in enumerate(peoplexy):
             x1, y1, x2, y2 = pbox
-            person_roi = frame[y1:y2, x1:x2].copy()
+            person_roi = frame[y1:y2, x1:x2]  # view; only read by the classifiers
             has_face = False
             face_info = None
 
-            # Try to associate face
-            if face_boxes:
-                best_face = None
-                best_iou = 0.0
-                for (fb, fconf) in face_boxes:
-                    fx1, fy1, fx2, fy2 = fb
-                    iou_val = self.iou((x1, y1, x2, y2), (fx1, fy1, fx2, fy2))
-                    if iou_val > best_iou:
-                        best_iou = iou_val
-                        best_face = (fb, fconf)
-                
-                if best_face and best_iou > 0.05:
-                    has_face = True
-                    (fx1, fy1, fx2, fy2), fconf = best_face
-                    fx1c = max(0, fx1); fy1c = max(0, fy1)
-                    fx2c = min(frame.shape[1], fx2); fy2c = min(frame.shape[0], fy2)
-                    face_roi = frame[fy1c:fy2c, fx1c:fx2c].copy()
-                    face_info = {'bbox': [int(fx1c), int(fy1c), int(fx2c-fx1c), int(fy2c-fy1c)], 'confidence': float(fconf)}
-            else:
-                # Fallback to Haar
-                try:
-                    haar_faces = self.detect_faces_haar(person_roi)
-                    if haar_faces:
-                        (fx1r, fy1r, fx2r, fy2r), fconf = max(haar_faces, key=lambda t: (t[0][2]-t[0][0])*(t[0][3]-t[0][1]))
-                        fx1g = x1 + fx1r
-                        fy1g = y1 + fy1r
-                        fx2g = x1 + fx2r
-                        fy2g = y1 + fy2r
-                        has_face = True
-                        face_roi = frame[fy1g:fy2g, fx1g:fx2g].copy()
-                        face_info = {'bbox': [int(fx1g), int(fy1g), int(fx2g-fx1g), int(fy2g-fy1g)], 'confidence': float(fconf)}
-                except:
-                    pass
-
-            # Classify gender
-            gender_info = None
-            if has_face and face_info:
-                try:
-                    fid = face_info['bbox']
-                    fr = frame[fid[1]:fid[1]+fid[3], fid[0]:fid[0]+fid[2]].copy()
-                    if fr.size == 0:
-                        fr = person_roi
-                except:
-                    fr = person_roi
-                
-                if self.use_deepface:
-                    gender_info = self.classify_gender_deepface(fr)
-                if gender_info is None and self.gender_net:
-                    gender_info = self.classify_gender_opencv(fr)
-            
-            if gender_info is None:
-                gender_info = self.classify_gender_heuristic(person_roi)
+            best_face = band_faces[idx]
+            if best_face is not None:
+                (fx1, fy1, fx2, fy2), fconf = best_face
+                has_face = True
+                face_info = {'bbox': [int(fx1), int(fy1), int(fx2-fx1), int(fy2-fy1)], 'confidence': float(fconf)}
+
+            # Gender is filled in below in one batch (or left to the tracker)
+            gender_info = {'gender': 'unknown', 'confidence': 0.0, 'age': None}
 
             # Build detection record
             det = {
@@ -524,24 +1020,61 @@ class DetectionService:
                     'age': int(gender_info['age']) if gender_info and gender_info.get('age') else None
                 }
             }
+            # Transient: consumed by classify_detections, never serialized
+            det['_crops'] = {'frame': frame, 'person_roi': person_roi, 'face_info': face_info}
+            if not classify:
+                det['metadata']['face_quality'] = face_quality(face_info)
             detections.append(det)
 
+        if classify:
+            self.apply_classification(detections)
+
+        return detections
+
+    def apply_classification(self, detections):
+        """Classify gender/age for detections built with classify=False in one batch (any number of frames)"""
+        infos = self.classify_detections(detections) if detections else []
+        for det, gender_info in zip(detections, infos):
+            det['gender'] = str(gender_info.get('gender', 'unknown'))
+            det['confidence_score'] = float(gender_info.get('confidence', 0.0))
+            det['metadata']['age'] = int(gender_info['age']) if gender_info.get('age') else None
+            det['metadata'].pop('face_quality', None)
+            del det['_crops']
         return detections
 
-    def process_frame(self, frame, camera_id=None):
+    def process_frame(self, frame, camera_id=None, inference_size=None):
         if frame is None or frame.size == 0:
             return {'success': False, 'message': 'Invalid frame'}
 
-        max_dim = 1280
-        h, w = frame.shape[:2]
-        if max(h, w) > max_dim:
-            scale = max_dim / max(h, w)
-            frame = cv2.resize(frame, (int(w*scale), int(h*scale)))
+        detections = self.detect_and_classify(frame, inference_size=inference_size)
+        return self._frame_result(detections, camera_id)
 
-        detections = self.detect_and_classify(frame)
-        
+    def process_frames(self, frames, camera_id=None, inference_size=None):
+        """
+        Detect and classify a list of frames with one batched person-detector call
+        and one gender classification batch. Returns per-frame results in input order.
+        """
+        valid = [i for i, f in enumerate(frames) if f is not None and f.size > 0]
+        size = self._inference_size(inference_size)
+        valid_frames = [frames[i] for i in valid]
+        people_per_frame = self._detect_people_batch(valid_frames, size)
+
+        per_frame = []
+        for frame, people in zip(valid_frames, people_per_frame):
+            per_frame.append(self.detect_and_classify(frame, people=people, classify=False, inference_size=size))
+        self.apply_classification([det for dets in per_frame for det in dets])
+
+        results = [{'success': False, 'message': 'Invalid frame'} for _ in frames]
+        for i, detections in zip(valid, per_frame):
+            results[i] = self._frame_result(detections, camera_id, frame_index=i)
+        return results
+
+    def _frame_result(self, detections, camera_id=None, frame_index=None):
+        prefix = f"det_{camera_id}_{int(datetime.now().timestamp())}"
+        if frame_index is not None:
+            prefix = f"{prefix}_f{frame_index}"
         for i, d in enumerate(detections):
-            d['detection_id'] = f"det_{camera_id}_{int(datetime.now().timestamp())}_{i}"
+            d['detection_id'] = f"{prefix}_{i}"
             d['detection_time'] = datetime.now().isoformat()
             d['camera_id'] = str(camera_id) if camera_id else None
 
@@ -557,10 +1090,48 @@ class DetectionService:
             'timestamp': datetime.now().isoformat()
         }
 
-    def process_video(self, video_path, job_id=None, min_frames_for_counting=5):
+    def _detect_people_batch(self, frames, inference_size):
+        """Person boxes for each frame (original coordinates) from one batched detector call"""
+        if not frames:
+            return []
+        resized = [resize_to_max_dim(f, inference_size) for f in frames]
+        infer_frames = [r[0] for r in resized]
+
+        if self.yolo_person:
+            people_per_frame = self.detect_people_yolo_batch(infer_frames)
+        else:
+            people_per_frame = [self.detect_people(f) for f in infer_frames]
+        return [self._unscale_detections(people, scale)
+                for people, (_, scale) in zip(people_per_frame, resized)]
+
+    def _process_batch(self, frames, frame_numbers, tracker, inference_size=None):
+        """
+        Detect persons on a batch of sampled frames and feed the tracker in frame order.
+        Returns the wall time (seconds) spent on the batch.
+        """
+        batch_start = time.perf_counter()
+
+        size = self._inference_size(inference_size)
+        people_per_frame = self._detect_people_batch(frames, size)
+
+        for frame, frame_number, people in zip(frames, frame_numbers, people_per_frame):
+            detections = self.detect_and_classify(frame, people=people, classify=False, inference_size=size)
+            tracker.update(detections, frame_number, classify=self.classify_detections)
+
+        return time.perf_counter() - batch_start
+
+    def process_video(self, video_path, job_id=None, min_frames_for_counting=5, batch_size=None,
+                      should_cancel=None, gender_refresh_budget=None, sample_by_timestamp=True,
+                      inference_size=None, progress_callback=None):
         """
         Process video with person tracking
         min_frames_for_counting: minimum frames a person must appear to be counted (reduces false positives)
+        batch_size: number of sampled frames sent to the person detector per call
+        gender_refresh_budget: max face-based gender/age classifications per track
+        should_cancel: optional callable checked before every batch; processing stops when it returns True
+        sample_by_timestamp: sample on media time (VFR-safe) instead of every N-th frame
+        inference_size: longest side of the frames given to the detectors (boxes are reported in original coordinates)
+        progress_callback: optional callable(event) receiving rate-limited progress events (see utils/progress.py)
         """
         cap = cv2.VideoCapture(video_path)
         if not cap.isOpened():
@@ -570,32 +1141,60 @@ class DetectionService:
         total_frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT) or 0)
         duration = total_frames / fps if fps > 0 else 0
 
+        batch_size = int(batch_size or DEFAULT_VIDEO_BATCH_SIZE)
+        batch_size = max(1, min(batch_size, MAX_VIDEO_BATCH_SIZE))
+        inference_size = self._inference_size(inference_size)
+
+        if gender_refresh_budget is None:
+            gender_refresh_budget = DEFAULT_GENDER_REFRESH_BUDGET
+
         # Initialize tracker
-        tracker = PersonTracker(max_disappeared=int(fps * 2), min_confidence=0.6)
+        tracker = PersonTracker(max_disappeared=int(fps * 2), min_confidence=0.6,
+                                max_classifications=max(1, int(gender_refresh_budget)))
         
-        frame_count = 0
-        process_every_n_frames = max(1, int(fps / 4))  # Process 4 times per second
+        processed_frames = 0
+        sampler = FrameSampler(cap, sample_fps=VIDEO_SAMPLE_FPS, by_timestamp=sample_by_timestamp)
+        frame_timestamps = {}  # sampled frame index -> media time (seconds)
+
+        batch_frames = []
+        batch_frame_numbers = []
+        batch_latencies = []
+        start_time = time.perf_counter()
+        sinks = [log_sink()] + ([progress_callback] if progress_callback else [])
+        progress = ProgressReporter(sinks, total_frames=total_frames, job_id=job_id)
         
         print(f"📹 Processing video: {total_frames} frames at {fps} FPS")
-        print(f"⚙️ Processing every {process_every_n_frames} frames")
-
-        while cap.isOpened():
-            ret, frame = cap.read()
-            if not ret:
-                break
-
-            if frame_count % process_every_n_frames == 0:
-                detections = self.detect_and_classify(frame)
-                tracker.update(detections, frame_count)
-                
-                # Progress indicator
-                if frame_count % (process_every_n_frames * 10) == 0:
-                    progress = (frame_count / total_frames * 100) if total_frames > 0 else 0
-                    print(f"Progress: {progress:.1f}% (Frame {frame_count}/{total_frames})")
-
-            frame_count += 1
-
+        print(f"⚙️ Sampling {VIDEO_SAMPLE_FPS:g} frames/s by {'timestamp' if sample_by_timestamp else 'frame index'} "
+              f"(batch size {batch_size})")
+
+        for frame_index, timestamp, frame in sampler:
+            batch_frames.append(frame)
+            batch_frame_numbers.append(frame_index)
+            frame_timestamps[frame_index] = timestamp
+
+            if len(batch_frames) >= batch_size:
+                if should_cancel is not None and should_cancel():
+                    cap.release()
+                    progress.finish(sampler.frames_read, tracker.running_counts(min_frames_for_counting), status='cancelled')
+                    print(f"🛑 Video job {job_id} cancelled at frame {frame_index}")
+                    return {'success': False, 'cancelled': True, 'message': 'Job cancelled'}
+                batch_latencies.append(self._process_batch(batch_frames, batch_frame_numbers, tracker, inference_size))
+                processed_frames += len(batch_frames)
+                batch_frames = []
+                batch_frame_numbers = []
+
+            # Progress events (rate-limited by the reporter)
+            if progress.due():
+                progress.update(sampler.frames_read, tracker.running_counts(min_frames_for_counting))
+
+        if batch_frames:
+            batch_latencies.append(self._process_batch(batch_frames, batch_frame_numbers, tracker, inference_size))
+            processed_frames += len(batch_frames)
+
+        frame_count = sampler.frames_read
         cap.release()
+        elapsed = time.perf_counter() - start_time
+        progress.finish(frame_count, tracker.running_counts(min_frames_for_counting))
         
         # Get final unique counts
         final_counts = tracker.get_final_counts(min_frames_seen=min_frames_for_counting)
@@ -613,10 +1212,12 @@ class DetectionService:
                 'person_id': person['person_id'],
                 'gender': person['gender'],
                 'direction': 'IN',
-                'detection_time': str(timedelta(seconds=int(person['first_seen_frame']/fps))),
+                'detection_time': str(timedelta(seconds=int(
+                    frame_timestamps.get(person['first_seen_frame'], person['first_seen_frame'] / fps)))),
                 'frame_number': int(person['first_seen_frame']),
                 'confidence_score': float(person['confidence']),
                 'metadata': {
+                    'age': int(person['age']) if person.get('age') else None,
                     'frames_seen': int(person['frames_seen']),
                     'first_seen_frame': int(person['first_seen_frame']),
                     'last_seen_frame': int(person['last_seen_frame']),
@@ -636,7 +1237,17 @@ class DetectionService:
                 'male_percentage': float((final_counts['male_count'] / final_counts['total_count'] * 100) if final_counts['total_count'] > 0 else 0),
                 'female_percentage': float((final_counts['female_count'] / final_counts['total_count'] * 100) if final_counts['total_count'] > 0 else 0),
                 'total_frames': int(frame_count),
-                'processed_frames': int(frame_count // process_every_n_frames),
+                'processed_frames': int(processed_frames),
+                'sampling': 'timestamp' if sample_by_timestamp else 'frame_index',
+                'inference_size': int(inference_size),
+                'batch_size': int(batch_size),
+                'batches': len(batch_latencies),
+                'avg_batch_latency_ms': float(np.mean(batch_latencies) * 1000) if batch_latencies else 0.0,
+                'max_batch_latency_ms': float(np.max(batch_latencies) * 1000) if batch_latencies else 0.0,
+                'processing_time_seconds': float(elapsed),
+                'processing_fps': float(processed_frames / elapsed) if elapsed > 0 else 0.0,
+                'gender_classifications': int(tracker.classification_calls),
+                'gender_refresh_budget': int(tracker.max_classifications),
                 'duration_seconds': float(duration),
                 'fps': float(fps),
                 'detection_method': 'yolov8_with_tracking' if self.yolo_person else 'hog_with_tracking',
@@ -647,24 +1258,112 @@ class DetectionService:
 
 
 # Flask Application
-app = Flask(__name__)
-CORS(app)
-
 UPLOAD_FOLDER = tempfile.gettempdir()
 ALLOWED_EXTENSIONS = {'mp4', 'avi', 'mov', 'mkv', 'webm'}
+MAX_UPLOAD_MB = int(os.environ.get('DETECTION_MAX_UPLOAD_MB', 1024))
+MAX_UPLOAD_BYTES = MAX_UPLOAD_MB * 1024 * 1024
+
+# /jobs/<id>/events: how often the SSE stream checks for new progress, keep-alive period
+SSE_POLL_INTERVAL = 0.5
+SSE_HEARTBEAT_SECONDS = 15
+
+# /detect-frames: frames per request, size of one encoded frame, parallel JPEG decoders
+MAX_BATCH_FRAMES = int(os.environ.get('DETECTION_MAX_BATCH_FRAMES', 32))
+MAX_FRAME_BYTES = 16 * 1024 * 1024
+FRAME_DECODE_WORKERS = int(os.environ.get('DETECTION_DECODE_WORKERS', 4))
+# cv2.imdecode releases the GIL, so threads decode in parallel
+frame_decode_pool = ThreadPoolExecutor(max_workers=FRAME_DECODE_WORKERS, thread_name_prefix='frame-decode')
 
 def allowed_file(filename):
     return '.' in filename and filename.rsplit('.', 1)[1].lower() in ALLOWED_EXTENSIONS
 
-print("="*60)
-print("🚀 Starting Detection Service (YOLOv8 with Tracking)")
-print("="*60)
 
-detector = DetectionService()
+class StreamingUploadRequest(Request):
+    """
+    Multipart video parts are written straight to a unique temp file while the
+    body is parsed, hashed and size-checked on the fly, instead of being
+    spooled first and copied with file.save().
+    """
+
+    def _get_file_stream(self, total_content_length, content_type, filename=None, content_length=None):
+        if filename and allowed_file(filename):
+            upload = HashingTempFile(
+                UPLOAD_FOLDER,
+                suffix='.' + filename.rsplit('.', 1)[1].lower(),
+                max_bytes=MAX_UPLOAD_BYTES
+            )
+            if not hasattr(self, 'upload_temp_files'):
+                self.upload_temp_files = []
+            self.upload_temp_files.append(upload)
+            return upload
+        return super()._get_file_stream(total_content_length, content_type, filename, content_length)
+
+
+app = Flask(__name__)
+app.request_class = StreamingUploadRequest
+# Reject oversized bodies from Content-Length before reading (1 MB slack for form fields)
+app.config['MAX_CONTENT_LENGTH'] = MAX_UPLOAD_BYTES + 1024 * 1024
+CORS(app)
+
+
+@app.errorhandler(UploadTooLargeError)
+def upload_too_large(e):
+    return jsonify({'success': False, 'message': str(e)}), 413
+
+
+@app.teardown_request
+def discard_unclaimed_uploads(exc=None):
+    # Temp files that were not handed to the job queue (errors, rejected requests)
+    for upload in getattr(request, 'upload_temp_files', []):
+        if not upload.keep:
+            upload.discard()
 
-print("="*60)
-print("✅ Detection Service Ready")
-print("="*60)
+detector = None
+job_manager = None
+result_cache = None
+
+# Job pool workers import this module for DetectionService; only the server
+# process builds the shared frame detector and the worker pool.
+# Models load on a background thread (and in each worker) so the server binds
+# immediately; /api/detection/ready reports when they are loaded and warmed up.
+if multiprocessing.parent_process() is None:
+    print("="*60)
+    print("🚀 Starting Detection Service (YOLOv8 with Tracking)")
+    print("="*60)
+
+    detector = DetectionService(lazy=True)
+    detector.start_loading()
+    result_cache = ResultCache()
+    job_manager = VideoJobManager(result_cache=result_cache)
+    job_manager.prestart()
+
+    print("="*60)
+    print("⏳ Models loading in background, poll /api/detection/ready")
+    print("="*60)
+
+
+def not_ready_response():
+    return jsonify({
+        'success': False,
+        'message': 'Detection models are still loading',
+        'ready': detector.readiness()
+    }), 503
+
+
+def job_response(job_id, http_status=200):
+    status, result = job_manager.result(job_id)
+    if status is None:
+        return jsonify({'success': False, 'message': 'Unknown job'}), 404
+
+    if status['status'] not in ('completed', 'failed', 'cancelled'):
+        return jsonify({'success': True, 'job': status}), 202
+
+    if result is None:
+        result = {'success': False, 'message': status['error'] or status['status']}
+    response = dict(result)
+    response['job'] = status
+    response['cache_hit'] = status.get('cache_hit', False)
+    return jsonify(convert_to_serializable(response)), http_status
 
 
 @app.route('/api/detection/process-video', methods=['POST'])
@@ -680,30 +1379,145 @@ def process_video():
         return jsonify({'success': False, 'message': 'Invalid file type'}), 400
     
     try:
-        filepath = os.path.join(UPLOAD_FOLDER, file.filename)
-        file.save(filepath)
-        job_id = f"job_{int(datetime.now().timestamp())}"
+        upload = file.stream
+        if not isinstance(upload, HashingTempFile):
+            # Body was parsed without the streaming request class; copy it in chunks
+            upload = stream_to_temp(upload, UPLOAD_FOLDER, suffix='.' + file.filename.rsplit('.', 1)[1].lower(),
+                                    max_bytes=MAX_UPLOAD_BYTES)
+            request.upload_temp_files = getattr(request, 'upload_temp_files', []) + [upload]
+        upload.close()
+        filepath = upload.path
         
         # Get min_frames parameter (default: 5 frames to count as valid person)
         min_frames = int(request.form.get('min_frames_for_counting', 5))
+        batch_size = int(request.form.get('batch_size', DEFAULT_VIDEO_BATCH_SIZE))
+        gender_refresh_budget = int(request.form.get('gender_refresh_budget', DEFAULT_GENDER_REFRESH_BUDGET))
+        inference_size = int(request.form.get('inference_size', DEFAULT_INFERENCE_SIZE))
+        # wait=true keeps the old blocking behaviour (still bounded by the worker pool)
+        wait = str(request.form.get('wait', 'false')).lower() in ('1', 'true', 'yes')
+        # use_cache=false forces reprocessing of a previously seen upload
+        use_cache = str(request.form.get('use_cache', 'true')).lower() in ('1', 'true', 'yes')
+        params = {
+            'min_frames_for_counting': min_frames,
+            'batch_size': batch_size,
+            'gender_refresh_budget': gender_refresh_budget,
+            'inference_size': inference_size,
+        }
+
+        cache_key = make_key(
+            upload.sha256,
+            dict(params, sample_fps=VIDEO_SAMPLE_FPS, inference_backend=INFERENCE_BACKEND,
+                 tracker_assignment=TRACKER_ASSIGNMENT, gender_refresh_min_gain=GENDER_REFRESH_MIN_GAIN,
+                 face_band_ratio=FACE_BAND_RATIO, face_band_imgsz=FACE_BAND_IMGSZ),
+            model_version(detector.models_dir)
+        )
+        cached = result_cache.get(cache_key) if use_cache else None
+        if cached is not None:
+            try:
+                os.remove(filepath)
+            except:
+                pass
+            print(f"♻️ Result cache hit for {file.filename}")
+            job_id = job_manager.add_cached(cached, params)
+            return job_response(job_id)
         
-        print(f"📹 Processing video: {file.filename}")
+        print(f"📹 Queueing video: {file.filename} ({upload.size / (1024 * 1024):.1f} MB)")
         print(f"⚙️ Min frames for counting: {min_frames}")
         
-        result = detector.process_video(filepath, job_id, min_frames_for_counting=min_frames)
-        
         try:
-            os.remove(filepath)
-        except:
-            pass
-        
-        return jsonify(convert_to_serializable(result))
+            job_id = job_manager.submit(filepath, params, cache_key=cache_key)
+            # The job queue owns (and later deletes) the file now
+            upload.keep = True
+        except QueueFullError as e:
+            try:
+                os.remove(filepath)
+            except:
+                pass
+            return jsonify({'success': False, 'message': str(e)}), 429
+
+        if wait:
+            job_manager.wait(job_id)
+            return job_response(job_id)
+
+        return jsonify({
+            'success': True,
+            'job_id': job_id,
+            'status': 'queued',
+            'status_url': f"/api/detection/jobs/{job_id}",
+            'result_url': f"/api/detection/jobs/{job_id}/result",
+            'cancel_url': f"/api/detection/jobs/{job_id}/cancel",
+            'events_url': f"/api/detection/jobs/{job_id}/events"
+        }), 202
     
+    except UploadTooLargeError as e:
+        return jsonify({'success': False, 'message': str(e)}), 413
     except Exception as e:
         traceback.print_exc()
         return jsonify({'success': False, 'message': str(e)}), 500
 
 
+@app.route('/api/detection/jobs/<job_id>', methods=['GET'])
+def get_job_status(job_id):
+    status = job_manager.status(job_id)
+    if status is None:
+        return jsonify({'success': False, 'message': 'Unknown job'}), 404
+    return jsonify({'success': True, 'job': status})
+
+
+@app.route('/api/detection/jobs/<job_id>/result', methods=['GET'])
+def get_job_result(job_id):
+    return job_response(job_id)
+
+
+@app.route('/api/detection/jobs/<job_id>/events', methods=['GET'])
+def job_events(job_id):
+    """
+    Server-sent events for a video job: 'progress' events (frames, percentage,
+    fps, ETA, running counts) as the worker reports them, a 'done' event when
+    processing ends and a final 'status' event with the job snapshot.
+    """
+    if job_manager.status(job_id) is None:
+        return jsonify({'success': False, 'message': 'Unknown job'}), 404
+
+    def sse(event, data):
+        return f"event: {event}\ndata: {json.dumps(convert_to_serializable(data))}\n\n"
+
+    def stream():
+        last_sent = None
+        last_write = time.time()
+        while True:
+            status = job_manager.status(job_id)
+            if status is None:
+                yield sse('error', {'message': 'Unknown job'})
+                return
+
+            event = job_manager.progress(job_id)
+            if event is not None and event.get('timestamp') != last_sent:
+                last_sent = event.get('timestamp')
+                last_write = time.time()
+                yield sse(event.get('event', 'progress'), event)
+
+            if status['status'] in FINISHED_STATES:
+                yield sse('status', status)
+                return
+
+            if time.time() - last_write >= SSE_HEARTBEAT_SECONDS:
+                last_write = time.time()
+                yield ": keep-alive\n\n"
+            time.sleep(SSE_POLL_INTERVAL)
+
+    return Response(stream_with_context(stream()), mimetype='text/event-stream',
+                    headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
+
+@app.route('/api/detection/jobs/<job_id>/cancel', methods=['POST'])
+def cancel_job(job_id):
+    status = job_manager.cancel(job_id)
+    if status is None:
+        return jsonify({'success': False, 'message': 'Unknown job'}), 404
+    return jsonify({'success': True, 'job': status})
+
+
 @app.route('/api/detection/detect-frame', methods=['POST'])
 def detect_frame():
     if 'frame' not in request.files:
@@ -712,11 +1526,15 @@ def detect_frame():
     try:
         file = request.files['frame']
         camera_id = request.form.get('camera_id')
+        inference_size = int(request.form.get('inference_size', DEFAULT_INFERENCE_SIZE))
+
+        if not detector.loaded.is_set():
+            return not_ready_response()
         
         file_bytes = np.frombuffer(file.read(), np.uint8)
         frame = cv2.imdecode(file_bytes, cv2.IMREAD_COLOR)
         
-        result = detector.process_frame(frame, camera_id)
+        result = detector.process_frame(frame, camera_id, inference_size=inference_size)
         return jsonify(convert_to_serializable(result))
     
     except Exception as e:
@@ -724,6 +1542,54 @@ def detect_frame():
         return jsonify({'success': False, 'message': str(e)}), 500
 
 
+@app.route('/api/detection/detect-frames', methods=['POST'])
+def detect_frames():
+    """
+    Batch variant of detect-frame. Frames are sent either as multipart parts
+    (field 'frames', repeated) or as an application/octet-stream body of
+    [4-byte big-endian length][JPEG] records. Results come back in input order.
+    """
+    try:
+        if request.mimetype == 'application/octet-stream':
+            camera_id = request.args.get('camera_id')
+            inference_size = int(request.args.get('inference_size', DEFAULT_INFERENCE_SIZE))
+            try:
+                blobs = read_length_prefixed(request.stream, MAX_BATCH_FRAMES, MAX_FRAME_BYTES)
+            except ValueError as e:
+                return jsonify({'success': False, 'message': str(e)}), 400
+        else:
+            camera_id = request.form.get('camera_id')
+            inference_size = int(request.form.get('inference_size', DEFAULT_INFERENCE_SIZE))
+            parts = request.files.getlist('frames')
+            if len(parts) > MAX_BATCH_FRAMES:
+                return jsonify({'success': False, 'message': f"At most {MAX_BATCH_FRAMES} frames per request"}), 400
+            blobs = [part.read() for part in parts]
+
+        if not blobs:
+            return jsonify({'success': False, 'message': 'No frames'}), 400
+
+        if not detector.loaded.is_set():
+            return not_ready_response()
+
+        start = time.perf_counter()
+        frames = list(frame_decode_pool.map(decode_image, blobs))
+        decode_ms = (time.perf_counter() - start) * 1000
+
+        results = detector.process_frames(frames, camera_id, inference_size=inference_size)
+
+        return jsonify(convert_to_serializable({
+            'success': True,
+            'frame_count': len(results),
+            'results': results,
+            'decode_time_ms': round(decode_ms, 1),
+            'processing_time_ms': round((time.perf_counter() - start) * 1000, 1)
+        }))
+
+    except Exception as e:
+        traceback.print_exc()
+        return jsonify({'success': False, 'message': str(e)}), 500
+
+
 @app.route('/api/detection/health', methods=['GET'])
 def health_check():
     return jsonify({
@@ -733,10 +1599,29 @@ def health_check():
         'deepface_available': DEEPFACE_AVAILABLE,
         'opencv_gender_model': detector.gender_net is not None,
         'detection_mode': 'yolov8_tracking' if (detector.yolo_person or detector.yolo_face) else 'hog_tracking',
-        'tracking_enabled': True
+        'tracking_enabled': True,
+        'models_ready': detector.load_state == 'ready',
+        'video_jobs': job_manager.stats(),
+        'result_cache': result_cache.stats()
     })
 
 
+@app.route('/api/detection/ready', methods=['GET'])
+def readiness_check():
+    """
+    Readiness (as opposed to liveness on /health): 200 once the frame detector
+    and every video worker have loaded and warmed up their models, 503 before.
+    """
+    models = detector.readiness()
+    workers = job_manager.worker_readiness()
+    ready = models['ready'] and workers['ready'] >= workers['total']
+    return jsonify(convert_to_serializable({
+        'ready': ready,
+        'detector': models,
+        'video_workers': workers
+    })), (200 if ready else 503)
+
+
 @app.route('/api/detection/capabilities', methods=['GET'])
 def get_capabilities():
     return jsonify({
@@ -744,9 +1629,13 @@ def get_capabilities():
         'face_detection': 'YOLOv8-face' if detector.yolo_face else 'Haarcascade',
         'gender_detection': 'DeepFace' if detector.use_deepface else ('OpenCV DNN' if detector.gender_net else 'Heuristic'),
         'supports_age': bool(detector.use_deepface),
+        'inference_backend': getattr(detector.yolo_person, 'inference_backend', None),
         'tracking_enabled': True,
         'tracking_method': 'IoU + Centroid Distance',
-        'max_video_size_mb': 1024,
+        'async_video_jobs': True,
+        'batch_frames': MAX_BATCH_FRAMES,
+        'result_cache': True,
+        'max_video_size_mb': MAX_UPLOAD_MB,
         'supported_formats': list(ALLOWED_EXTENSIONS)
     })
 
@@ -9,15 +9,27 @@ Usage:
 
 2) Vertical line (for horizontal movement - objects moving left/right):
    python line_counter.py --source video.mp4 --line-type vertical --line-pos 600
+
+3) Any number of arbitrary (also diagonal) lines, optionally with a direction:
+   python line_counter.py --source video.mp4 --line 0,400,1280,400,down --line 900,0,1200,720
 """
 
 import argparse
+import os
+import sys
 import time
-from typing import List, Tuple, Dict, Optional, Set
+from typing import Callable, List, Tuple, Dict, Optional, Set
 
 import cv2
 import numpy as np
-from ultralytics import YOLO
+
+# ai-module/src on the path for the shared utils package
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from utils.progress import ProgressReporter
+from utils.yolo_backend import load_yolo
+from tracking.tracker import create_tracker, TRACKER_KIND, TRACKER_KINDS
+from tracking.history import TrajectoryStore, Trajectory
+from counting.lines import LineCrossing, CountingLine, axis_line
 
 
 # =========================
@@ -27,17 +39,22 @@ LINE_THICKNESS = 4
 COUNT_DIRECTION = "any"  # "up", "down", "left", "right", or "any"
 MAX_MISSED = 15
 IOU_THRESH = 0.3
+# ByteTrack / predictive mode: centroid fallback so new tracks pick up their
+# velocity at low detection fps
+MAX_CENTROID_DIST = 120.0
 
 
 # =========================
 # Simple Tracker
 # =========================
 class Track:
-    def __init__(self, track_id: int, bbox: Tuple[int, int, int, int]):
+    __slots__ = ('id', 'bbox', 'missed', 'history')
+
+    def __init__(self, track_id: int, bbox: Tuple[int, int, int, int], history: Trajectory):
         self.id = track_id
         self.bbox = bbox
         self.missed = 0
-        self.history = []
+        self.history = history  # bounded ring in the tracker's TrajectoryStore
 
     @property
     def centroid(self):
@@ -48,6 +65,7 @@ class Track:
 class SimpleTracker:
     def __init__(self, max_missed: int = MAX_MISSED, iou_thresh: float = IOU_THRESH):
         self.tracks: Dict[int, Track] = {}
+        self.history = TrajectoryStore()
         self.next_id = 1
         self.max_missed = max_missed
         self.iou_thresh = iou_thresh
@@ -78,6 +96,7 @@ class SimpleTracker:
             to_del = [tid for tid, t in self.tracks.items() if t.missed > self.max_missed]
             for tid in to_del:
                 del self.tracks[tid]
+                self.history.pop(tid)
             return self.tracks
 
         assigned_dets = set()
@@ -100,7 +119,7 @@ class SimpleTracker:
         for det in detections:
             if det in assigned_dets:
                 continue
-            new_track = Track(self.next_id, det)
+            new_track = Track(self.next_id, det, self.history[self.next_id])
             new_track.history.append(new_track.centroid)
             self.tracks[self.next_id] = new_track
             self.next_id += 1
@@ -108,31 +127,103 @@ class SimpleTracker:
         to_del = [tid for tid, t in self.tracks.items() if t.missed > self.max_missed]
         for tid in to_del:
             del self.tracks[tid]
+            self.history.pop(tid)
 
         return self.tracks
 
 
+class SharedSimpleTracker:
+    """
+    SimpleTracker interface on top of the shared tracking package (--tracker).
+    predictive: on frames without detection, tracks that were matched at the
+    last detection move along their Kalman prediction and extend their history,
+    so line crossings are still evaluated every frame.
+    """
+
+    def __init__(self, kind: str, max_missed: int = MAX_MISSED, iou_thresh: float = IOU_THRESH,
+                 predictive: bool = False, **options):
+        options.setdefault("metric", "iou")
+        self.core = create_tracker(kind, max_missed=max_missed, iou_threshold=iou_thresh, **options)
+        self.predictive = predictive
+        self.tracks: Dict[int, Track] = {}
+        self.history = TrajectoryStore()
+
+    def update(self, detections: List[Tuple[int, int, int, int]],
+               scores: Optional[List[float]] = None, frame: Optional[np.ndarray] = None) -> Dict[int, Track]:
+        self.core.update(detections, scores, frame=frame)
+        return self._sync()
+
+    def predict(self) -> Dict[int, Track]:
+        """Advance a frame on which detection was skipped"""
+        self.core.predict()
+        return self._sync()
+
+    def _sync(self) -> Dict[int, Track]:
+        core = self.core
+        moving = core.matched | (self.predictive & ~core.lost)
+
+        tracks: Dict[int, Track] = {}
+        for tid, bbox, moved, missed in zip(core.ids.tolist(), core.boxes.astype(int).tolist(),
+                                            moving.tolist(), core.missed.tolist()):
+            tr = self.tracks.get(tid) or Track(tid, tuple(bbox), self.history[tid])
+            if moved:
+                tr.bbox = tuple(bbox)
+                tr.history.append(tr.centroid)
+            tr.missed = missed
+            tracks[tid] = tr
+        self.tracks = tracks
+        self.history.retain(tracks)
+        return tracks
+
+
+def make_tracker(kind: Optional[str] = None, conf_thresh: float = 0.3, predict: bool = False):
+    kind = kind or TRACKER_KIND
+    if predict and kind == "legacy":
+        print("[INFO] --predict needs a shared tracker, using 'vectorized'")
+        kind = "vectorized"
+    if kind == "legacy":
+        return SimpleTracker()
+    if kind == "bytetrack":
+        # conf_thresh splits high/low detections; weaker boxes down to the
+        # tracker's low threshold are still used to keep existing ids alive
+        return SharedSimpleTracker(kind, metric="iou+centroid", max_distance=MAX_CENTROID_DIST,
+                                   track_threshold=conf_thresh, predictive=predict)
+    if kind == "deepsort":
+        # Kalman motion is built in
+        return SharedSimpleTracker(kind, predictive=predict)
+    if predict:
+        return SharedSimpleTracker(kind, metric="iou+centroid", max_distance=MAX_CENTROID_DIST,
+                                   kalman=True, predictive=True)
+    return SharedSimpleTracker(kind)
+
+
 # =========================
 # Detector
 # =========================
 class Detector:
     def __init__(self, model_name="yolov8n.pt", mode="person", conf_thresh=0.3, cls_id=0):
-        self.model = YOLO(model_name)
+        self.model = load_yolo(model_name)
         self.mode = mode
         self.conf_thresh = conf_thresh
         self.cls_id = cls_id
 
     def detect(self, frame) -> List[Tuple[int, int, int, int]]:
-        results = self.model(frame, verbose=False)[0]
+        return self.detect_scored(frame)[0]
+
+    def detect_scored(self, frame, min_conf: Optional[float] = None) -> Tuple[List[Tuple[int, int, int, int]], List[float]]:
+        """Boxes and confidences down to min_conf (default conf_thresh)"""
+        min_conf = self.conf_thresh if min_conf is None else min_conf
+        results = self.model(frame, conf=min_conf, verbose=False)[0]
         bboxes = []
+        scores = []
 
         if results.boxes is None:
-            return bboxes
+            return bboxes, scores
 
         for box in results.boxes:
             cls = int(box.cls[0].item())
             conf = float(box.conf[0].item())
-            if conf < self.conf_thresh:
+            if conf < min_conf:
                 continue
 
             if self.mode == "person":
@@ -144,35 +235,28 @@ class Detector:
 
             x1, y1, x2, y2 = box.xyxy[0].cpu().numpy()
             bboxes.append((int(x1), int(y1), int(x2), int(y2)))
+            scores.append(conf)
 
-        return bboxes
+        return bboxes, scores
 
 
 # =========================
 # Counting Logic - ENHANCED
 # =========================
-def check_crossing_horizontal(prev_y: float, curr_y: float, line_y: int, direction: str) -> bool:
-    """Check if object crossed a horizontal line (for vertical movement)"""
-    if direction == "up":
-        return prev_y > line_y and curr_y <= line_y
-    elif direction == "down":
-        return prev_y < line_y and curr_y >= line_y
-    else:  # "any"
-        crossed_up = prev_y > line_y and curr_y <= line_y
-        crossed_down = prev_y < line_y and curr_y >= line_y
-        return crossed_up or crossed_down
-
-
-def check_crossing_vertical(prev_x: float, curr_x: float, line_x: int, direction: str) -> bool:
-    """Check if object crossed a vertical line (for horizontal movement)"""
-    if direction == "right":
-        return prev_x < line_x and curr_x >= line_x
-    elif direction == "left":
-        return prev_x > line_x and curr_x <= line_x
-    else:  # "any"
-        crossed_right = prev_x < line_x and curr_x >= line_x
-        crossed_left = prev_x > line_x and curr_x <= line_x
-        return crossed_right or crossed_left
+def direction_rule(direction: str) -> dict:
+    """CountingLine direction / count for COUNT_DIRECTION-style values ("any" or a compass direction)"""
+    if direction == "any":
+        return {"direction": None, "count": "any"}
+    return {"direction": direction, "count": "in"}
+
+
+def parse_line(spec: str) -> CountingLine:
+    """x1,y1,x2,y2[,direction] -> CountingLine (direction: up/down/left/right/any)"""
+    parts = spec.split(",")
+    if len(parts) not in (4, 5):
+        raise argparse.ArgumentTypeError("line must be x1,y1,x2,y2[,direction]")
+    x1, y1, x2, y2 = (int(p) for p in parts[:4])
+    return CountingLine(spec, (x1, y1), (x2, y2), **direction_rule(parts[4] if len(parts) == 5 else COUNT_DIRECTION))
 
 
 def run_counter(
@@ -186,6 +270,10 @@ def run_counter(
     show_window: bool = True,
     line_type: str = "horizontal",  # NEW: "horizontal" or "vertical"
     line_position: int = 400,       # NEW: unified parameter for both X and Y
+    on_progress: Optional[Callable[[dict], None]] = None,
+    tracker_kind: Optional[str] = None,
+    predict: bool = False,
+    lines: Optional[List[CountingLine]] = None,
 ):
     """
     Run object counter with configurable line orientation.
@@ -193,6 +281,14 @@ def run_counter(
     Args:
         line_type: "horizontal" (for vertical movement) or "vertical" (for horizontal movement)
         line_position: Y-coordinate for horizontal line, X-coordinate for vertical line
+        lines: counting lines (counting.lines.CountingLine, any orientation); replaces
+               line_type / line_position. Each track counts once per line and the
+               total is the sum over the lines.
+        on_progress: optional callable receiving rate-limited progress events (utils/progress.py)
+        tracker_kind: "legacy" (SimpleTracker) or a tracker from the tracking package;
+                      defaults to SMARTEYE_TRACKER
+        predict: on frames skipped by process_fps, advance tracks with a constant-velocity
+                 Kalman filter and check crossings on the predicted trajectory
     """
     try:
         if len(source) == 1 and source.isdigit():
@@ -220,25 +316,36 @@ def run_counter(
         writer = cv2.VideoWriter(output_path, fourcc, input_fps, (width, height))
 
     detector = Detector(model_name=model_name, mode=mode, conf_thresh=conf_thresh, cls_id=class_id)
-    tracker = SimpleTracker()
+    tracker = make_tracker(tracker_kind, conf_thresh, predict)
+    shared_tracker = isinstance(tracker, SharedSimpleTracker)
+    det_conf = getattr(tracker.core, "min_score", conf_thresh) if shared_tracker else conf_thresh
 
     process_interval = None
     last_process_time = 0.0
     if process_fps is not None and process_fps > 0:
         process_interval = 1.0 / process_fps
 
+    if not lines:
+        length = width if line_type == "horizontal" else height
+        lines = [axis_line(f"{line_type}@{line_position}", line_type, line_position, length,
+                           **direction_rule(COUNT_DIRECTION))]
+    crossing = LineCrossing(lines)
+
     total_count = 0
     already_counted: Set[int] = set()
 
     frame_idx = 0
     start_time = time.time()
+    progress = None
+    if on_progress is not None:
+        progress = ProgressReporter(on_progress, total_frames=int(cap.get(cv2.CAP_PROP_FRAME_COUNT) or 0))
 
     print(f"\n🎯 Line Configuration:")
-    print(f"   Type: {line_type}")
-    print(f"   Position: {line_position}")
-    print(f"   Direction: {COUNT_DIRECTION}")
+    for line in crossing.lines:
+        print(f"   Line: {line.p1} -> {line.p2}, direction: {line.direction or 'any'}, count: {line.count}")
     print(f"   Mode: {mode}")
-    print(f"   Confidence: {conf_thresh}\n")
+    print(f"   Confidence: {conf_thresh}")
+    print(f"   Tracker: {type(tracker).__name__}{' (predictive)' if predict else ''}\n")
 
     while True:
         ret, frame = cap.read()
@@ -255,49 +362,23 @@ def run_counter(
                 last_process_time = now
 
         if run_det:
-            bboxes = detector.detect(frame)
+            bboxes, scores = detector.detect_scored(frame, det_conf)
+            tracks = tracker.update(bboxes, scores, frame) if shared_tracker else tracker.update(bboxes)
+        elif shared_tracker:
+            tracks = tracker.predict()
         else:
-            bboxes = []
+            tracks = tracker.update([])
 
-        tracks = tracker.update(bboxes)
+        # Draw counting lines
+        for line in crossing.lines:
+            cv2.line(frame, tuple(map(int, line.p1)), tuple(map(int, line.p2)), (255, 0, 0), LINE_THICKNESS)
 
-        # Draw counting line based on type
-        if line_type == "horizontal":
-            # Horizontal line for vertical movement
-            cv2.line(frame, (0, line_position), (width, line_position), (255, 0, 0), LINE_THICKNESS)
-        else:
-            # Vertical line for horizontal movement
-            cv2.line(frame, (line_position, 0), (line_position, height), (255, 0, 0), LINE_THICKNESS)
+        # Check crossings of all tracks against all lines at once
+        events = crossing.update(list(tracks), [tr.centroid for tr in tracks.values()], frame_idx)
+        total_count += len(events)
+        already_counted.update(event.track_id for event in events)
 
-        # Check crossings for each track
         for tid, tr in tracks.items():
-            cx, cy = tr.centroid
-
-            # Get previous position
-            if len(tr.history) >= 2:
-                prev_cx, prev_cy = tr.history[-2]
-            elif len(tr.history) == 1:
-                prev_cx, prev_cy = tr.history[0]
-            else:
-                prev_cx, prev_cy = cx, cy
-
-            # Update history
-            if not tr.history or tr.history[-1] != (cx, cy):
-                tr.history.append((cx, cy))
-
-            # Check crossing based on line type
-            if tid not in already_counted:
-                crossed = False
-                
-                if line_type == "horizontal":
-                    crossed = check_crossing_horizontal(prev_cy, cy, line_position, COUNT_DIRECTION)
-                else:  # vertical
-                    crossed = check_crossing_vertical(prev_cx, cx, line_position, COUNT_DIRECTION)
-                
-                if crossed:
-                    total_count += 1
-                    already_counted.add(tid)
-
             # Draw bbox and ID
             x1, y1, x2, y2 = tr.bbox
             color = (0, 255, 0) if tid in already_counted else (0, 255, 255)
@@ -348,6 +429,15 @@ def run_counter(
         if writer is not None:
             writer.write(frame)
 
+        if progress is not None and progress.due():
+            progress.update(frame_idx, {'total_count': total_count, 'active_tracks': len(tracks)})
+
+        # Dead ids never come back; keep the set as small as the live tracks
+        already_counted.intersection_update(tracks)
+
+    if progress is not None:
+        progress.finish(frame_idx, {'total_count': total_count})
+
     cap.release()
     if writer is not None:
         writer.release()
@@ -358,7 +448,8 @@ def run_counter(
     print("  PROCESSING FINISHED")
     print("==========================")
     print(f"Total {label_mode.lower()} counted: {total_count}")
-    print(f"Line type: {line_type} at position {line_position}")
+    for name, counts in crossing.counts.items():
+        print(f"Line {name}: {counts['in'] + counts['out']} (in {counts['in']}, out {counts['out']})")
     print("==========================\n")
     
     return total_count
@@ -384,6 +475,13 @@ def parse_args():
                    help="Line orientation: horizontal (for vertical movement) or vertical (for horizontal movement)")
     p.add_argument("--line-pos", type=int, default=400,
                    help="Line position: Y for horizontal, X for vertical")
+    p.add_argument("--line", dest="lines", action="append", type=parse_line, default=None,
+                   help="Counting line x1,y1,x2,y2[,direction] (repeatable); replaces --line-type/--line-pos")
+    p.add_argument("--tracker", type=str, default=TRACKER_KIND, choices=TRACKER_KINDS,
+                   help="legacy (built-in SimpleTracker) or a tracker from the shared tracking package")
+    p.add_argument("--predict", action="store_true",
+                   help="With --process-fps: move tracks by Kalman prediction on skipped frames "
+                        "and check line crossings every frame")
     
     return p.parse_args()
 
@@ -401,4 +499,7 @@ if __name__ == "__main__":
         show_window=not args.no_show,
         line_type=args.line_type,
         line_position=args.line_pos,
+        tracker_kind=args.tracker,
+        predict=args.predict,
+        lines=args.lines,
     )
\ No newline at end of file
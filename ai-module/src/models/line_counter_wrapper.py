@@ -1,5 +1,6 @@
 import argparse, json, time, os, sys
 from line_counter import run_counter
+from utils.progress import ndjson_sink
 
 def main():
     parser = argparse.ArgumentParser()
@@ -27,6 +28,14 @@ def main():
     original_stdout = sys.stdout
     sys.stdout = sys.stderr
 
+    # Progress goes to the real stdout as NDJSON lines ahead of the final result line
+    emit_progress = ndjson_sink(original_stdout)
+    frames = {'processed': 0}
+
+    def on_progress(event):
+        frames['processed'] = event['frames']
+        emit_progress(event)
+
     try:
         total = run_counter(
             source=args.source,
@@ -38,7 +47,8 @@ def main():
             show_window=False,
             process_fps=args.process_fps,
             line_type=args.line_type,
-            line_position=args.line_pos
+            line_position=args.line_pos,
+            on_progress=on_progress
         )
     finally:
         sys.stdout = original_stdout
@@ -47,14 +57,14 @@ def main():
         "success": True,
         "total_counted": int(total) if total else 0,
         "processing_time": time.time() - start,
-        "frames_processed": 0,
+        "frames_processed": frames['processed'],
         "images_captured": 0,
         "outputVideoPath": os.path.abspath(args.output),
         "line_type": args.line_type,
         "line_position": args.line_pos
     }
 
-    # Print ONLY JSON to stdout
+    # Final result: the last stdout line, the only one without an "event" key
     print(json.dumps(result))
 
 if __name__ == "__main__":
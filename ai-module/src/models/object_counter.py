@@ -1,8 +1,14 @@
+import os
+import sys
 import cv2
 import numpy as np
 from ultralytics import YOLO
 from collections import defaultdict
 
+# ai-module/src on the path for the shared tracking package
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from tracking.tracker import create_tracker, TRACKER_KIND
+
 # ---------------------------------------------------------
 # CONFIG
 # ---------------------------------------------------------
@@ -14,6 +20,7 @@ CAP_SOURCE = 0               # webcam
 CONF_THRESHOLD = 0.45
 IOU_MATCH_THRESHOLD = 0.35
 MIN_FRAMES_FOR_COUNT = 3     # avoid false detections
+TRACKER = TRACKER_KIND       # "legacy" (SimpleTracker below) or e.g. "vectorized"
 
 # ---------------------------------------------------------
 # Simple Tracker (NO DeepSORT)
@@ -82,12 +89,27 @@ class SimpleTracker:
 
         return matched
 
+class SharedTracker:
+    """SimpleTracker interface on top of the shared tracking package (TRACKER)"""
+    def __init__(self, kind):
+        self.core = create_tracker(kind, max_missed=20, metric="iou",
+                                   iou_threshold=IOU_MATCH_THRESHOLD, first_id=0)
+        self.tracks = {}          # id → bbox
+        self.counted = set()      # ids counted
+        self.frames_seen = defaultdict(int)
+
+    def update(self, detections):
+        ids = self.core.update(detections)
+        self.tracks = self.core.as_dict()
+        self.frames_seen.update(zip(ids.tolist(), self.core.hits.tolist()))
+        return set(ids[self.core.matched].tolist())
+
 # ---------------------------------------------------------
 # Main
 # ---------------------------------------------------------
 def main():
     model = YOLO(MODEL)
-    tracker = SimpleTracker()
+    tracker = SimpleTracker() if TRACKER == "legacy" else SharedTracker(TRACKER)
 
     cap = cv2.VideoCapture(CAP_SOURCE)
 
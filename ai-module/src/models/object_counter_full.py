@@ -24,6 +24,9 @@ Usage examples:
 
   # Auto compute region/line from a saved frame (you can supply --save-start-frame)
   python object_counter_full.py --start-frame 150 --save-start-frame frame150.jpg --auto-line --auto-region
+
+  # Polygon zones of a camera (backend ZoneConfig): occupancy, enter / exit / dwell
+  python object_counter_full.py --zones "http://localhost:3000/api/zones/camera/3?is_active=true&limit=100"
 """
 
 import argparse
@@ -32,9 +35,19 @@ import sys
 import math
 import cv2
 import numpy as np
-from collections import defaultdict
 from ultralytics import YOLO
 
+# ai-module/src on the path for the shared tracking package
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from tracking.tracker import TRACKER_KIND, TRACKER_KINDS
+from tracking.adapters import SharedCentroidTracker
+from tracking.history import TrajectoryStore
+from counting.lines import LineCrossing, CountingLine, extend_to_frame, moved_along
+from counting.zones import ZoneOccupancy, load_zones
+
+# Pixels an object must move in --direction over its last two steps to count
+MIN_MOVE = 2.0
+
 # -----------------------
 # Centroid tracker
 # -----------------------
@@ -43,7 +56,7 @@ class CentroidTracker:
         self.next_id = 0
         self.objects = {}      # id -> bbox
         self.disappeared = {}  # id -> frames missed
-        self.history = defaultdict(list)  # id -> list of centroids
+        self.history = TrajectoryStore()  # id -> bounded ring of centroids
         self.iou_threshold = iou_threshold
         self.max_disappeared = max_disappeared
 
@@ -158,10 +171,6 @@ def parse_region(s):
         raise ValueError("region must be x1,y1,x2,y2")
     return tuple(int(p) for p in parts)
 
-def point_line_side(px, py, x1, y1, x2, y2):
-    # signed area (positive one side, negative other)
-    return (x2 - x1)*(py - y1) - (y2 - y1)*(px - x1)
-
 def auto_line_from_image(image_path, frac=0.60):
     if not os.path.exists(image_path):
         return None
@@ -210,8 +219,10 @@ def main():
     ap.add_argument("--model", default="yolov8s.pt", help="YOLO model path/name")
     ap.add_argument("--start-frame", type=int, default=0, help="Frame to start processing")
     ap.add_argument("--save-start-frame", default=None, help="Save start-frame image for picking line/region")
-    ap.add_argument("--line", default=None, help="Crossing line x1,y1,x2,y2")
+    ap.add_argument("--line", default=None, help="Crossing line x1,y1,x2,y2 (extended across the frame)")
     ap.add_argument("--region", default=None, help="Counting region x1,y1,x2,y2")
+    ap.add_argument("--zones", default=None, help="Polygon zones: backend /zones/camera/<id> URL or ZoneConfig JSON file")
+    ap.add_argument("--dwell-sec", type=float, default=5.0, help="Seconds inside a zone before a dwell event")
     ap.add_argument("--auto-line", action="store_true", help="Auto line from image")
     ap.add_argument("--auto-region", action="store_true", help="Auto region from image")
     ap.add_argument("--auto-line-frame", default="/mnt/data/frame150.jpg", help="Image used for auto-line/region")
@@ -219,6 +230,7 @@ def main():
     ap.add_argument("--conf", type=float, default=0.35, help="YOLO confidence")
     ap.add_argument("--min-frames", type=int, default=3, help="Min frames seen to count")
     ap.add_argument("--freeze-sec", type=float, default=2.0, help="Seconds to freeze final frame")
+    ap.add_argument("--tracker", choices=TRACKER_KINDS, default=TRACKER_KIND, help="legacy (built-in CentroidTracker) or a shared tracker")
     args = ap.parse_args()
 
     # verify input
@@ -286,6 +298,12 @@ def main():
 
     print("Using line:", (x1,y1,x2,y2), "region:", (rx1,ry1,rx2,ry2), "direction:", args.direction)
 
+    # polygon zones, rasterised once at the video resolution
+    occupancy = None
+    if args.zones:
+        occupancy = ZoneOccupancy(load_zones(args.zones), W, H, dwell_frames=int(round(args.dwell_sec * fps)))
+        print("Using zones:", occupancy.names)
+
     # load model
     model = YOLO(args.model)
 
@@ -295,7 +313,13 @@ def main():
     writer = cv2.VideoWriter(tmp_out, fourcc, fps, (W, H))
 
     # tracker & counters
-    tracker = CentroidTracker(max_disappeared=30, iou_threshold=0.25)
+    tracker = (CentroidTracker(max_disappeared=30, iou_threshold=0.25) if args.tracker == "legacy"
+               else SharedCentroidTracker(args.tracker, max_disappeared=30, iou_threshold=0.25))
+    # Crossings of the segment moving in --direction (objects not already counted in the region)
+    # The line is extended across the frame: objects crossing beside the drawn
+    # segment still count
+    crossing = LineCrossing([CountingLine('line', *extend_to_frame((x1, y1), (x2, y2), W, H),
+                                          direction=args.direction, count='in')])
     counted_ids = set()
     total_count = 0
 
@@ -323,8 +347,10 @@ def main():
 
         active_ids = tracker.update(dets)
         active_count = len(active_ids)
+        # Dead ids never come back; keep the set as small as the live tracks
+        counted_ids.intersection_update(active_ids)
 
-        # region-based counting and line crossing
+        # region-based counting
         for oid in active_ids:
             hist = tracker.history.get(oid, [])
             if len(hist) < 2:
@@ -357,26 +383,18 @@ def main():
                     counted_ids.add(oid)
                     total_count += 1
 
-            # line crossing detection (in addition to region)
-            prev_side = point_line_side(prev_cent[0], prev_cent[1], x1, y1, x2, y2)
-            curr_side = point_line_side(curr_cent[0], curr_cent[1], x1, y1, x2, y2)
-            crossed = (prev_side <= 0 and curr_side > 0) or (prev_side >= 0 and curr_side < 0)
-            if crossed and oid not in counted_ids and len(hist) >= args.min_frames:
-                # direction check
-                p_prev = hist[-3] if len(hist) >= 3 else hist[0]
-                dx = curr_cent[0] - p_prev[0]; dy = curr_cent[1] - p_prev[1]
-                ok = False
-                if args.direction == 'right' and dx > 2.0:
-                    ok = True
-                elif args.direction == 'left' and dx < -2.0:
-                    ok = True
-                elif args.direction == 'down' and dy > 2.0:
-                    ok = True
-                elif args.direction == 'up' and dy < -2.0:
-                    ok = True
-                if ok:
-                    counted_ids.add(oid)
-                    total_count += 1
+        # line crossing detection (in addition to region), every active id in one pass
+        ids = [oid for oid in active_ids if tracker.history.get(oid)]
+        points = [tracker.history[oid][-1] for oid in ids]
+        eligible = [len(tracker.history[oid]) >= args.min_frames and oid not in counted_ids
+                    and moved_along(tracker.history[oid], args.direction, MIN_MOVE) for oid in ids]
+        for event in crossing.update(ids, points, frame_idx, eligible=eligible):
+            counted_ids.add(event.track_id)
+            total_count += 1
+
+        # zone enter / exit / dwell
+        if occupancy is not None:
+            occupancy.update(ids, points, frame_idx)
 
         # draw region and line and boxes
         # translucent region box
@@ -387,6 +405,13 @@ def main():
         cv2.rectangle(frame, (rx1, ry1), (rx2, ry2), (0, 200, 0), 2)
         # counting line
         cv2.line(frame, (x1, y1), (x2, y2), (0, 255, 255), 2)
+        # zones with their occupancy
+        if occupancy is not None:
+            for name, polygon in zip(occupancy.names, occupancy.zone_mask.polygons):
+                cv2.polylines(frame, [polygon], True, (255, 128, 0), 2)
+                px, py = polygon[0]
+                cv2.putText(frame, f"{name}: {occupancy.occupancy[name]}", (int(px) + 4, int(py) + 18),
+                            cv2.FONT_HERSHEY_SIMPLEX, 0.6, (255, 128, 0), 2)
 
         for oid in active_ids:
             box = tracker.objects.get(oid)
@@ -439,6 +464,9 @@ def main():
         pass
 
     print("Done. FINAL TOTAL:", total_count)
+    if occupancy is not None:
+        for name, counts in occupancy.summary().items():
+            print(f"Zone {name}: {counts}")
     print("Saved:", args.output)
 
 if __name__ == "__main__":
@@ -1,3 +1,4 @@
+import os
 import sys
 import time
 import json
@@ -7,6 +8,18 @@ import requests
 from collections import OrderedDict
 from math import hypot
 
+# ai-module/src on the path for the shared tracking package
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from tracking.tracker import create_tracker, TRACKER_KIND
+from counting.lines import LineCrossing, direction_mode_lines
+from counting.zones import ZoneOccupancy, load_zones
+
+DETECT_CONF = 0.4
+# Detection rate limit (0 = every frame); trackers coast in between
+PROCESS_FPS = float(os.environ.get("SMARTEYE_PROCESS_FPS", 0))
+# Polygon zones of this camera: backend /zones/camera/<id> URL or ZoneConfig JSON file
+ZONES_SOURCE = os.environ.get("SMARTEYE_ZONES")
+
 try:
     from ultralytics import YOLO
 except ImportError:
@@ -102,77 +115,91 @@ class CentroidTracker:
         return self.objects
 
 
+class SharedCentroidTracker:
+    """CentroidTracker interface on top of the shared tracking package (SMARTEYE_TRACKER)"""
+    def __init__(self, kind, max_disappeared=30, max_distance=50, **options):
+        self.core = create_tracker(kind, max_missed=max_disappeared, metric="centroid",
+                                   max_distance=max_distance, **options)
+        self.objects = OrderedDict()
+        # ByteTrack also wants the low-score detections
+        self.min_score = getattr(self.core, "min_score", DETECT_CONF)
+
+    def update(self, rects, scores=None, frame=None):
+        self.core.update(rects, scores, frame=frame)
+        return self._sync()
+
+    def predict(self):
+        """Advance a frame on which detection was skipped"""
+        self.core.predict()
+        return self._sync()
+
+    def _sync(self):
+        cents = self.core.centroids().astype(int)
+        self.objects = OrderedDict(zip(self.core.ids.tolist(), map(tuple, cents.tolist())))
+        return self.objects
+
+
 # -----------------------------
 # People Counter (standalone)
 # -----------------------------
 class PeopleCounter:
-    def __init__(self, direction_mode="LEFT_RIGHT", line_pos=None):
+    def __init__(self, direction_mode="LEFT_RIGHT", line_pos=None, tracker=None, zones=None):
         """
         direction_mode: "LEFT_RIGHT", "RIGHT_LEFT", "UP_DOWN", "DOWN_UP", "BOTH"
         line_pos: None => auto (middle of frame)
+        tracker: "legacy" (CentroidTracker) or a shared tracker, default SMARTEYE_TRACKER
+        zones: optional counting.zones Zones (load_zones()) for per-zone occupancy
         """
         self.direction_mode = direction_mode
         self.line_pos = line_pos  # set later when frame size known
 
-        self.tracker = CentroidTracker(max_disappeared=15, max_distance=60)
-        self.track_history = {}  # id -> last centroid
+        tracker = tracker or TRACKER_KIND
+        options = {"track_threshold": DETECT_CONF} if tracker == "bytetrack" else {}
+        self.tracker = (CentroidTracker(max_disappeared=15, max_distance=60) if tracker == "legacy"
+                        else SharedCentroidTracker(tracker, max_disappeared=15, max_distance=60, **options))
+        self.crossing = None  # counting.lines.LineCrossing, built once the frame size is known
+        self.zones = zones
+        self.occupancy = None  # counting.zones.ZoneOccupancy, likewise
 
         self.entered_total = 0
         self.exited_total = 0
 
     def update_counts(self, objects, frame_shape):
-        if self.line_pos is None:
+        if self.crossing is None:
             h, w = frame_shape[:2]
-            if self.direction_mode in ("LEFT_RIGHT", "RIGHT_LEFT"):
-                self.line_pos = w // 2
+            if self.line_pos is None:
+                if self.direction_mode in ("LEFT_RIGHT", "RIGHT_LEFT"):
+                    self.line_pos = w // 2
+                else:
+                    self.line_pos = h // 2
+            self.crossing = LineCrossing(direction_mode_lines(self.direction_mode, self.line_pos, w, h))
+            if self.zones:
+                self.occupancy = ZoneOccupancy(self.zones, w, h)
+
+        if self.occupancy is not None:
+            self.occupancy.update(list(objects), list(objects.values()))
+
+        events = self.crossing.update(list(objects), list(objects.values()))
+        if len(self.crossing) > 1:
+            # BOTH: any crossing counts as entered, once per person and frame
+            self.entered_total += len({event.track_id for event in events})
+            return
+        for event in events:
+            if event.direction == "in":
+                self.entered_total += 1
             else:
-                self.line_pos = h // 2
-
-        for objectID, (cX, cY) in objects.items():
-            prev = self.track_history.get(objectID, None)
-            self.track_history[objectID] = (cX, cY)
-
-            if prev is None:
-                continue
-
-            pX, pY = prev
-
-            if self.direction_mode == "LEFT_RIGHT":
-                if pX < self.line_pos <= cX:
-                    self.entered_total += 1
-                elif pX > self.line_pos >= cX:
-                    self.exited_total += 1
-
-            elif self.direction_mode == "RIGHT_LEFT":
-                if pX > self.line_pos >= cX:
-                    self.entered_total += 1
-                elif pX < self.line_pos <= cX:
-                    self.exited_total += 1
-
-            elif self.direction_mode == "UP_DOWN":
-                if pY < self.line_pos <= cY:
-                    self.entered_total += 1
-                elif pY > self.line_pos >= cY:
-                    self.exited_total += 1
-
-            elif self.direction_mode == "DOWN_UP":
-                if pY > self.line_pos >= cY:
-                    self.entered_total += 1
-                elif pY < self.line_pos <= cY:
-                    self.exited_total += 1
-            else:
-                # BOTH: just count any crossing as entered
-                if (pX < self.line_pos <= cX) or (pX > self.line_pos >= cX) or \
-                   (pY < self.line_pos <= cY) or (pY > self.line_pos >= cY):
-                    self.entered_total += 1
+                self.exited_total += 1
 
     def get_counts(self, objects):
         inside = len(objects)
-        return {
+        counts = {
             "inside": inside,
             "entered": self.entered_total,
             "exited": self.exited_total
         }
+        if self.occupancy is not None:
+            counts["zones"] = self.occupancy.summary()
+        return counts
 
 
 # -----------------------------
@@ -205,9 +232,21 @@ def main():
         print("ERROR: Failed to open stream:", stream_url)
         sys.exit(1)
 
-    counter = PeopleCounter(direction_mode=direction_mode)
+    zones = None
+    if ZONES_SOURCE:
+        try:
+            zones = load_zones(ZONES_SOURCE)
+            print(f"Zones     : {[zone.name for zone in zones]}")
+        except Exception as e:
+            print("WARNING: Failed to load zones:", e)
+
+    counter = PeopleCounter(direction_mode=direction_mode, zones=zones)
+    shared_tracker = isinstance(counter.tracker, SharedCentroidTracker)
+    det_conf = counter.tracker.min_score if shared_tracker else DETECT_CONF
     last_post_time = 0.0
     post_interval = 0.5  # seconds
+    detect_interval = 1.0 / PROCESS_FPS if PROCESS_FPS > 0 else 0.0
+    last_detect_time = 0.0
 
     try:
         while True:
@@ -217,17 +256,22 @@ def main():
                 time.sleep(0.2)
                 continue
 
-            # YOLO inference (only person class: 0)
-            try:
-                results = model(frame, conf=0.4, imgsz=640, verbose=False, classes=[0])
-            except Exception as e:
-                print("ERROR during YOLO inference:", e)
-                time.sleep(0.2)
-                continue
-
             rects = []
+            scores = []
             detections = []
 
+            # YOLO inference (only person class: 0), at most PROCESS_FPS times a second
+            results = []
+            detected = time.time() - last_detect_time >= detect_interval
+            if detected:
+                last_detect_time = time.time()
+                try:
+                    results = model(frame, conf=det_conf, imgsz=640, verbose=False, classes=[0])
+                except Exception as e:
+                    print("ERROR during YOLO inference:", e)
+                    time.sleep(0.2)
+                    continue
+
             for r in results:
                 for box in r.boxes:
                     cls = int(box.cls[0])
@@ -238,12 +282,18 @@ def main():
                     x1, y1, x2, y2 = box.xyxy[0].cpu().numpy().tolist()
                     x1, y1, x2, y2 = int(x1), int(y1), int(x2), int(y2)
                     rects.append((x1, y1, x2, y2))
+                    scores.append(conf)
                     detections.append({
                         "bbox": [x1, y1, x2, y2],
                         "confidence": conf
                     })
 
-            objects = counter.tracker.update(rects)
+            if not shared_tracker:
+                objects = counter.tracker.update(rects)
+            elif detected:
+                objects = counter.tracker.update(rects, scores, frame)
+            else:
+                objects = counter.tracker.predict()
             counter.update_counts(objects, frame.shape)
             counts = counter.get_counts(objects)
 
@@ -264,6 +314,8 @@ def main():
                         for obj_id, (cx, cy) in objects.items()
                     ]
                 }
+                if "zones" in counts:
+                    payload["zones"] = counts["zones"]
 
                 # Send to backend
                 try:
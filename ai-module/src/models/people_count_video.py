@@ -6,7 +6,8 @@ Usage:
     python people_count_video.py <video_path> [direction]
 
 Output:
-    - JSON printed to stdout with summary, detections and saved video path.
+    - NDJSON progress events on stdout while processing (lines with an "event" key).
+    - JSON printed to stdout (last line) with summary, detections and saved video path.
     - Processed video saved to:
         D:/Web APP/Smarteye/backend/uploads/videos/people-count/Output/processed_<inputname>.mp4
 """
@@ -20,6 +21,13 @@ import time
 from collections import OrderedDict
 from math import hypot
 
+# ai-module/src on the path for the shared utils package
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from utils.progress import ProgressReporter, ndjson_sink
+from utils.event_log import EventLog
+from tracking.tracker import create_tracker, TRACKER_KIND
+from counting.lines import LineCrossing, direction_mode_lines
+
 try:
     from ultralytics import YOLO
 except ImportError:
@@ -123,14 +131,29 @@ class CentroidTracker:
         return self.objects
 
 
+class SharedCentroidTracker:
+    """CentroidTracker interface on top of the shared tracking package (SMARTEYE_TRACKER)"""
+    def __init__(self, kind, max_disappeared=30, max_distance=50):
+        self.core = create_tracker(kind, max_missed=max_disappeared, metric="centroid", max_distance=max_distance)
+        self.objects = OrderedDict()
+
+    def update(self, rects, frame=None):
+        self.core.update(rects, frame=frame)
+        cents = self.core.centroids().astype(int)
+        self.objects = OrderedDict(zip(self.core.ids.tolist(), map(tuple, cents.tolist())))
+        return self.objects
+
+
 class PeopleCounterVideo:
     """People counter for video files with crossing detection and processed output"""
-    def __init__(self, direction_mode="LEFT_RIGHT", line_pos=None):
+    def __init__(self, direction_mode="LEFT_RIGHT", line_pos=None, tracker=None):
         self.direction_mode = direction_mode
         self.line_pos = line_pos
 
-        self.tracker = CentroidTracker(max_disappeared=20, max_distance=60)
-        self.track_history = {}
+        # tracker: "legacy" (CentroidTracker) or a shared tracker, default SMARTEYE_TRACKER
+        tracker = tracker or TRACKER_KIND
+        self.tracker = (CentroidTracker(max_disappeared=20, max_distance=60) if tracker == "legacy"
+                        else SharedCentroidTracker(tracker, max_disappeared=20, max_distance=60))
 
         # counting by gender (we keep but gender is 'unknown' by default)
         self.entered_male = 0
@@ -138,11 +161,12 @@ class PeopleCounterVideo:
         self.exited_male = 0
         self.exited_female = 0
 
-        self.detections = []  # Store individual detections
+        self.detections = EventLog()  # Store individual detections (bounded in memory, spills to disk)
         self.detection_id = 1
 
-        # prevents double counting: objectID -> last direction counted ('IN'/'OUT'/None)
-        self.crossed_state = {}
+        # counting.lines.LineCrossing, built once the frame size is known; 'alternate'
+        # prevents double counting: never the same direction twice in a row per person
+        self.crossing = None
 
     def detect_gender(self, frame, bbox):
         """
@@ -158,93 +182,51 @@ class PeopleCounterVideo:
                 self.line_pos = w // 2
             else:
                 self.line_pos = h // 2
-
-        for objectID, (cX, cY) in list(objects.items()):
-            prev = self.track_history.get(objectID, None)
-            self.track_history[objectID] = (cX, cY)
-
-            if prev is None:
-                continue
-
-            pX, pY = prev
-            direction = None
-            crossed = False
-
-            # Determine crossing and direction
-            if self.direction_mode == "LEFT_RIGHT":
-                if pX < self.line_pos <= cX:
-                    direction = "IN"
-                    crossed = True
-                elif pX > self.line_pos >= cX:
-                    direction = "OUT"
-                    crossed = True
-
-            elif self.direction_mode == "RIGHT_LEFT":
-                if pX > self.line_pos >= cX:
-                    direction = "IN"
-                    crossed = True
-                elif pX < self.line_pos <= cX:
-                    direction = "OUT"
-                    crossed = True
-
-            elif self.direction_mode == "UP_DOWN":
-                if pY < self.line_pos <= cY:
-                    direction = "IN"
-                    crossed = True
-                elif pY > self.line_pos >= cY:
-                    direction = "OUT"
-                    crossed = True
-
-            elif self.direction_mode == "DOWN_UP":
-                if pY > self.line_pos >= cY:
-                    direction = "IN"
-                    crossed = True
-                elif pY < self.line_pos <= cY:
-                    direction = "OUT"
-                    crossed = True
-
-            # If crossed, ensure we haven't already counted this same crossing for the same object
-            if crossed:
-                last = self.crossed_state.get(objectID)
-                if last == direction:
-                    # already counted this direction for this object; skip
-                    continue
-
-                # If last is different (or None), count and set state
-                self.crossed_state[objectID] = direction
-
-                # Gender detection (placeholder)
-                gender = self.detect_gender(frame, (cX - 50, cY - 100, cX + 50, cY + 100))
-
-                # Update counts
-                if direction == "IN":
-                    if gender == "male":
-                        self.entered_male += 1
-                    elif gender == "female":
-                        self.entered_female += 1
-                    else:
-                        # unknown: track inside via generic counters later
-                        pass
-                else:  # OUT
-                    if gender == "male":
-                        self.exited_male += 1
-                    elif gender == "female":
-                        self.exited_female += 1
-                    else:
-                        pass
-
-                # Store detection entry (gender may be 'unknown')
-                self.detections.append({
-                    "id": self.detection_id,
-                    "person_id": f"person_{objectID}",
-                    "gender": gender,
-                    "direction": direction,
-                    "frame_number": frame_number,
-                    "timestamp": timestamp,
-                    "confidence": 0.85,
-                    "position": {"x": int(cX), "y": int(cY)}
-                })
-                self.detection_id += 1
+        if self.direction_mode == "BOTH":
+            # No counting direction in BOTH mode: nothing is counted
+            return
+        if self.crossing is None:
+            h, w = frame.shape[:2]
+            self.crossing = LineCrossing(direction_mode_lines(self.direction_mode, self.line_pos, w, h,
+                                                              repeat="alternate"))
+
+        for event in self.crossing.update(list(objects), list(objects.values()), frame_number):
+            objectID = event.track_id
+            cX, cY = objects[objectID]
+            direction = "IN" if event.direction == "in" else "OUT"
+
+            # Gender detection (placeholder)
+            gender = self.detect_gender(frame, (cX - 50, cY - 100, cX + 50, cY + 100))
+
+            # Update counts
+            if direction == "IN":
+                if gender == "male":
+                    self.entered_male += 1
+                elif gender == "female":
+                    self.entered_female += 1
+                else:
+                    # unknown: track inside via generic counters later
+                    pass
+            else:  # OUT
+                if gender == "male":
+                    self.exited_male += 1
+                elif gender == "female":
+                    self.exited_female += 1
+                else:
+                    pass
+
+            # Store detection entry (gender may be 'unknown')
+            self.detections.append({
+                "id": self.detection_id,
+                "person_id": f"person_{objectID}",
+                "gender": gender,
+                "direction": direction,
+                "frame_number": frame_number,
+                "timestamp": timestamp,
+                "confidence": 0.85,
+                "position": {"x": int(cX), "y": int(cY)}
+            })
+            self.detection_id += 1
 
     def get_summary(self):
         entered = self.entered_male + self.entered_female
@@ -270,7 +252,8 @@ def safe_make_dirs(path):
         pass
 
 
-def process_video(video_path, direction="LEFT_RIGHT", output_dir=r"D:\\Web APP\\Smarteye\\backend\\uploads\\videos\\people-count\\Output"):
+def process_video(video_path, direction="LEFT_RIGHT", output_dir=r"D:\\Web APP\\Smarteye\\backend\\uploads\\videos\\people-count\\Output",
+                  on_progress=None):
     # Prepare output directory
     safe_make_dirs(output_dir)
 
@@ -307,6 +290,7 @@ def process_video(video_path, direction="LEFT_RIGHT", output_dir=r"D:\\Web APP\\
     counter = PeopleCounterVideo(direction_mode=direction)
     frame_number = 0
     start_time = time.time()
+    progress = ProgressReporter(on_progress, total_frames=total_frames) if on_progress else None
 
     try:
         while True:
@@ -335,7 +319,10 @@ def process_video(video_path, direction="LEFT_RIGHT", output_dir=r"D:\\Web APP\\
                     x1, y1, x2, y2 = int(x1), int(y1), int(x2), int(y2)
                     rects.append((x1, y1, x2, y2))
 
-            objects = counter.tracker.update(rects)
+            if isinstance(counter.tracker, SharedCentroidTracker):
+                objects = counter.tracker.update(rects, frame)  # DeepSORT crops appearance from it
+            else:
+                objects = counter.tracker.update(rects)
             counter.update_counts(objects, frame, frame_number, timestamp)
 
             # Draw info on frame
@@ -360,10 +347,9 @@ def process_video(video_path, direction="LEFT_RIGHT", output_dir=r"D:\\Web APP\\
             # write frame to output
             out.write(frame)
 
-            # progress to stderr every 30 frames
-            if frame_number % 30 == 0:
-                prog = (frame_number / total_frames * 100) if total_frames > 0 else 0
-                print(f"Progress: {prog:.1f}% ({frame_number}/{total_frames})", file=sys.stderr)
+            # rate-limited progress events
+            if progress is not None and progress.due():
+                progress.update(frame_number, summary)
 
     except KeyboardInterrupt:
         print("Interrupted by user.", file=sys.stderr)
@@ -375,13 +361,15 @@ def process_video(video_path, direction="LEFT_RIGHT", output_dir=r"D:\\Web APP\\
     cap.release()
     out.release()
     processing_time = time.time() - start_time
+    if progress is not None:
+        progress.finish(frame_number, counter.get_summary())
 
     # Final summary & result
     summary = counter.get_summary()
     result = {
         "success": True,
         "summary": summary,
-        "detections": counter.detections,
+        "detections": counter.detections.to_list(),
         "video_info": {
             "total_frames": total_frames,
             "fps": float(fps),
@@ -408,7 +396,7 @@ def main():
     print(f"Video: {video_path}", file=sys.stderr)
     print(f"Direction: {direction}", file=sys.stderr)
 
-    result = process_video(video_path, direction)
+    result = process_video(video_path, direction, on_progress=ndjson_sink())
     print(json.dumps(convert_to_native_types(result)))
 
 
@@ -21,12 +21,18 @@ You can optionally save annotated video:
 
 import argparse
 import math
+import os
+import sys
 import time
 from typing import List, Tuple, Dict, Any, Set, Optional
 
 import cv2
 import numpy as np
-from ultralytics import YOLO
+
+# ai-module/src on the path for the shared utils package
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from utils.yolo_backend import load_yolo
+from tracking.tracker import create_tracker, TRACKER_KIND, TRACKER_KINDS
 
 
 # ---------------------------
@@ -34,6 +40,8 @@ from ultralytics import YOLO
 # ---------------------------
 
 class Track:
+    __slots__ = ('id', 'bbox', 'last_seen_frame', 'frames_seen', 'disappeared_frames')
+
     def __init__(self, track_id: int, bbox: Tuple[int, int, int, int], frame_index: int):
         """
         bbox: (x1, y1, x2, y2)
@@ -209,6 +217,45 @@ class SimplePersonTracker:
         return {tr.id for tr in self.tracks.values() if tr.frames_seen >= min_frames_for_count}
 
 
+class SharedPersonTracker:
+    """
+    SimplePersonTracker interface on top of the shared tracking package (--tracker).
+    Uses the same IoU-then-centroid-distance association, vectorized.
+    """
+
+    def __init__(
+        self,
+        kind: str,
+        max_disappeared: int = 30,
+        iou_threshold: float = 0.3,
+        max_centroid_dist: float = 80.0,
+    ):
+        self.core = create_tracker(
+            kind,
+            max_missed=max_disappeared,
+            metric="iou+centroid",
+            iou_threshold=iou_threshold,
+            max_distance=max_centroid_dist,
+        )
+
+    def update(
+        self,
+        detections: List[Tuple[int, int, int, int]],
+        frame_index: int,
+        frame: Optional[np.ndarray] = None,
+    ) -> Dict[int, Tuple[int, int, int, int]]:
+        self.core.update(detections, frame_idx=frame_index, frame=frame)
+        return self.core.as_dict()
+
+    def get_current_ids_seen_enough(self, min_frames_for_count: int = 3) -> Set[int]:
+        core = self.core
+        return set(core.ids[(core.hits >= min_frames_for_count) & (core.missed == 0)].tolist())
+
+    def get_all_ids_seen_enough(self, min_frames_for_count: int = 3) -> Set[int]:
+        core = self.core
+        return set(core.ids[core.hits >= min_frames_for_count].tolist())
+
+
 # ---------------------------
 # YOLOv8-based people detector
 # ---------------------------
@@ -222,7 +269,7 @@ class PeopleDetector:
         """
         model_name: e.g. 'yolov8n.pt', 'yolov8s.pt', ...
         """
-        self.model = YOLO(model_name)
+        self.model = load_yolo(model_name)
         self.conf_threshold = conf_threshold
 
     def detect_people(self, frame: np.ndarray) -> List[Tuple[int, int, int, int]]:
@@ -262,12 +309,15 @@ def process_stream(
     min_frames_for_count: int = 3,
     process_fps: Optional[float] = None,
     show_window: bool = True,
+    tracker_kind: Optional[str] = None,
 ):
     """
     source: video path, camera index (e.g. "0"), or RTSP/HTTP URL.
     output_path: if given, writes annotated video.
     process_fps: if set, we skip frames to approximately this FPS for detection.
                  If None, process every frame.
+    tracker_kind: "legacy" (SimplePersonTracker) or a tracker from the tracking
+                  package; defaults to SMARTEYE_TRACKER.
     """
 
     # Convert source possibly from numeric string to int
@@ -299,11 +349,16 @@ def process_stream(
         writer = cv2.VideoWriter(output_path, fourcc, input_fps, (width, height))
 
     detector = PeopleDetector(model_name=model_name, conf_threshold=conf_threshold)
-    tracker = SimplePersonTracker(
+    tracker_kind = tracker_kind or TRACKER_KIND
+    tracker_args = dict(
         max_disappeared=int(input_fps * 2),  # allow ~2 seconds disappearance
         iou_threshold=0.3,
         max_centroid_dist=80.0,
     )
+    if tracker_kind == "legacy":
+        tracker = SimplePersonTracker(**tracker_args)
+    else:
+        tracker = SharedPersonTracker(tracker_kind, **tracker_args)
 
     frame_index = 0
     last_process_time = 0.0
@@ -338,7 +393,10 @@ def process_stream(
             bboxes = []
 
         # Update tracker
-        track_bboxes = tracker.update(bboxes, frame_index)
+        if isinstance(tracker, SharedPersonTracker):
+            track_bboxes = tracker.update(bboxes, frame_index, frame)
+        else:
+            track_bboxes = tracker.update(bboxes, frame_index)
 
         # Current live people (active tracks) seen enough frames
         current_ids = tracker.get_current_ids_seen_enough(min_frames_for_count)
@@ -477,6 +535,13 @@ def parse_args():
         action="store_true",
         help="Do not display window (useful on headless server)",
     )
+    parser.add_argument(
+        "--tracker",
+        type=str,
+        default=TRACKER_KIND,
+        choices=TRACKER_KINDS,
+        help="legacy (built-in SimplePersonTracker) or a tracker from the shared tracking package",
+    )
     return parser.parse_args()
 
 
@@ -490,4 +555,5 @@ if __name__ == "__main__":
         min_frames_for_count=args.min_frames,
         process_fps=args.process_fps,
         show_window=False,
+        tracker_kind=args.tracker,
     )
\ No newline at end of file
@@ -4,7 +4,6 @@ Supports video files, images, and live camera streams
 """
 import cv2
 import numpy as np
-from ultralytics import YOLO
 import json
 import sys
 import os
@@ -12,44 +11,95 @@ from datetime import datetime
 from collections import defaultdict
 import time
 
+# ai-module/src on the path for the shared utils package
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from utils.progress import ProgressReporter, ndjson_sink
+from utils.yolo_backend import load_yolo
+from utils.event_log import EventLog
+from tracking.tracker import create_tracker
+from tracking.store import TrackStore, TrackView, column
+from counting.lines import LineCrossing, axis_line
+
+# Product categories from COCO dataset
+PRODUCT_CLASSES = {
+    39: 'bottle', 40: 'wine glass', 41: 'cup', 42: 'fork', 43: 'knife',
+    44: 'spoon', 45: 'bowl', 46: 'banana', 47: 'apple', 48: 'sandwich',
+    49: 'orange', 50: 'broccoli', 51: 'carrot', 52: 'hot dog', 53: 'pizza',
+    54: 'donut', 55: 'cake', 56: 'chair', 57: 'couch', 58: 'potted plant',
+    59: 'bed', 60: 'dining table', 61: 'toilet', 62: 'tv', 63: 'laptop',
+    64: 'mouse', 65: 'remote', 66: 'keyboard', 67: 'cell phone', 68: 'microwave',
+    69: 'oven', 70: 'toaster', 71: 'sink', 72: 'refrigerator', 73: 'book',
+    74: 'clock', 75: 'vase', 76: 'scissors', 77: 'teddy bear', 78: 'hair drier',
+    79: 'toothbrush'
+}
+
+# Tracked object state, one row per object (tracking.store)
+OBJECT_COLUMNS = {
+    'centroid': ('int32', (2,)),
+    'bbox': ('int32', (4,)),      # x, y, w, h
+    'class_id': ('int32',),
+    'confidence': ('float32',),
+    'disappeared': ('int32',),
+    'first_seen': ('float64',),   # time.time()
+    'last_seen': ('float64',),
+}
+
+
+class TrackedObject(TrackView):
+    """One tracked product: a row of ProductCounter.tracked_objects"""
+    __slots__ = ()
+
+    centroid = column('centroid')
+    bbox = column('bbox')
+    class_id = column('class_id')
+    confidence = column('confidence')
+    disappeared = column('disappeared')
+
+    @property
+    def class_name(self):
+        return PRODUCT_CLASSES.get(self.class_id, 'unknown')
+
+    @property
+    def first_seen(self):
+        return datetime.fromtimestamp(self.store.first_seen[self.row])
+
+    @property
+    def last_seen(self):
+        return datetime.fromtimestamp(self.store.last_seen[self.row])
+
+
 class ProductCounter:
-    def __init__(self, model_path='yolov8n.pt', confidence_threshold=0.25, iou_threshold=0.45):
+    def __init__(self, model_path='yolov8n.pt', confidence_threshold=0.25, iou_threshold=0.45, tracker=None):
         """
         Initialize product counter with YOLO model
         
         Args:
-            model_path: Path to YOLO model weights
+            model_path: Path to YOLO model weights; None for tracking only (no detect_products)
             confidence_threshold: Minimum confidence for detections
             iou_threshold: IOU threshold for NMS
+            tracker: 'legacy' (built-in centroid tracking) or a tracker from the
+                     tracking package; defaults to SMARTEYE_TRACKER
         """
-        self.model = YOLO(model_path)
+        self.model = load_yolo(model_path) if model_path else None
         self.confidence_threshold = confidence_threshold
         self.iou_threshold = iou_threshold
         
         # Tracking
-        self.tracked_objects = {}
+        self.tracked_objects = TrackStore(OBJECT_COLUMNS, view=TrackedObject)
         self.next_object_id = 0
         self.counted_ids = set()
-        self.counting_line = None
+        self.counting_line = None  # y of the counting line, set on the first drawn frame
+        self.crossing = LineCrossing()  # counting.lines, fed every tracked centroid
         self.max_disappeared = 30
         self.max_distance = 100
+        self.tracker = create_tracker(tracker, max_missed=self.max_disappeared, metric='centroid',
+                                      max_distance=self.max_distance, first_id=0)
         
-        # Product categories from COCO dataset
-        self.product_classes = {
-            39: 'bottle', 40: 'wine glass', 41: 'cup', 42: 'fork', 43: 'knife',
-            44: 'spoon', 45: 'bowl', 46: 'banana', 47: 'apple', 48: 'sandwich',
-            49: 'orange', 50: 'broccoli', 51: 'carrot', 52: 'hot dog', 53: 'pizza',
-            54: 'donut', 55: 'cake', 56: 'chair', 57: 'couch', 58: 'potted plant',
-            59: 'bed', 60: 'dining table', 61: 'toilet', 62: 'tv', 63: 'laptop',
-            64: 'mouse', 65: 'remote', 66: 'keyboard', 67: 'cell phone', 68: 'microwave',
-            69: 'oven', 70: 'toaster', 71: 'sink', 72: 'refrigerator', 73: 'book',
-            74: 'clock', 75: 'vase', 76: 'scissors', 77: 'teddy bear', 78: 'hair drier',
-            79: 'toothbrush'
-        }
+        self.product_classes = PRODUCT_CLASSES
         
         # Stats
         self.detection_counts = defaultdict(int)
-        self.detection_history = []
+        self.detection_history = EventLog()  # bounded in memory, spills to disk
         self.image_output_dir = None
         
     def detect_products(self, frame):
@@ -79,59 +129,56 @@ class ProductCounter:
     
     def update_tracking(self, detections, frame=None):
         """Update object tracking with centroid tracking algorithm"""
+        if self.tracker is not None:
+            tracked = self.update_shared_tracking(detections, frame)
+            self.count_line_crossings(frame)
+            return tracked
+
+        objects = self.tracked_objects
+        rows = objects.rows()
         if len(detections) == 0:
             # Mark disappeared objects
-            for obj_id in list(self.tracked_objects.keys()):
-                self.tracked_objects[obj_id]['disappeared'] += 1
-                if self.tracked_objects[obj_id]['disappeared'] > self.max_disappeared:
-                    del self.tracked_objects[obj_id]
+            objects.disappeared[rows] += 1
+            self.drop_disappeared(rows)
+            self.count_line_crossings(frame)
             return []
         
         input_centroids = np.array([d['centroid'] for d in detections])
         
-        if len(self.tracked_objects) == 0:
+        if len(rows) == 0:
             # Register all detections as new objects
             for detection in detections:
                 self.register_object(detection)
         else:
             # Match existing objects with new detections
-            object_ids = list(self.tracked_objects.keys())
-            object_centroids = np.array([self.tracked_objects[oid]['centroid'] for oid in object_ids])
+            object_centroids = objects.centroid[rows]
             
             # Compute distances
             distances = np.linalg.norm(object_centroids[:, np.newaxis] - input_centroids, axis=2)
             
             # Hungarian algorithm (simplified greedy matching)
-            rows = distances.min(axis=1).argsort()
-            cols = distances.argmin(axis=1)[rows]
+            order = distances.min(axis=1).argsort()
+            cols = distances.argmin(axis=1)[order]
             
             used_rows = set()
             used_cols = set()
+            matches = []
             
-            for (row, col) in zip(rows, cols):
+            for (row, col) in zip(order, cols):
                 if row in used_rows or col in used_cols:
                     continue
                 
                 if distances[row, col] > self.max_distance:
                     continue
                 
-                object_id = object_ids[row]
-                old_centroid = self.tracked_objects[object_id]['centroid']
-                new_centroid = detections[col]['centroid']
-                
-                # Update tracked object
-                self.tracked_objects[object_id]['centroid'] = new_centroid
-                self.tracked_objects[object_id]['bbox'] = detections[col]['bbox']
-                self.tracked_objects[object_id]['confidence'] = detections[col]['confidence']
-                self.tracked_objects[object_id]['disappeared'] = 0
-                self.tracked_objects[object_id]['last_seen'] = datetime.now()
-                
-                # Check line crossing
-                if self.counting_line is not None and frame is not None:
-                    self.check_line_crossing(object_id, old_centroid, new_centroid, frame, detections[col])
-                
                 used_rows.add(row)
                 used_cols.add(col)
+                matches.append((row, col))
+            
+            # Update tracked objects, one write per column
+            if matches:
+                matched, matched_cols = zip(*matches)
+                self.update_objects(rows[list(matched)], [detections[col] for col in matched_cols])
             
             # Register new detections
             unused_cols = set(range(len(input_centroids))) - used_cols
@@ -139,62 +186,117 @@ class ProductCounter:
                 self.register_object(detections[col])
             
             # Mark disappeared objects
-            unused_rows = set(range(len(object_centroids))) - used_rows
-            for row in unused_rows:
-                object_id = object_ids[row]
-                self.tracked_objects[object_id]['disappeared'] += 1
-                if self.tracked_objects[object_id]['disappeared'] > self.max_disappeared:
-                    del self.tracked_objects[object_id]
-        
-        return list(self.tracked_objects.keys())
+            unused = np.ones(len(rows), dtype=bool)
+            unused[list(used_rows)] = False
+            objects.disappeared[rows[unused]] += 1
+            self.drop_disappeared(rows[unused])
+        
+        self.count_line_crossings(frame)
+        return list(objects)
     
-    def register_object(self, detection):
+    def update_shared_tracking(self, detections, frame=None):
+        """update_tracking on a tracker from the shared tracking package"""
+        boxes = [[x, y, x + w, y + h] for x, y, w, h in (d['bbox'] for d in detections)]
+        ids = self.tracker.update(boxes,
+                                  [d['confidence'] for d in detections],
+                                  [d['class_id'] for d in detections])
+
+        objects = self.tracked_objects
+        matched_rows, matched = [], []
+        for detection, object_id in zip(detections, self.tracker.det_track_ids.tolist()):
+            if object_id < 0:
+                continue  # dropped by the tracker (low-score ByteTrack detection)
+            row = objects.row(object_id)
+            if row is None:
+                self.register_object(detection, object_id)
+                continue
+
+            matched_rows.append(row)
+            matched.append(detection)
+        self.update_objects(matched_rows, matched)
+
+        # Drop objects the tracker retired, age the unmatched ones
+        rows = objects.rows()
+        live = np.isin(objects.ids[rows], ids)
+        self.drop_disappeared(rows[~live], force=True)
+        rows = rows[live]
+        objects.disappeared[rows] = self.tracker.missed[np.searchsorted(ids, objects.ids[rows])]
+
+        return list(objects)
+
+    def update_objects(self, rows, detections):
+        """Write matched detections into their tracked objects"""
+        if not len(detections):
+            return
+        objects = self.tracked_objects
+        values = np.array([(*d['centroid'], *d['bbox']) for d in detections], dtype=np.int32)
+        objects.centroid[rows] = values[:, :2]
+        objects.bbox[rows] = values[:, 2:]
+        objects.confidence[rows] = np.fromiter((d['confidence'] for d in detections), dtype=np.float32,
+                                               count=len(detections))
+        objects.disappeared[rows] = 0
+        objects.last_seen[rows] = time.time()
+
+    def drop_disappeared(self, rows, force=False):
+        """Forget objects at rows missing for too long (all of them with force)"""
+        objects = self.tracked_objects
+        if not force:
+            rows = rows[objects.disappeared[rows] > self.max_disappeared]
+        self.counted_ids.difference_update(objects.ids[rows].tolist())
+        objects.remove(rows)
+
+    def register_object(self, detection, object_id=None):
         """Register a new tracked object"""
-        self.tracked_objects[self.next_object_id] = {
-            'centroid': detection['centroid'],
-            'bbox': detection['bbox'],
-            'class_id': detection['class_id'],
-            'class_name': detection['class_name'],
-            'confidence': detection['confidence'],
-            'disappeared': 0,
-            'first_seen': datetime.now(),
-            'last_seen': datetime.now()
-        }
-        self.next_object_id += 1
+        if object_id is None:
+            object_id = self.next_object_id
+            self.next_object_id += 1
+        now = time.time()
+        self.tracked_objects.add([object_id],
+                                 centroid=[detection['centroid']],
+                                 bbox=[detection['bbox']],
+                                 class_id=detection['class_id'],
+                                 confidence=detection['confidence'],
+                                 first_seen=now,
+                                 last_seen=now)
     
-    def check_line_crossing(self, object_id, old_centroid, new_centroid, frame, detection):
-        """Check if object crossed the counting line"""
-        if object_id in self.counted_ids:
+    def count_line_crossings(self, frame=None):
+        """Count tracked objects whose centroid crossed the counting line since the last update"""
+        if self.counting_line is not None and frame is not None and not len(self.crossing):
+            self.crossing.add_line(axis_line('counting_line', 'horizontal', self.counting_line,
+                                             frame.shape[1], direction='down'))
+
+        objects = self.tracked_objects
+        rows = objects.rows()
+        events = self.crossing.update(objects.ids[rows], objects.centroid[rows])
+        if frame is None:
             return
-        
-        old_y = old_centroid[1]
-        new_y = new_centroid[1]
-        
-        # Check if crossed the line
-        if (old_y < self.counting_line <= new_y) or (old_y > self.counting_line >= new_y):
-            direction = 'DOWN' if new_y > old_y else 'UP'
+
+        for crossing in events:
+            object_id = crossing.track_id
+            obj = objects[object_id]
+            direction = 'DOWN' if crossing.direction == 'in' else 'UP'
             self.counted_ids.add(object_id)
             
             # Update class-specific count
-            class_name = detection['class_name']
+            class_name = obj.class_name
             self.detection_counts[class_name] += 1
             
             # Capture image if enabled
             captured_image = None
-            if self.image_output_dir and frame is not None:
+            if self.image_output_dir:
                 captured_image = self.capture_detection_image(
-                    frame, object_id, detection['bbox'], class_name
+                    frame, object_id, obj.bbox, class_name
                 )
             
             # Record detection event
             event = {
                 'object_id': object_id,
-                'class_id': detection['class_id'],
+                'class_id': obj.class_id,
                 'class_name': class_name,
                 'direction': direction,
                 'timestamp': datetime.now().isoformat(),
-                'confidence': detection['confidence'],
-                'position': new_centroid,
+                'confidence': obj.confidence,
+                'position': tuple(obj.centroid),
                 'captured_image': captured_image
             }
             self.detection_history.append(event)
@@ -249,8 +351,8 @@ class ProductCounter:
         
         # Draw tracked objects
         for obj_id, obj in self.tracked_objects.items():
-            x, y, w, h = obj['bbox']
-            cx, cy = obj['centroid']
+            x, y, w, h = obj.bbox
+            cx, cy = obj.centroid
             
             # Color: green if counted, blue if tracking
             color = (0, 255, 0) if obj_id in self.counted_ids else (255, 0, 0)
@@ -260,7 +362,7 @@ class ProductCounter:
             cv2.circle(frame, (cx, cy), 4, color, -1)
             
             # Draw label
-            label = f"ID:{obj_id} {obj['class_name']} {obj['confidence']:.2f}"
+            label = f"ID:{obj_id} {obj.class_name} {obj.confidence:.2f}"
             label_size = cv2.getTextSize(label, cv2.FONT_HERSHEY_SIMPLEX, 0.5, 2)[0]
             cv2.rectangle(frame, (x, y - label_size[1] - 10), (x + label_size[0], y), color, -1)
             cv2.putText(frame, label, (x, y - 5),
@@ -311,8 +413,11 @@ class ProductCounter:
         
         return frame, len(tracked_ids), sum(self.detection_counts.values())
     
-    def process_video(self, video_source, output_path=None, image_output_dir=None):
-        """Process video file or stream"""
+    def process_video(self, video_source, output_path=None, image_output_dir=None, on_progress=None):
+        """
+        Process video file or stream
+        on_progress: optional callable receiving rate-limited progress events (utils/progress.py)
+        """
         self.image_output_dir = image_output_dir
         
         # Open video
@@ -334,6 +439,7 @@ class ProductCounter:
         
         frame_count = 0
         start_time = time.time()
+        progress = ProgressReporter(on_progress, total_frames=total_frames) if on_progress else None
         
         print(f"[OK] Processing video: {width}x{height} @ {fps}fps")
         if image_output_dir:
@@ -351,13 +457,12 @@ class ProductCounter:
             
             frame_count += 1
             
-            # Progress update every 5 seconds
-            if total_frames > 0 and frame_count % (fps * 5) == 0:
-                progress = (frame_count / total_frames * 100)
-                elapsed = time.time() - start_time
-                print(f"Progress: {frame_count}/{total_frames} ({progress:.1f}%) - "
-                      f"Counted: {total_count} - Time: {elapsed:.1f}s")
+            # Rate-limited progress events
+            if progress is not None and progress.due():
+                progress.update(frame_count, {'total_count': total_count, 'active_tracks': active_count})
         
+        if progress is not None:
+            progress.finish(frame_count, {'total_count': sum(self.detection_counts.values())})
         cap.release()
         if writer:
             writer.release()
@@ -369,7 +474,7 @@ class ProductCounter:
             'product_counts': dict(self.detection_counts),
             'frames_processed': frame_count,
             'images_captured': len(self.detection_history),
-            'detections': self.detection_history,
+            'detections': self.detection_history.to_list(),
             'processing_time': processing_time,
             'video_info': {
                 'width': width,
@@ -443,6 +548,7 @@ def main():
     output_path = None
     image_dir = None
     model_path = 'yolov8n.pt'
+    tracker = None
     
     i = 3
     while i < len(sys.argv):
@@ -455,14 +561,17 @@ def main():
         elif sys.argv[i] == '--model' and i + 1 < len(sys.argv):
             model_path = sys.argv[i + 1]
             i += 2
+        elif sys.argv[i] == '--tracker' and i + 1 < len(sys.argv):
+            tracker = sys.argv[i + 1]
+            i += 2
         else:
             i += 1
     
     try:
-        counter = ProductCounter(model_path=model_path)
+        counter = ProductCounter(model_path=model_path, tracker=tracker)
         
         if mode == 'video' or mode == 'stream':
-            results = counter.process_video(source, output_path, image_dir)
+            results = counter.process_video(source, output_path, image_dir, on_progress=ndjson_sink())
         elif mode == 'image':
             results = counter.process_image(source, output_path)
         else:
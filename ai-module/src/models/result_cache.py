@@ -0,0 +1,168 @@
+"""
+result_cache.py
+Content-addressed, disk-backed cache of video analysis results.
+
+Key = sha256(file content) + every processing parameter + model version, so a
+re-submitted upload with the same settings is answered without reprocessing.
+Entries are JSON files; the least recently used ones are evicted once the
+total size exceeds the configured budget.
+"""
+
+import os
+import json
+import time
+import hashlib
+import tempfile
+import threading
+from importlib import metadata
+
+import numpy as np
+
+DEFAULT_CACHE_DIR = os.environ.get(
+    'DETECTION_CACHE_DIR', os.path.join(tempfile.gettempdir(), 'smarteye_result_cache')
+)
+DEFAULT_CACHE_MAX_MB = float(os.environ.get('DETECTION_CACHE_MAX_MB', 512))
+
+# Bump when the processing pipeline changes in a way that alters results
+PIPELINE_VERSION = '3'
+
+# Processing parameters that only affect speed, left out of the key
+NON_RESULT_PARAMS = ('batch_size',)
+
+# Weight files and packages whose version is part of the cache key
+MODEL_FILES = ('yolov8n.pt', 'yolov8n-face.pt', 'yolov8n.onnx', 'yolov8n-face.onnx',
+               'gender_net.caffemodel', 'gender_deploy.prototxt')
+MODEL_PACKAGES = ('ultralytics', 'deepface', 'opencv-python', 'opencv-python-headless', 'onnxruntime', 'openvino')
+
+
+def model_version(models_dir):
+    """
+    Fingerprint of the models that produce a result, computed without
+    importing the frameworks (weights file size/mtime + package versions).
+    """
+    parts = [f"pipeline={PIPELINE_VERSION}"]
+    for name in MODEL_FILES:
+        path = os.path.join(models_dir, name)
+        if os.path.exists(path):
+            st = os.stat(path)
+            parts.append(f"{name}={st.st_size}:{int(st.st_mtime)}")
+    for package in MODEL_PACKAGES:
+        try:
+            parts.append(f"{package}={metadata.version(package)}")
+        except metadata.PackageNotFoundError:
+            pass
+    return hashlib.sha256('|'.join(parts).encode()).hexdigest()[:16]
+
+
+def make_key(file_hash, params, version):
+    params = {name: value for name, value in params.items() if name not in NON_RESULT_PARAMS}
+    payload = json.dumps({'file': file_hash, 'params': params, 'model': version}, sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+def _json_default(obj):
+    if isinstance(obj, np.integer):
+        return int(obj)
+    if isinstance(obj, np.floating):
+        return float(obj)
+    if isinstance(obj, np.ndarray):
+        return obj.tolist()
+    return str(obj)
+
+
+class ResultCache:
+    """Disk-backed LRU cache of JSON results, bounded by total size in bytes"""
+
+    def __init__(self, cache_dir=DEFAULT_CACHE_DIR, max_bytes=int(DEFAULT_CACHE_MAX_MB * 1024 * 1024)):
+        self.cache_dir = cache_dir
+        self.max_bytes = max(0, int(max_bytes))
+        os.makedirs(self.cache_dir, exist_ok=True)
+
+        self._lock = threading.Lock()
+        self._entries = {}  # key -> (last_used, size)
+        self.hits = 0
+        self.misses = 0
+        self._load_index()
+
+    def _path(self, key):
+        return os.path.join(self.cache_dir, f"{key}.json")
+
+    def _load_index(self):
+        for name in os.listdir(self.cache_dir):
+            if not name.endswith('.json'):
+                continue
+            try:
+                st = os.stat(os.path.join(self.cache_dir, name))
+            except OSError:
+                continue
+            # File mtime doubles as the last-used time across restarts
+            self._entries[name[:-5]] = (st.st_mtime, st.st_size)
+
+    def total_bytes(self):
+        return sum(size for _, size in self._entries.values())
+
+    def get(self, key):
+        with self._lock:
+            if key not in self._entries:
+                self.misses += 1
+                return None
+            path = self._path(key)
+            try:
+                with open(path, 'r') as f:
+                    result = json.load(f)
+                now = time.time()
+                os.utime(path, (now, now))
+                self._entries[key] = (now, self._entries[key][1])
+            except (OSError, ValueError):
+                self._entries.pop(key, None)
+                self.misses += 1
+                return None
+            self.hits += 1
+            return result
+
+    def put(self, key, result):
+        data = json.dumps(result, default=_json_default).encode()
+        if len(data) > self.max_bytes:
+            return False
+
+        with self._lock:
+            fd, tmp = tempfile.mkstemp(dir=self.cache_dir, suffix='.tmp')
+            try:
+                with os.fdopen(fd, 'wb') as f:
+                    f.write(data)
+                os.replace(tmp, self._path(key))
+            except OSError as e:
+                print("⚠️ Failed to write result cache entry:", e)
+                try:
+                    os.remove(tmp)
+                except OSError:
+                    pass
+                return False
+
+            self._entries[key] = (time.time(), len(data))
+            self._evict()
+            return True
+
+    def _evict(self):
+        total = self.total_bytes()
+        if total <= self.max_bytes:
+            return
+        for key, (_, size) in sorted(self._entries.items(), key=lambda item: item[1][0]):
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(self._path(key))
+            except OSError:
+                pass
+            del self._entries[key]
+            total -= size
+
+    def stats(self):
+        with self._lock:
+            return {
+                'entries': len(self._entries),
+                'total_mb': round(self.total_bytes() / (1024 * 1024), 2),
+                'max_mb': round(self.max_bytes / (1024 * 1024), 2),
+                'hits': self.hits,
+                'misses': self.misses,
+            }
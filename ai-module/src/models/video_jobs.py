@@ -0,0 +1,320 @@
+"""
+video_jobs.py
+Bounded worker-process pool for video detection jobs.
+
+Each worker process loads its own DetectionService once (YOLO + DeepFace) and
+then executes queued uploads one at a time. The Flask service only accepts the
+upload, hands the path to the pool and returns a job id that can be polled,
+fetched and cancelled.
+"""
+
+import os
+import uuid
+import threading
+import traceback
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures import wait as wait_futures
+from datetime import datetime
+
+DEFAULT_WORKERS = int(os.environ.get('DETECTION_WORKERS', 2))
+DEFAULT_MAX_QUEUED = int(os.environ.get('DETECTION_MAX_QUEUED', 16))
+JOB_HISTORY_LIMIT = 200
+
+FINISHED_STATES = ('completed', 'failed', 'cancelled')
+
+# Per-process detector, created by the pool initializer
+_worker_detector = None
+
+
+class QueueFullError(Exception):
+    """Raised when the job queue has no room for another upload"""
+
+
+def _init_worker(worker_status):
+    global _worker_detector
+    from detection_service_yolov8_with_tracking import DetectionService
+    # Loads and warms up every model before the worker accepts its first job
+    _worker_detector = DetectionService()
+    # Each process reports itself once, so readiness counts distinct workers
+    worker_status[os.getpid()] = _worker_readiness()
+
+
+def _worker_readiness():
+    status = _worker_detector.readiness()
+    status['pid'] = os.getpid()
+    return status
+
+
+def _worker_started():
+    return os.getpid()
+
+
+def _run_job(job_id, video_path, params, cancelled, progress, cleanup):
+    try:
+        return _worker_detector.process_video(
+            video_path,
+            job_id,
+            should_cancel=lambda: job_id in cancelled,
+            progress_callback=lambda event: progress.__setitem__(job_id, event),
+            **params
+        )
+    finally:
+        if cleanup:
+            try:
+                os.remove(video_path)
+            except OSError:
+                pass
+
+
+class VideoJobManager:
+    """Accepts video jobs and runs them on a fixed-size pool of worker processes"""
+
+    def __init__(self, max_workers=DEFAULT_WORKERS, max_queued=DEFAULT_MAX_QUEUED, result_cache=None):
+        """result_cache: optional ResultCache that receives every completed job's result"""
+        self.max_workers = max(1, int(max_workers))
+        self.max_queued = max(0, int(max_queued))
+        self.result_cache = result_cache
+
+        # spawn: never fork a process that already holds TensorFlow/PyTorch threads
+        ctx = multiprocessing.get_context('spawn')
+        self._manager = ctx.Manager()
+        self._cancelled = self._manager.dict()
+        # job_id -> latest progress event (written by workers at a bounded rate)
+        self._progress = self._manager.dict()
+        # worker pid -> readiness, written once by each worker after loading its models
+        self._worker_status = self._manager.dict()
+        self._executor = ProcessPoolExecutor(
+            max_workers=self.max_workers,
+            mp_context=ctx,
+            initializer=_init_worker,
+            initargs=(self._worker_status,)
+        )
+
+        self._jobs = {}
+        self._warmup_futures = []
+        # Re-entrant: Future.cancel() runs done callbacks (which take the lock) synchronously
+        self._lock = threading.RLock()
+        print(f"🧵 Video job pool started: {self.max_workers} workers, {self.max_queued} queued max")
+
+    def _active_count(self):
+        return sum(1 for job in self._jobs.values() if job['status'] not in FINISHED_STATES)
+
+    def submit(self, video_path, params=None, cleanup=True, job_id=None, cache_key=None):
+        """
+        Queue a video for processing.
+        params: keyword arguments forwarded to DetectionService.process_video
+        cleanup: delete video_path once the job has finished
+        cache_key: store the result under this key in the result cache on success
+        """
+        with self._lock:
+            if self._active_count() >= self.max_workers + self.max_queued:
+                raise QueueFullError('Video job queue is full, try again later')
+
+            job_id = job_id or f"job_{uuid.uuid4().hex[:12]}"
+            job = {
+                'job_id': job_id,
+                'status': 'queued',
+                'params': dict(params or {}),
+                'created_at': datetime.now().isoformat(),
+                'finished_at': None,
+                'error': None,
+                'result': None,
+                'video_path': video_path,
+                'cleanup': cleanup,
+                'cache_key': cache_key,
+                'cache_hit': False,
+            }
+            job['future'] = self._executor.submit(
+                _run_job, job_id, video_path, job['params'], self._cancelled, self._progress, cleanup
+            )
+            self._jobs[job_id] = job
+
+        job['future'].add_done_callback(lambda f, jid=job_id: self._on_done(jid, f))
+        return job_id
+
+    def _on_done(self, job_id, future):
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None or 'future' not in job:
+                return
+
+            if future.cancelled():
+                job['status'] = 'cancelled'
+                # The worker never saw this job, so the upload is still on disk
+                if job['cleanup']:
+                    try:
+                        os.remove(job['video_path'])
+                    except OSError:
+                        pass
+            elif future.exception() is not None:
+                exc = future.exception()
+                job['status'] = 'failed'
+                job['error'] = str(exc)
+                traceback.print_exception(type(exc), exc, exc.__traceback__)
+            else:
+                result = future.result()
+                job['result'] = result
+                if result.get('cancelled'):
+                    job['status'] = 'cancelled'
+                elif result.get('success'):
+                    job['status'] = 'completed'
+                    if self.result_cache is not None and job['cache_key']:
+                        self.result_cache.put(job['cache_key'], result)
+                else:
+                    job['status'] = 'failed'
+                    job['error'] = result.get('message')
+
+            job['finished_at'] = datetime.now().isoformat()
+            job.pop('future', None)
+
+            try:
+                self._cancelled.pop(job_id, None)
+            except Exception:
+                pass
+
+            self._prune()
+
+    def add_cached(self, result, params=None):
+        """Record a job answered from the result cache; returns its job id"""
+        with self._lock:
+            job_id = f"job_{uuid.uuid4().hex[:12]}"
+            now = datetime.now().isoformat()
+            self._jobs[job_id] = {
+                'job_id': job_id,
+                'status': 'completed',
+                'params': dict(params or {}),
+                'created_at': now,
+                'finished_at': now,
+                'error': None,
+                'result': result,
+                'video_path': None,
+                'cleanup': False,
+                'cache_key': None,
+                'cache_hit': True,
+            }
+            self._prune()
+            return job_id
+
+    def _prune(self):
+        finished = [jid for jid, job in self._jobs.items() if job['status'] in FINISHED_STATES]
+        for jid in finished[:max(0, len(finished) - JOB_HISTORY_LIMIT)]:
+            del self._jobs[jid]
+            try:
+                self._progress.pop(jid, None)
+            except Exception:
+                pass
+
+    def _snapshot(self, job):
+        status = job['status']
+        future = job.get('future')
+        if status == 'queued' and future is not None and future.running():
+            status = 'running'
+        return {
+            'job_id': job['job_id'],
+            'status': status,
+            'params': job['params'],
+            'created_at': job['created_at'],
+            'finished_at': job['finished_at'],
+            'error': job['error'],
+            'cache_hit': job['cache_hit'],
+        }
+
+    def status(self, job_id):
+        with self._lock:
+            job = self._jobs.get(job_id)
+            return self._snapshot(job) if job else None
+
+    def result(self, job_id):
+        """Returns (status snapshot, result) or (None, None) for unknown jobs"""
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None:
+                return None, None
+            return self._snapshot(job), job['result']
+
+    def progress(self, job_id):
+        """Latest progress event reported for a job, or None"""
+        try:
+            event = self._progress.get(job_id)
+        except Exception:
+            return None
+        return dict(event) if event is not None else None
+
+    def wait(self, job_id, timeout=None):
+        with self._lock:
+            job = self._jobs.get(job_id)
+            future = job.get('future') if job else None
+        if future is not None:
+            wait_futures([future], timeout=timeout)
+            # The done callback may not have run yet; _on_done is idempotent
+            if future.done():
+                self._on_done(job_id, future)
+        return self.result(job_id)
+
+    def cancel(self, job_id):
+        """
+        Cancel a queued or running job.
+        Queued jobs are dropped immediately; running jobs stop at the next batch boundary.
+        """
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None:
+                return None
+            if job['status'] in FINISHED_STATES:
+                return self._snapshot(job)
+
+            future = job.get('future')
+            if future is not None and future.cancel():
+                job['status'] = 'cancelled'
+            else:
+                self._cancelled[job_id] = True
+                job['status'] = 'cancelling'
+            return self._snapshot(job)
+
+    def prestart(self):
+        """
+        Start every worker now so model loading and warm-up happen at boot
+        instead of on the first uploaded video.
+        """
+        with self._lock:
+            if not self._warmup_futures:
+                # Queued together, these make the pool spawn every worker; readiness
+                # itself comes from each worker's initializer (_worker_status)
+                self._warmup_futures = [self._executor.submit(_worker_started)
+                                        for _ in range(self.max_workers)]
+
+    def worker_readiness(self):
+        with self._lock:
+            futures = list(self._warmup_futures)
+        workers = list(self._worker_status.values())
+        for future in futures:
+            if len(workers) >= self.max_workers:
+                break
+            if not future.done():
+                workers.append({'ready': False, 'state': 'loading'})
+            elif future.cancelled() or future.exception() is not None:
+                error = 'cancelled' if future.cancelled() else str(future.exception())
+                workers.append({'ready': False, 'state': 'failed', 'error': error})
+        return {
+            'prestarted': bool(futures),
+            'ready': sum(1 for w in workers if w['ready']),
+            'total': self.max_workers,
+            'workers': workers,
+        }
+
+    def stats(self):
+        with self._lock:
+            counts = {}
+            for job in self._jobs.values():
+                status = self._snapshot(job)['status']
+                counts[status] = counts.get(status, 0) + 1
+            return {
+                'max_workers': self.max_workers,
+                'max_queued': self.max_queued,
+                'jobs': counts,
+            }
+
+    def shutdown(self):
+        self._executor.shutdown(wait=False, cancel_futures=True)
+        self._manager.shutdown()
@@ -0,0 +1,9 @@
+"""
+Shared tracking package for the SmartEye counters.
+"""
+
+from .tracker import Tracker, create_tracker, TRACKER_KIND, TRACKER_KINDS
+from .bytetrack import ByteTracker
+from .deepsort import DeepSortTracker
+from .store import TrackStore, TrackView, TrackArchive
+from .adapters import SharedCentroidTracker
@@ -0,0 +1,46 @@
+"""
+adapters.py
+Script-facing tracker interfaces on top of tracking.tracker.
+
+SharedCentroidTracker keeps the interface of the box CentroidTracker in
+conveyor_counter.py and object_counter_full.py (objects, history, centroid(),
+update(boxes) -> ids) while a shared tracker does the association:
+
+    tracker = SharedCentroidTracker('bytetrack', max_disappeared=30, iou_threshold=0.25)
+    for oid in tracker.update(boxes):
+        prev, curr = tracker.history[oid][-2:]
+"""
+
+from .history import TrajectoryStore
+from .tracker import create_tracker
+
+
+class SharedCentroidTracker:
+    """
+    CentroidTracker interface on top of the shared tracking package (--tracker).
+    objects: id -> x1, y1, x2, y2 box of the live tracks
+    history: id -> ring of centroids, appended on the frames the track was matched
+    """
+
+    def __init__(self, kind, max_disappeared=30, iou_threshold=0.25):
+        self.objects = {}
+        self.history = TrajectoryStore()
+        self.iou_threshold = iou_threshold
+        self.max_disappeared = max_disappeared
+        self.core = create_tracker(kind, max_missed=max_disappeared, metric="iou",
+                                   iou_threshold=iou_threshold, first_id=0)
+
+    @staticmethod
+    def centroid(box):
+        x1, y1, x2, y2 = box
+        return ((x1 + x2) / 2.0, (y1 + y2) / 2.0)
+
+    def update(self, detections):
+        """detections: list of x1, y1, x2, y2 boxes; returns the live ids"""
+        ids = self.core.update(detections)
+        self.objects = self.core.as_dict()
+        matched = self.core.matched
+        for oid, c in zip(ids[matched].tolist(), self.core.centroids()[matched].tolist()):
+            self.history[oid].append(tuple(c))
+        self.history.retain(self.objects)
+        return ids.tolist()
@@ -0,0 +1,499 @@
+"""
+benchmark.py
+Tracker micro-benchmark and MOT accuracy harness.
+
+Generates synthetic trajectories with ground-truth ids (crossing walkers,
+walkers passing behind occluders, dense crowds, conveyor flow), turns them
+into noisy detections (jitter, dropouts, weak partial detections, false
+positives) and replays them through every tracker implementation at several
+densities. Reports per-update latency percentiles, peak memory, ID switches,
+fragmentation, recall and the line-count error against ground truth.
+
+Run from ai-module/src:
+
+    python -m tracking.benchmark
+    python -m tracking.benchmark --scenarios crowd conveyor --densities 50 200 --trackers vectorized bytetrack
+    python -m tracking.benchmark --json tracker_bench.json
+    SMARTEYE_TRACKER_GRID=1 python -m tracking.benchmark   # with spatial-grid gating
+
+Trackers: the shared ones (see TRACKER_KINDS) plus the per-script legacy
+trackers (LEGACY_TRACKERS): line_counter, people_counter, conveyor_counter,
+object_counter, object_counter_full, people_count_video, people_count_continuous
+and product_counter's built-in tracking. Legacy kinds whose script dependencies
+(ultralytics, requests) are missing are skipped.
+
+Not replayed: PersonTracker in detection_service_yolov8_with_tracking.py.
+Importing that module starts the service (models, worker pool), so it cannot
+be loaded as a library; the service's shared trackers are covered above.
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+import tracemalloc
+from collections import namedtuple
+
+import cv2
+import numpy as np
+
+from utils.box_utils import centroids, greedy_assignment
+from .tracker import create_tracker, TRACKER_KINDS
+
+FRAME_SIZE = (1280, 720)   # width, height
+DETECT_CONF = 0.5          # confidence the counters keep (ByteTrack asks for less)
+JITTER = 2.0               # detection position noise (px, std)
+DROPOUT = 0.03             # probability a visible object is not detected
+WEAK_RATE = 0.1            # probability a detection comes back with a low score
+FALSE_POSITIVE_RATE = 0.01 # false positives per object per frame
+MAX_MISSED = 30
+
+SCENARIOS = ('crossing', 'occlusion', 'crowd', 'conveyor')
+DENSITIES = (10, 50, 200)
+LEGACY_TRACKERS = ('legacy-line', 'legacy-people', 'legacy-conveyor', 'legacy-object', 'legacy-object-full',
+                   'legacy-people-video', 'legacy-people-stream', 'legacy-product')
+
+# One frame of a scenario: ground truth (gt_ids / gt_boxes, occluded objects
+# included) and the detections the tracker sees (det_ids is -1 for false positives)
+Frame = namedtuple('Frame', 'gt_ids gt_boxes det_ids det_boxes det_scores')
+Scenario = namedtuple('Scenario', 'name density frames line_x')
+
+
+# ---------------------------------------------------------------------------
+# Scenarios
+# ---------------------------------------------------------------------------
+
+class _World:
+    """Moving boxes with ids; scenarios spawn, move and retire them"""
+
+    def __init__(self, rng):
+        self.rng = rng
+        self.next_id = 0
+        self.ids = np.empty(0, dtype=np.int64)
+        self.pos = np.empty((0, 2))   # top-left corner
+        self.vel = np.empty((0, 2))
+        self.size = np.empty((0, 2))  # width, height
+
+    def spawn(self, pos, vel, size):
+        n = len(pos)
+        self.ids = np.concatenate([self.ids, np.arange(self.next_id, self.next_id + n)])
+        self.next_id += n
+        self.pos = np.concatenate([self.pos, pos])
+        self.vel = np.concatenate([self.vel, vel])
+        self.size = np.concatenate([self.size, size])
+
+    def retire(self, keep):
+        self.ids, self.pos, self.vel, self.size = self.ids[keep], self.pos[keep], self.vel[keep], self.size[keep]
+
+    def boxes(self):
+        return np.concatenate([self.pos, self.pos + self.size], axis=1)
+
+    def inside(self, margin=0.0):
+        w, h = FRAME_SIZE
+        b = self.boxes()
+        return (b[:, 2] > -margin) & (b[:, 0] < w + margin) & (b[:, 3] > -margin) & (b[:, 1] < h + margin)
+
+
+def _detect(rng, ids, boxes, visible):
+    """Noisy detector output for the visible ground-truth boxes"""
+    found = visible & (rng.random(len(ids)) >= DROPOUT)
+    det_ids = ids[found]
+    det_boxes = boxes[found] + rng.normal(0.0, JITTER, (int(found.sum()), 4))
+    scores = rng.uniform(0.55, 0.95, len(det_ids))
+    weak = rng.random(len(det_ids)) < WEAK_RATE
+    scores[weak] = rng.uniform(0.15, DETECT_CONF, int(weak.sum()))
+
+    n_fp = rng.poisson(FALSE_POSITIVE_RATE * max(1, len(ids)))
+    if n_fp:
+        w, h = FRAME_SIZE
+        xy = rng.uniform([0, 0], [w - 60, h - 120], (n_fp, 2))
+        fp = np.concatenate([xy, xy + rng.uniform([20, 20], [60, 120], (n_fp, 2))], axis=1)
+        det_ids = np.concatenate([det_ids, np.full(n_fp, -1)])
+        det_boxes = np.concatenate([det_boxes, fp])
+        scores = np.concatenate([scores, rng.uniform(0.15, 0.6, n_fp)])
+    return Frame(ids.copy(), boxes.copy(), det_ids, det_boxes.astype(np.float32), scores.astype(np.float32))
+
+
+def _walkers(world, rng, n, speed=(2.0, 6.0)):
+    """n pedestrians entering from the left or right edge, walking across"""
+    w, h = FRAME_SIZE
+    size = np.stack([rng.uniform(35, 50, n), rng.uniform(90, 120, n)], axis=1)
+    left = rng.random(n) < 0.5
+    x = np.where(left, -size[:, 0] + 1, w - 1)
+    y = rng.uniform(50, h - 170, n)
+    vx = np.where(left, 1, -1) * rng.uniform(*speed, n)
+    vy = rng.normal(0, 0.5, n)
+    world.spawn(np.stack([x, y], axis=1), np.stack([vx, vy], axis=1), size)
+
+
+def crossing(density, n_frames, rng):
+    """Walkers crossing the frame in both directions; paths intersect constantly"""
+    world = _World(rng)
+    frames = []
+    for _ in range(n_frames):
+        if len(world.ids) < density:
+            _walkers(world, rng, min(density - len(world.ids), max(1, density // 20)))
+        world.pos += world.vel
+        world.retire(world.inside())
+        frames.append(_detect(rng, world.ids, world.boxes(), np.ones(len(world.ids), dtype=bool)))
+    return frames
+
+
+def occlusion(density, n_frames, rng, pillars=3, pillar_width=90):
+    """Walkers crossing behind pillars: no detections while mostly hidden"""
+    w, _ = FRAME_SIZE
+    left = (np.arange(1, pillars + 1) * w / (pillars + 1)) - pillar_width / 2
+    world = _World(rng)
+    frames = []
+    for _ in range(n_frames):
+        if len(world.ids) < density:
+            _walkers(world, rng, min(density - len(world.ids), max(1, density // 20)))
+        world.pos += world.vel
+        world.retire(world.inside())
+        b = world.boxes()
+        cx = (b[:, 0] + b[:, 2]) / 2
+        hidden = ((cx[:, None] > left[None, :]) & (cx[:, None] < left[None, :] + pillar_width)).any(axis=1)
+        frames.append(_detect(rng, world.ids, b, ~hidden))
+    return frames
+
+
+def crowd(density, n_frames, rng, lifetime=(60, 240)):
+    """Dense random walk in the middle of the frame; heavy overlap, turning, stopping"""
+    w, h = FRAME_SIZE
+    region = np.array([w * 0.2, h * 0.1, w * 0.8, h * 0.9])
+    world = _World(rng)
+    expires = np.empty(0)
+    frames = []
+    for t in range(n_frames):
+        if len(world.ids) < density:
+            n = min(density - len(world.ids), max(1, density // 10))
+            size = np.stack([rng.uniform(35, 50, n), rng.uniform(90, 120, n)], axis=1)
+            pos = rng.uniform(region[:2], region[2:] - size)
+            world.spawn(pos, rng.normal(0, 1.5, (n, 2)), size)
+            expires = np.concatenate([expires, t + rng.integers(*lifetime, n)])
+        # Velocity drifts; walkers reflect off the region borders
+        world.vel = np.clip(world.vel + rng.normal(0, 0.4, world.vel.shape), -4, 4)
+        world.pos += world.vel
+        low = world.pos < region[:2]
+        high = world.pos + world.size > region[2:]
+        world.vel[low | high] *= -1
+        world.pos = np.clip(world.pos, region[:2], region[2:] - world.size)
+        keep = expires > t
+        world.retire(keep)
+        expires = expires[keep]
+        frames.append(_detect(rng, world.ids, world.boxes(), np.ones(len(world.ids), dtype=bool)))
+    return frames
+
+
+def conveyor(density, n_frames, rng, speed=14.0, lanes=4):
+    """Products on a fast belt moving right, close together, in a few lanes"""
+    w, h = FRAME_SIZE
+    lane_y = np.linspace(h * 0.2, h * 0.8, lanes)
+    spacing = max(1.0, (w + 80) / max(1, density / lanes))
+    world = _World(rng)
+    last_spawn = np.full(lanes, -np.inf)
+    frames = []
+    for t in range(n_frames):
+        gap = (t - last_spawn) * speed
+        lane = np.flatnonzero(gap >= spacing * rng.uniform(0.8, 1.2, lanes))
+        if len(lane) and len(world.ids) < density:
+            n = len(lane)
+            size = rng.uniform(50, 70, (n, 2))
+            pos = np.stack([-size[:, 0] + 1, lane_y[lane] + rng.normal(0, 4, n)], axis=1)
+            world.spawn(pos, np.stack([rng.normal(speed, 0.5, n), np.zeros(n)], axis=1), size)
+            last_spawn[lane] = t
+        world.pos += world.vel
+        world.retire(world.inside())
+        frames.append(_detect(rng, world.ids, world.boxes(), np.ones(len(world.ids), dtype=bool)))
+    return frames
+
+
+GENERATORS = {'crossing': crossing, 'occlusion': occlusion, 'crowd': crowd, 'conveyor': conveyor}
+
+
+def make_scenario(name, density, n_frames=300, seed=0):
+    rng = np.random.default_rng([seed, SCENARIOS.index(name), density])
+    return Scenario(name, density, GENERATORS[name](density, n_frames, rng), FRAME_SIZE[0] / 2.0)
+
+
+def render(canvas, frame):
+    """Draw the visible ground truth into canvas (for appearance-based trackers)"""
+    canvas[:] = 110
+    for gid, (x1, y1, x2, y2) in zip(frame.gt_ids.tolist(), frame.gt_boxes.astype(int).tolist()):
+        # Two deterministic colours per id (shirt / trousers)
+        rng = np.random.default_rng(gid)
+        upper, lower = rng.integers(0, 256, (2, 3)).tolist()
+        mid = (y1 + y2) // 2
+        cv2.rectangle(canvas, (x1, y1), (x2, mid), upper, -1)
+        cv2.rectangle(canvas, (x1, mid), (x2, y2), lower, -1)
+    return canvas
+
+
+# ---------------------------------------------------------------------------
+# Tracker adapters: step(boxes, scores, frame_idx, frame) -> (ids, centroids)
+# ---------------------------------------------------------------------------
+
+_encoder = None
+
+
+def reid_encoder():
+    """One ReID encoder for every DeepSORT replay (loaded on first use)"""
+    global _encoder
+    if _encoder is None:
+        from .reid import load_reid_encoder
+        _encoder = load_reid_encoder()
+    return _encoder
+
+
+class SharedAdapter:
+
+    def __init__(self, kind, **options):
+        if kind == 'deepsort':
+            options.setdefault('encoder', reid_encoder())
+        self.tracker = create_tracker(kind, max_missed=MAX_MISSED, **options)
+        self.min_score = getattr(self.tracker, 'min_score', DETECT_CONF)
+        self.needs_frame = kind == 'deepsort'
+
+    def step(self, boxes, scores, frame_idx, frame=None):
+        self.tracker.update(boxes, scores, None, frame_idx, frame=frame)
+        return self.tracker.ids, self.tracker.centroids()
+
+
+def _script(name):
+    """Import a models/ script; the scripts exit instead of raising when ultralytics is missing"""
+    models = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'models')
+    if models not in sys.path:
+        sys.path.insert(0, models)
+    try:
+        return __import__(name)
+    except SystemExit:
+        raise ImportError(f"{name} exited on import (missing dependency)")
+
+
+class LegacyAdapter:
+    """Per-script trackers: they take integer box tuples and return {id: box, centroid or Track}"""
+
+    min_score = DETECT_CONF
+    needs_frame = False
+
+    def __init__(self, kind):
+        self.kind = kind
+        if kind == 'legacy-line':
+            self.tracker = _script('line_counter').SimpleTracker(max_missed=MAX_MISSED)
+        elif kind == 'legacy-people':
+            self.tracker = _script('people_counter').SimplePersonTracker(max_disappeared=MAX_MISSED)
+        elif kind == 'legacy-conveyor':
+            self.tracker = _script('conveyor_counter').CentroidTracker(max_disappeared=MAX_MISSED)
+        elif kind == 'legacy-object':
+            # Drops tracks after a fixed 20 missed frames
+            self.tracker = _script('object_counter').SimpleTracker()
+        elif kind == 'legacy-object-full':
+            self.tracker = _script('object_counter_full').CentroidTracker(max_disappeared=MAX_MISSED)
+        elif kind == 'legacy-people-video':
+            self.tracker = _script('people_count_video').CentroidTracker(max_disappeared=MAX_MISSED)
+        elif kind == 'legacy-people-stream':
+            self.tracker = _script('people_count_continuous').CentroidTracker(max_disappeared=MAX_MISSED)
+        elif kind == 'legacy-product':
+            # Tracking only, no detector model
+            self.tracker = _script('product_counter').ProductCounter(model_path=None, tracker='legacy')
+            self.tracker.max_disappeared = MAX_MISSED
+        else:
+            raise ValueError(f"Unknown tracker '{kind}'")
+
+    def step(self, boxes, scores, frame_idx, frame=None):
+        dets = [tuple(b) for b in np.round(boxes).astype(int).tolist()]
+        if self.kind == 'legacy-line':
+            tracks = self.tracker.update(dets)
+            out = {tid: tr.bbox for tid, tr in tracks.items()}
+        elif self.kind == 'legacy-people':
+            out = self.tracker.update(dets, frame_idx)
+        elif self.kind == 'legacy-object':
+            self.tracker.update(dets)
+            out = self.tracker.tracks
+        elif self.kind in ('legacy-people-video', 'legacy-people-stream'):
+            # id -> centroid
+            objects = self.tracker.update(dets)
+            ids = np.fromiter(objects.keys(), dtype=np.int64, count=len(objects))
+            return ids, np.array(list(objects.values()), dtype=np.float32).reshape(-1, 2)
+        elif self.kind == 'legacy-product':
+            return self._step_product(dets, scores)
+        else:
+            self.tracker.update([list(d) for d in dets])
+            out = self.tracker.objects
+        ids = np.fromiter(out.keys(), dtype=np.int64, count=len(out))
+        return ids, centroids(list(out.values()))
+
+    def _step_product(self, dets, scores):
+        """ProductCounter.update_tracking on its detection dicts (bbox x, y, w, h)"""
+        detections = [{'bbox': [x1, y1, x2 - x1, y2 - y1], 'confidence': float(score), 'class_id': 39,
+                       'class_name': 'bottle', 'centroid': ((x1 + x2) // 2, (y1 + y2) // 2)}
+                      for (x1, y1, x2, y2), score in zip(dets, scores.tolist())]
+        self.tracker.update_tracking(detections)
+        objects = self.tracker.tracked_objects
+        rows = objects.rows()
+        return objects.ids[rows], objects.centroid[rows]
+
+
+def make_adapter(kind):
+    if kind in LEGACY_TRACKERS:
+        return LegacyAdapter(kind)
+    return SharedAdapter(kind)
+
+
+# ---------------------------------------------------------------------------
+# Replay and metrics
+# ---------------------------------------------------------------------------
+
+def replay(scenario, kind, measure_memory=False):
+    """Run one tracker over a scenario; returns (latencies in ms, per-frame outputs, peak bytes)"""
+    adapter = make_adapter(kind)
+    canvas = np.zeros((FRAME_SIZE[1], FRAME_SIZE[0], 3), dtype=np.uint8) if adapter.needs_frame else None
+    latencies = np.empty(len(scenario.frames))
+    outputs = []
+    if measure_memory:
+        tracemalloc.start()
+    try:
+        for t, frame in enumerate(scenario.frames):
+            keep = frame.det_scores >= adapter.min_score
+            image = render(canvas, frame) if canvas is not None else None
+            start = time.perf_counter()
+            ids, cents = adapter.step(frame.det_boxes[keep], frame.det_scores[keep], t, image)
+            latencies[t] = (time.perf_counter() - start) * 1000.0
+            if not measure_memory:
+                outputs.append((np.array(ids, dtype=np.int64), np.array(cents, dtype=np.float32).reshape(-1, 2)))
+        peak = tracemalloc.get_traced_memory()[1] if measure_memory else None
+    finally:
+        if measure_memory:
+            tracemalloc.stop()
+    return latencies, outputs, peak
+
+
+def _crossings(track_ids, xs, line_x, counted, last_x):
+    """Ids crossing x = line_x since their previous position (each id counted once)"""
+    n = 0
+    for tid, x in zip(track_ids, xs):
+        prev = last_x.get(tid)
+        if prev is not None and tid not in counted and (prev - line_x) * (x - line_x) < 0:
+            counted.add(tid)
+            n += 1
+        last_x[tid] = x
+    return n
+
+
+def evaluate(scenario, outputs):
+    """
+    Match ground truth to track outputs per frame (centroid distance under half
+    the box size) and compute MOT-style identity metrics and the count error.
+    """
+    last_track = {}
+    tracked_before = {}
+    id_switches = fragments = matched_total = gt_total = 0
+    gt_counted, gt_last = set(), {}
+    tr_counted, tr_last = set(), {}
+    gt_count = count = 0
+    track_ids_seen = set()
+
+    for frame, (ids, cents) in zip(scenario.frames, outputs):
+        gt_c = centroids(frame.gt_boxes)
+        gt_ids = frame.gt_ids.tolist()
+        gt_total += len(gt_ids)
+        track_ids_seen.update(ids.tolist())
+
+        gate = 0.5 * np.maximum(frame.gt_boxes[:, 2] - frame.gt_boxes[:, 0], frame.gt_boxes[:, 3] - frame.gt_boxes[:, 1])
+        rows = cols = np.empty(0, dtype=np.intp)
+        if len(gt_ids) and len(ids):
+            dist = np.sqrt(((gt_c[:, None, :] - cents[None, :, :]) ** 2).sum(axis=2))
+            rows, cols = greedy_assignment(np.where(dist < gate[:, None], 1.0 - dist / gate[:, None], 0.0), 0.0)
+        match = dict(zip(rows.tolist(), ids[cols].tolist()))
+        matched_total += len(match)
+
+        for row, gid in enumerate(gt_ids):
+            tid = match.get(row)
+            if tid is not None:
+                if gid in last_track and last_track[gid] != tid:
+                    id_switches += 1
+                if gid in tracked_before and not tracked_before[gid]:
+                    fragments += 1
+                last_track[gid] = tid
+                tracked_before[gid] = True
+            elif gid in tracked_before:
+                tracked_before[gid] = False
+
+        gt_count += _crossings(gt_ids, gt_c[:, 0].tolist(), scenario.line_x, gt_counted, gt_last)
+        count += _crossings(ids.tolist(), cents[:, 0].tolist(), scenario.line_x, tr_counted, tr_last)
+
+    return {
+        'id_switches': id_switches,
+        'fragmentations': fragments,
+        'recall': matched_total / gt_total if gt_total else 1.0,
+        'gt_ids': len(gt_last),
+        'track_ids': len(track_ids_seen),
+        'gt_count': gt_count,
+        'count': count,
+        'count_error': count - gt_count,
+    }
+
+
+def benchmark(scenarios=SCENARIOS, densities=DENSITIES, trackers=None, n_frames=300, seed=0, memory=True):
+    trackers = trackers or [k for k in TRACKER_KINDS if k != 'legacy'] + list(LEGACY_TRACKERS)
+    rows = []
+    for name in scenarios:
+        for density in densities:
+            scenario = make_scenario(name, density, n_frames, seed)
+            for kind in trackers:
+                try:
+                    latencies, outputs, _ = replay(scenario, kind)
+                except ImportError as e:
+                    print(f"⚠️ Skipping {kind}: {e}")
+                    continue
+                peak = replay(scenario, kind, measure_memory=True)[2] if memory else None
+                row = {
+                    'scenario': name, 'density': density, 'tracker': kind, 'frames': n_frames,
+                    'p50_ms': float(np.percentile(latencies, 50)),
+                    'p95_ms': float(np.percentile(latencies, 95)),
+                    'p99_ms': float(np.percentile(latencies, 99)),
+                    'max_ms': float(latencies.max()),
+                    'peak_kb': None if peak is None else peak / 1024.0,
+                }
+                row.update(evaluate(scenario, outputs))
+                rows.append(row)
+                print(format_row(row), flush=True)
+    return rows
+
+
+HEADER = (f"{'scenario':<10} {'dens':>5} {'tracker':<20} {'p50ms':>7} {'p95ms':>7} {'p99ms':>7} "
+          f"{'peakKB':>8} {'IDsw':>6} {'frag':>6} {'recall':>6} {'gt/ids':>9} {'count':>9} {'err':>5}")
+
+
+def format_row(row):
+    peak = '-' if row['peak_kb'] is None else f"{row['peak_kb']:.0f}"
+    return (f"{row['scenario']:<10} {row['density']:>5} {row['tracker']:<20} {row['p50_ms']:>7.2f} "
+            f"{row['p95_ms']:>7.2f} {row['p99_ms']:>7.2f} {peak:>8} {row['id_switches']:>6} "
+            f"{row['fragmentations']:>6} {row['recall']:>6.2f} {row['gt_ids']:>4}/{row['track_ids']:<4} "
+            f"{row['gt_count']:>4}/{row['count']:<4} {row['count_error']:>+5}")
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Tracker latency / MOT accuracy benchmark on synthetic scenes")
+    ap.add_argument("--scenarios", nargs='+', choices=SCENARIOS, default=list(SCENARIOS))
+    ap.add_argument("--densities", nargs='+', type=int, default=list(DENSITIES), help="Concurrent objects")
+    ap.add_argument("--trackers", nargs='+', choices=[k for k in TRACKER_KINDS if k != 'legacy'] + list(LEGACY_TRACKERS),
+                    default=None,
+                    help="Default: all. The detection service's PersonTracker is not replayable (see module docstring)")
+    ap.add_argument("--frames", type=int, default=300)
+    ap.add_argument("--seed", type=int, default=0)
+    ap.add_argument("--no-memory", action="store_true", help="Skip the tracemalloc pass")
+    ap.add_argument("--json", default=None, help="Write the result rows to this file")
+    args = ap.parse_args()
+
+    print(HEADER)
+    rows = benchmark(args.scenarios, args.densities, args.trackers, args.frames, args.seed, not args.no_memory)
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(rows, f, indent=2)
+        print(f"Saved {len(rows)} rows to {args.json}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,124 @@
+"""
+bytetrack.py
+ByteTrack-style tracker: two-stage association over Kalman-predicted boxes.
+
+1. Every track (tracked or lost) is predicted one frame ahead and matched
+   against the high-score detections.
+2. Tracks matched on the previous detection frame but still unmatched get a second
+   chance against the low-score detections (IoU only). Occluded or blurred
+   objects keep their id instead of being thrown away with the weak boxes.
+3. Unmatched tracks stay in a lost buffer for max_missed frames, coasting on
+   their predicted motion; unmatched high-score detections start new tracks.
+
+Same interface as tracking.tracker.Tracker, so counters switch with
+SMARTEYE_TRACKER=bytetrack. Feed it all detections down to low_threshold
+(not just the confident ones) to get the benefit.
+"""
+
+import numpy as np
+
+from utils.box_utils import pairwise_iou
+from .tracker import Tracker, GRID_GATING
+
+TRACK_THRESHOLD = 0.5      # detections at or above this are "high score"
+LOW_THRESHOLD = 0.1        # detections below this are ignored
+NEW_TRACK_MARGIN = 0.1     # new tracks need track_threshold + margin
+LOW_IOU_THRESHOLD = 0.5    # second-stage (low-score) match threshold
+
+
+class ByteTracker(Tracker):
+    """
+    track_threshold: score splitting high from low detections
+    low_threshold: minimum score of a usable detection
+    new_track_threshold: minimum score to start a track (default track_threshold + 0.1)
+    Other arguments as Tracker; max_missed is the lost-track buffer in frames.
+    """
+
+    def __init__(self, max_missed=30, metric='iou', iou_threshold=0.2, max_distance=80.0,
+                 assignment='hungarian', class_aware=True, first_id=1,
+                 track_threshold=TRACK_THRESHOLD, low_threshold=LOW_THRESHOLD,
+                 new_track_threshold=None, low_iou_threshold=LOW_IOU_THRESHOLD, grid=GRID_GATING):
+        super().__init__(max_missed, metric, iou_threshold, max_distance, assignment, class_aware, first_id,
+                         kalman=True, grid=grid)
+        self.track_threshold = track_threshold
+        self.low_threshold = low_threshold
+        self.new_track_threshold = (track_threshold + NEW_TRACK_MARGIN
+                                    if new_track_threshold is None else new_track_threshold)
+        self.low_iou_threshold = low_iou_threshold
+
+    @property
+    def min_score(self):
+        """Lowest detection score worth passing to update()"""
+        return self.low_threshold
+
+    def _match(self, rows, cols, score):
+        """Assign a sub-matrix and map the pairs back to absolute rows/cols"""
+        if len(rows) == 0 or len(cols) == 0:
+            return np.empty(0, dtype=np.intp), np.empty(0, dtype=np.intp)
+        r, c = self.assign(score, 0.0)
+        return rows[r], cols[c]
+
+    def update(self, boxes, scores=None, classes=None, frame_idx=None, frame=None):
+        """
+        boxes: (N, 4) x1, y1, x2, y2 detections of this frame, including low-score ones
+        scores, classes: optional (N,) detector confidences and class ids
+        frame_idx: frame number (defaults to the previous one + 1)
+        frame: unused (motion only), accepted for interface compatibility
+        Use predict() on frames where detection was skipped.
+        Returns the ids of all live tracks (tracked and lost). Lost tracks carry
+        their predicted box; self.matched flags the tracks updated by this frame and
+        self.det_track_ids gives the track of each detection (-1 when dropped).
+        """
+        self.frame_idx = self.frame_idx + 1 if frame_idx is None else int(frame_idx)
+        boxes, scores, classes = self._as_arrays(boxes, scores, classes)
+
+        # Kalman prediction for every live track
+        self._predict()
+
+        tracks = np.arange(len(self.ids))
+        high = np.flatnonzero(scores >= self.track_threshold)
+        low = np.flatnonzero((scores >= self.low_threshold) & (scores < self.track_threshold))
+
+        # Stage 1: all tracks vs high-score detections
+        rows, cols = self._match(tracks, high, self.association_scores(
+            self.boxes, boxes[high], self.classes, classes[high]))
+
+        # Stage 2: still-unmatched tracked tracks vs low-score detections
+        pending = np.ones(len(tracks), dtype=bool)
+        pending[rows] = False
+        pending = tracks[pending & ~self.lost]
+        pending_boxes = self.boxes[pending]
+        iou = pairwise_iou(pending_boxes, boxes[low], self.candidate_pairs(pending_boxes, boxes[low], 0.0))
+        if self.class_aware:
+            iou = np.where(self.classes[pending][:, None] == classes[low][None, :], iou, 0.0)
+        rows2, cols2 = self._match(pending, low, np.where(iou >= self.low_iou_threshold, iou, 0.0))
+        rows = np.concatenate([rows, rows2])
+        cols = np.concatenate([cols, cols2])
+
+        # Correct matched tracks
+        self._correct(rows, boxes[cols])
+        self.scores[rows] = scores[cols]
+        self.last_frame[rows] = self.frame_idx
+        self.hits[rows] += 1
+        self.missed[rows] = 0
+        self.matched = np.zeros(len(tracks), dtype=bool)
+        self.matched[rows] = True
+
+        self.det_track_ids = np.full(len(boxes), -1, dtype=np.int64)
+        self.det_track_ids[cols] = self.ids[rows]
+
+        # Unmatched tracks go to (or stay in) the lost buffer. A track seen once
+        # and missed on the next detection frame was most likely a false positive.
+        self.lost = ~self.matched
+        self.missed[self.lost] += 1
+        self.missed[self.lost & (self.hits == 1)] = self.max_missed + 1
+        self._drop_missed()
+
+        # Unmatched confident detections start new tracks
+        new = np.zeros(len(boxes), dtype=bool)
+        new[high] = True
+        new[cols] = False
+        new &= scores >= self.new_track_threshold
+        if new.any():
+            self.det_track_ids[new] = self._append(boxes[new], scores[new], classes[new], self.frame_idx)
+        return self.ids.copy()
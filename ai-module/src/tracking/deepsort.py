@@ -0,0 +1,232 @@
+"""
+deepsort.py
+DeepSORT-style tracker: Kalman motion plus appearance, with lazy embeddings.
+
+Association starts geometric (tracking.tracker.Tracker scores on the
+Kalman-predicted boxes). Appearance is only computed where geometry cannot
+decide:
+
+- ambiguous detections: two or more tracks score within ambiguity_margin of
+  the best one, or the detection competes with another for the same track
+  (people crossing, crowds at a doorway)
+- detections with no geometric candidate: a track lost behind an occluder
+  may claim them back (re-identification), otherwise they start a new track
+  and the embedding seeds its gallery
+
+Crops mostly covered by another detection are skipped (they show the wrong
+person); the rest are embedded in one batched ReID call per frame. For them
+the score becomes appearance_weight * cosine similarity to the nearest sample
+of the track's gallery + the rest of the geometric score. Geometric
+candidates are only re-ranked; a lost track can also claim a detection on
+appearance alone inside the Kalman (Mahalanobis) gate and max_cosine_distance.
+Tracks matched on the previous detection frame that appearance left
+unmatched fall back to their geometric match. Every embedding matched to a
+track joins its gallery, a ring of gallery_size samples. Without a frame,
+update() is plain Kalman + geometry (SORT).
+
+Same interface as tracking.tracker.Tracker (SMARTEYE_TRACKER=deepsort);
+pass the frame the boxes come from: update(boxes, scores, classes, frame=frame).
+"""
+
+import os
+
+import numpy as np
+
+from utils.box_utils import xyxy_to_xyah
+from .kalman import CHI2_GATE
+from .tracker import Tracker, GRID_GATING
+
+GALLERY_SIZE = int(os.environ.get('SMARTEYE_REID_GALLERY', 16))
+MAX_COSINE_DISTANCE = 0.3
+APPEARANCE_WEIGHT = 0.75
+AMBIGUITY_MARGIN = 0.1
+# Crops covered more than this by another detection are not embedded
+MAX_OVERLAP = 0.2
+
+
+class DeepSortTracker(Tracker):
+    """
+    encoder: object with encode(frame, boxes) -> (N, dim) L2-normalised
+             embeddings and a dim attribute; defaults to
+             tracking.reid.load_reid_encoder(), loaded on the first embedding
+    gallery_size: embeddings kept per track (oldest replaced first)
+    max_cosine_distance: appearance gate, 1 - cosine similarity
+    appearance_weight: share of appearance in the score of embedded detections
+    ambiguity_margin: geometric scores this close to the best count as a tie
+    Other arguments as Tracker.
+    """
+
+    def __init__(self, max_missed=30, metric='iou', iou_threshold=0.3, max_distance=80.0,
+                 assignment='hungarian', class_aware=True, first_id=1, encoder=None,
+                 gallery_size=GALLERY_SIZE, max_cosine_distance=MAX_COSINE_DISTANCE,
+                 appearance_weight=APPEARANCE_WEIGHT, ambiguity_margin=AMBIGUITY_MARGIN,
+                 gating_threshold=CHI2_GATE, grid=GRID_GATING):
+        super().__init__(max_missed, metric, iou_threshold, max_distance, assignment, class_aware, first_id,
+                         kalman=True, grid=grid)
+        self.encoder = encoder
+        self.gallery_size = max(1, int(gallery_size))
+        self.max_cosine_distance = max_cosine_distance
+        self.appearance_weight = appearance_weight
+        self.ambiguity_margin = ambiguity_margin
+        self.gating_threshold = gating_threshold
+        self.embeddings_computed = 0
+
+        # Per-track gallery ring: gallery[row, count % gallery_size]; the
+        # embedding size is known once the encoder is loaded
+        dim = encoder.dim if encoder is not None else 0
+        self.gallery = np.zeros((0, self.gallery_size, dim), dtype=np.float32)
+        self.gallery_count = np.empty(0, dtype=np.int32)
+        self._columns += ('gallery', 'gallery_count')
+
+    def _append(self, boxes, scores, classes, frame_idx):
+        n = len(boxes)
+        self.gallery = np.concatenate([self.gallery, np.zeros((n,) + self.gallery.shape[1:], dtype=np.float32)])
+        self.gallery_count = np.concatenate([self.gallery_count, np.zeros(n, dtype=np.int32)])
+        return super()._append(boxes, scores, classes, frame_idx)
+
+    def _encode(self, frame, boxes):
+        """One batched ReID call for the boxes of this frame"""
+        if self.encoder is None:
+            from .reid import load_reid_encoder
+            self.encoder = load_reid_encoder()
+        if self.gallery.shape[2] != self.encoder.dim:
+            # Nothing is stored yet: size the galleries for this encoder
+            self.gallery = np.zeros((len(self.ids), self.gallery_size, self.encoder.dim), dtype=np.float32)
+            self.gallery_count[:] = 0
+        self.embeddings_computed += len(boxes)
+        return self.encoder.encode(frame, boxes)
+
+    def _remember(self, rows, features):
+        """Add one embedding to each track at rows (rows distinct)"""
+        if len(rows):
+            self.gallery[rows, self.gallery_count[rows] % self.gallery_size] = features
+            self.gallery_count[rows] += 1
+
+    def ambiguous(self, score):
+        """Detections (columns of score) whose geometric association is not clear-cut"""
+        candidate = score > 0
+        if not len(score):
+            return np.ones(score.shape[1], dtype=bool)
+        near_best_track = candidate & (score >= score.max(axis=0, keepdims=True) - self.ambiguity_margin)
+        near_best_det = candidate & (score >= score.max(axis=1, keepdims=True) - self.ambiguity_margin)
+        contested = near_best_det & (near_best_det.sum(axis=1, keepdims=True) >= 2)
+        return (near_best_track.sum(axis=0) >= 2) | contested.any(axis=0) | ~candidate.any(axis=0)
+
+    @staticmethod
+    def coverage(boxes, idx):
+        """Largest fraction of each boxes[idx] covered by another box"""
+        a = boxes[idx]
+        x1 = np.maximum(a[:, None, 0], boxes[None, :, 0])
+        y1 = np.maximum(a[:, None, 1], boxes[None, :, 1])
+        x2 = np.minimum(a[:, None, 2], boxes[None, :, 2])
+        y2 = np.minimum(a[:, None, 3], boxes[None, :, 3])
+        inter = np.clip(x2 - x1, 0, None) * np.clip(y2 - y1, 0, None)
+        inter[np.arange(len(idx)), idx] = 0.0
+        area = np.maximum((a[:, 2] - a[:, 0]) * (a[:, 3] - a[:, 1]), 1e-6)
+        return inter.max(axis=1, initial=0.0) / area
+
+    def appearance_scores(self, score, boxes, classes, cols, features):
+        """Rescore the columns cols of score (detections with features) using the galleries"""
+        stored = np.minimum(self.gallery_count, self.gallery_size)
+        has_gallery = stored > 0
+        if not has_gallery.any() or not len(cols):
+            return score
+
+        # Cosine distance to the nearest stored sample of each track
+        similarity = np.einsum('tkd,nd->tkn', self.gallery, features)
+        filled = np.arange(self.gallery_size)[None, :] < stored[:, None]
+        similarity = np.where(filled[:, :, None], similarity, -1.0).max(axis=1)
+        distance = 1.0 - similarity
+
+        gate = self.kf.gating_distance(self.mean, self.covariance, xyxy_to_xyah(boxes[cols])) <= self.gating_threshold
+        if self.class_aware:
+            gate &= self.classes[:, None] == classes[cols][None, :]
+        # Geometric candidates are re-ranked by appearance; without geometric
+        # support only a close appearance match re-identifies a lost track
+        ok = (score[:, cols] > 0) | (gate & self.lost[:, None] & (distance <= self.max_cosine_distance))
+        combined = self.appearance_weight * similarity + (1.0 - self.appearance_weight) * score[:, cols]
+
+        score = score.copy()
+        # Tracks without a gallery keep their geometric score
+        score[:, cols] = np.where(has_gallery[:, None], np.where(ok, combined, 0.0), score[:, cols])
+        return score
+
+    def _geometric_fallback(self, rows, cols, geometric):
+        """
+        Tracks matched on the previous detection frame that appearance left
+        unmatched get their geometric match back (crops of overlapping people
+        mix both appearances); lost tracks must pass the appearance gate.
+        """
+        track_left = np.ones(len(self.ids), dtype=bool)
+        track_left[rows] = False
+        track_left = np.flatnonzero(track_left & ~self.lost)
+        det_left = np.ones(geometric.shape[1], dtype=bool)
+        det_left[cols] = False
+        det_left = np.flatnonzero(det_left)
+        if not len(track_left) or not len(det_left):
+            return rows, cols
+        r, c = self.assign(geometric[np.ix_(track_left, det_left)], 0.0)
+        return np.concatenate([rows, track_left[r]]), np.concatenate([cols, det_left[c]])
+
+    def update(self, boxes, scores=None, classes=None, frame_idx=None, frame=None):
+        """
+        boxes: (N, 4) x1, y1, x2, y2 detections of this frame (may be empty)
+        scores, classes: optional (N,) detector confidences and class ids
+        frame_idx: frame number (defaults to the previous one + 1)
+        frame: the BGR image the boxes come from; without it no embeddings are computed
+        Use predict() on frames where detection was skipped.
+        Returns the ids of all live tracks; self.matched and self.det_track_ids as in Tracker.
+        """
+        self.frame_idx = self.frame_idx + 1 if frame_idx is None else int(frame_idx)
+        boxes, scores, classes = self._as_arrays(boxes, scores, classes)
+        self._predict()
+
+        score = geometric = self.association_scores(self.boxes, boxes, self.classes, classes)
+        embed = np.empty(0, dtype=np.intp)
+        features = None
+        if frame is not None and len(boxes):
+            embed = np.flatnonzero(self.ambiguous(score))
+            # A crop mostly covered by someone else shows the wrong person
+            embed = embed[self.coverage(boxes, embed) <= MAX_OVERLAP]
+            if len(embed):
+                features = self._encode(frame, boxes[embed])
+                score = self.appearance_scores(score, boxes, classes, embed, features)
+
+        rows = cols = np.empty(0, dtype=np.intp)
+        if len(self.ids) and len(boxes):
+            rows, cols = self.assign(score, 0.0)
+            if features is not None:
+                rows, cols = self._geometric_fallback(rows, cols, geometric)
+
+        self._correct(rows, boxes[cols])
+        self.scores[rows] = scores[cols]
+        self.last_frame[rows] = self.frame_idx
+        self.hits[rows] += 1
+        self.missed[rows] = 0
+        self.matched = np.zeros(len(self.ids), dtype=bool)
+        self.matched[rows] = True
+
+        # Embedded detections feed the gallery of the track they went to
+        feature_of = np.full(len(boxes), -1, dtype=np.intp)
+        feature_of[embed] = np.arange(len(embed))
+        if features is not None:
+            has = feature_of[cols] >= 0
+            self._remember(rows[has], features[feature_of[cols[has]]])
+
+        self.det_track_ids = np.empty(len(boxes), dtype=np.int64)
+        self.det_track_ids[cols] = self.ids[rows]
+
+        self.lost = ~self.matched
+        self.missed[self.lost] += 1
+        self._drop_missed()
+
+        new = np.ones(len(boxes), dtype=bool)
+        new[cols] = False
+        if new.any():
+            start = len(self.ids)
+            self.det_track_ids[new] = self._append(boxes[new], scores[new], classes[new], self.frame_idx)
+            if features is not None:
+                new_rows = start + np.arange(new.sum())
+                has = feature_of[new] >= 0
+                self._remember(new_rows[has], features[feature_of[new][has]])
+        return self.ids.copy()
@@ -0,0 +1,153 @@
+"""
+history.py
+Bounded trajectory history for long-running trackers.
+
+Every track gets a fixed-length ring buffer of (x, y) points inside one
+preallocated NumPy slab; evicting a dead track returns its slot to a
+free-list, so memory depends on the number of live tracks and the ring
+length, never on uptime.
+
+    history = TrajectoryStore(capacity=64)
+    history[track_id].append((cx, cy))   # creates the ring on first use
+    prev = history[track_id][-2]
+    history.retain(live_ids)             # evict every dead track
+"""
+
+import os
+
+import numpy as np
+
+HISTORY_LENGTH = int(os.environ.get('SMARTEYE_HISTORY_LENGTH', 64))
+INITIAL_SLOTS = 64
+
+
+class TrajectoryStore:
+    """
+    Mapping track id -> Trajectory, backed by points[slot, i % capacity].
+    Indexing a missing id creates its ring (like defaultdict); get() does not.
+    """
+
+    def __init__(self, capacity=HISTORY_LENGTH, slots=INITIAL_SLOTS):
+        self.capacity = max(2, int(capacity))
+        self.points = np.zeros((slots, self.capacity, 2), dtype=np.float32)
+        self.lengths = np.zeros(slots, dtype=np.int64)  # points ever appended; head = length % capacity
+        self.slot_of = {}
+        self.free = list(range(slots - 1, -1, -1))
+
+    def _grow(self):
+        slots = len(self.lengths)
+        self.points = np.concatenate([self.points, np.zeros_like(self.points)])
+        self.lengths = np.concatenate([self.lengths, np.zeros(slots, dtype=np.int64)])
+        self.free.extend(range(2 * slots - 1, slots - 1, -1))
+
+    def _slot(self, track_id):
+        slot = self.slot_of.get(track_id)
+        if slot is None:
+            if not self.free:
+                self._grow()
+            slot = self.free.pop()
+            self.lengths[slot] = 0
+            self.slot_of[track_id] = slot
+        return slot
+
+    def append(self, track_id, point):
+        slot = self._slot(track_id)
+        self.points[slot, self.lengths[slot] % self.capacity] = point
+        self.lengths[slot] += 1
+
+    def append_many(self, track_ids, points):
+        """One point for each of several tracks (ids must be distinct)"""
+        slots = np.fromiter((self._slot(t) for t in track_ids), dtype=np.int64, count=len(track_ids))
+        self.points[slots, self.lengths[slots] % self.capacity] = points
+        self.lengths[slots] += 1
+
+    def size(self, track_id):
+        slot = self.slot_of.get(track_id)
+        return 0 if slot is None else int(min(self.lengths[slot], self.capacity))
+
+    def point(self, track_id, index):
+        """index-th retained point (negative counts from the newest)"""
+        slot = self.slot_of[track_id]
+        length = int(self.lengths[slot])
+        size = min(length, self.capacity)
+        if index < 0:
+            index += size
+        if not 0 <= index < size:
+            raise IndexError('trajectory index out of range')
+        x, y = self.points[slot, (length - size + index) % self.capacity]
+        return (float(x), float(y))
+
+    def array(self, track_id):
+        """Retained points of a track, oldest first, as an (n, 2) array"""
+        slot = self.slot_of.get(track_id)
+        if slot is None:
+            return np.empty((0, 2), dtype=np.float32)
+        length = int(self.lengths[slot])
+        size = min(length, self.capacity)
+        idx = (np.arange(length - size, length)) % self.capacity
+        return self.points[slot, idx]
+
+    def pop(self, track_id, default=None):
+        """Evict a track; its slot is reused by the next new track"""
+        slot = self.slot_of.pop(track_id, None)
+        if slot is None:
+            return default
+        self.free.append(slot)
+        return True
+
+    def retain(self, live_ids):
+        """Evict every track not in live_ids"""
+        live = set(live_ids)
+        for track_id in [t for t in self.slot_of if t not in live]:
+            self.pop(track_id)
+
+    def get(self, track_id, default=None):
+        return Trajectory(self, track_id) if track_id in self.slot_of else default
+
+    def __getitem__(self, track_id):
+        self._slot(track_id)
+        return Trajectory(self, track_id)
+
+    def __contains__(self, track_id):
+        return track_id in self.slot_of
+
+    def __iter__(self):
+        return iter(list(self.slot_of))
+
+    def __len__(self):
+        return len(self.slot_of)
+
+    def keys(self):
+        return list(self.slot_of)
+
+    def items(self):
+        return [(track_id, Trajectory(self, track_id)) for track_id in self.slot_of]
+
+    @property
+    def nbytes(self):
+        return self.points.nbytes + self.lengths.nbytes
+
+
+class Trajectory:
+    """List-like view of one track's ring: len(), [i], [-1], iteration and append()"""
+
+    __slots__ = ('_store', '_track_id')
+
+    def __init__(self, store, track_id):
+        self._store = store
+        self._track_id = track_id
+
+    def append(self, point):
+        self._store.append(self._track_id, point)
+
+    def __len__(self):
+        return self._store.size(self._track_id)
+
+    def __getitem__(self, index):
+        return self._store.point(self._track_id, index)
+
+    def __iter__(self):
+        return iter(map(tuple, self._store.array(self._track_id).tolist()))
+
+    def array(self):
+        return self._store.array(self._track_id)
@@ -0,0 +1,89 @@
+"""
+kalman.py
+Constant-velocity Kalman filter for boxes, batched over tracks.
+
+State per track: (cx, cy, a, h, vcx, vcy, va, vh) where a = width / height,
+the same parameterisation and noise model ByteTrack / DeepSORT use. Every
+method takes and returns stacked arrays, so one call handles all tracks.
+"""
+
+import numpy as np
+
+# Process / measurement noise relative to the box height
+STD_WEIGHT_POSITION = 1.0 / 20
+STD_WEIGHT_VELOCITY = 1.0 / 160
+# 0.95 quantile of the chi-square distribution with 4 degrees of freedom
+CHI2_GATE = 9.4877
+
+
+class KalmanBoxFilter:
+
+    def __init__(self, std_weight_position=STD_WEIGHT_POSITION, std_weight_velocity=STD_WEIGHT_VELOCITY):
+        self.std_weight_position = std_weight_position
+        self.std_weight_velocity = std_weight_velocity
+        self._motion = np.eye(8)
+        self._motion[:4, 4:] = np.eye(4)  # x += v per frame
+        self._project = np.eye(4, 8)
+
+    @staticmethod
+    def _diag(std):
+        """(N, k) standard deviations -> (N, k, k) diagonal covariances"""
+        n, k = std.shape
+        cov = np.zeros((n, k, k))
+        idx = np.arange(k)
+        cov[:, idx, idx] = std ** 2
+        return cov
+
+    def _std(self, h, pos_a, vel_a=None, pos_scale=1.0, vel_scale=1.0):
+        wp = self.std_weight_position * pos_scale * h
+        cols = [wp, wp, np.full_like(h, pos_a), wp]
+        if vel_a is not None:
+            wv = self.std_weight_velocity * vel_scale * h
+            cols += [wv, wv, np.full_like(h, vel_a), wv]
+        return np.stack(cols, axis=1)
+
+    def initiate(self, measurements):
+        """(N, 4) xyah measurements -> mean (N, 8), covariance (N, 8, 8)"""
+        measurements = np.asarray(measurements, dtype=np.float64).reshape(-1, 4)
+        mean = np.concatenate([measurements, np.zeros_like(measurements)], axis=1)
+        std = self._std(measurements[:, 3], 1e-2, 1e-5, pos_scale=2.0, vel_scale=10.0)
+        return mean, self._diag(std)
+
+    def predict(self, mean, covariance):
+        """Advance every track one frame"""
+        if len(mean) == 0:
+            return mean, covariance
+        noise = self._diag(self._std(mean[:, 3], 1e-2, 1e-5))
+        mean = mean @ self._motion.T
+        covariance = self._motion @ covariance @ self._motion.T + noise
+        return mean, covariance
+
+    def project(self, mean, covariance):
+        """State -> measurement space (mean (N, 4), covariance (N, 4, 4))"""
+        noise = self._diag(self._std(mean[:, 3], 1e-1))
+        return mean @ self._project.T, self._project @ covariance @ self._project.T + noise
+
+    def update(self, mean, covariance, measurements):
+        """Correct tracks with their matched (N, 4) xyah measurements"""
+        if len(mean) == 0:
+            return mean, covariance
+        proj_mean, proj_cov = self.project(mean, covariance)
+        # Kalman gain K = P H^T S^-1, solved instead of inverted
+        pht = covariance @ self._project.T
+        gain = np.linalg.solve(proj_cov, pht.transpose(0, 2, 1)).transpose(0, 2, 1)
+        innovation = np.asarray(measurements, dtype=np.float64).reshape(-1, 4) - proj_mean
+        mean = mean + (gain @ innovation[:, :, None])[:, :, 0]
+        covariance = covariance - gain @ proj_cov @ gain.transpose(0, 2, 1)
+        return mean, covariance
+
+    def gating_distance(self, mean, covariance, measurements):
+        """
+        Squared Mahalanobis distance (tracks x measurements) between each track's
+        projected state and each (M, 4) xyah measurement; compare with CHI2_GATE.
+        """
+        measurements = np.asarray(measurements, dtype=np.float64).reshape(-1, 4)
+        if len(mean) == 0 or len(measurements) == 0:
+            return np.zeros((len(mean), len(measurements)))
+        proj_mean, proj_cov = self.project(mean, covariance)
+        diff = measurements[None, :, :] - proj_mean[:, None, :]
+        return np.einsum('tmi,tij,tmj->tm', diff, np.linalg.inv(proj_cov), diff)
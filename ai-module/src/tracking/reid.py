@@ -0,0 +1,121 @@
+"""
+reid.py
+Appearance embeddings for the DeepSORT tracker.
+
+ReIDEncoder runs a small person re-identification network (OSNet x0.25 by
+default, ~0.2M parameters, 512-d output) exported to ONNX, on onnxruntime
+when installed and on OpenCV DNN otherwise. All crops of a frame go through
+one batched call. Without the model file, HistogramEncoder (HSV colour
+histograms of the upper / lower body) stands in so the tracker still works.
+
+Embeddings are L2-normalised, so cosine similarity is a dot product.
+
+    encoder = load_reid_encoder()
+    features = encoder.encode(frame, boxes)   # (N, encoder.dim)
+"""
+
+import os
+import importlib.util
+
+import cv2
+import numpy as np
+
+REID_MODEL = os.environ.get('SMARTEYE_REID_MODEL', os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'models', 'models', 'osnet_x0_25_msmt17.onnx'))
+REID_INPUT_SIZE = (128, 256)  # width, height
+IMAGENET_MEAN = np.array([0.485, 0.456, 0.406], dtype=np.float32)
+IMAGENET_STD = np.array([0.229, 0.224, 0.225], dtype=np.float32)
+
+HIST_BINS = (16, 4)  # hue, saturation bins per body half
+
+
+def _normalize(features):
+    features = np.asarray(features, dtype=np.float32).reshape(len(features), -1)
+    return features / np.maximum(np.linalg.norm(features, axis=1, keepdims=True), 1e-12)
+
+
+def crop_boxes(frame, boxes):
+    """Views of frame inside each (x1, y1, x2, y2) box, clipped; None for empty boxes"""
+    h, w = frame.shape[:2]
+    crops = []
+    for x1, y1, x2, y2 in np.asarray(boxes, dtype=np.float32).reshape(-1, 4).astype(int).tolist():
+        x1, y1 = max(0, x1), max(0, y1)
+        x2, y2 = min(w, x2), min(h, y2)
+        crops.append(frame[y1:y2, x1:x2] if x2 > x1 and y2 > y1 else None)
+    return crops
+
+
+class ReIDEncoder:
+    """
+    ONNX person ReID network. model_path: ONNX file taking (N, 3, H, W)
+    ImageNet-normalised RGB crops and returning (N, D) embeddings.
+    """
+
+    def __init__(self, model_path=REID_MODEL, input_size=REID_INPUT_SIZE):
+        self.input_size = input_size
+        self.session = None
+        self.net = None
+        if importlib.util.find_spec('onnxruntime') is not None:
+            import onnxruntime
+            self.session = onnxruntime.InferenceSession(model_path, providers=['CPUExecutionProvider'])
+            inp = self.session.get_inputs()[0]
+            self.input_name = inp.name
+            # Exports with a fixed batch of 1 are run crop by crop
+            self.batched = not isinstance(inp.shape[0], int) or inp.shape[0] != 1
+        else:
+            self.net = cv2.dnn.readNet(model_path)
+            self.batched = True
+        self.dim = int(self._run(np.zeros((1, 3, input_size[1], input_size[0]), dtype=np.float32)).shape[1])
+
+    def _run(self, blob):
+        if self.session is not None:
+            if self.batched:
+                return self.session.run(None, {self.input_name: blob})[0]
+            return np.concatenate([self.session.run(None, {self.input_name: b[None]})[0] for b in blob])
+        self.net.setInput(blob)
+        return self.net.forward()
+
+    def encode(self, frame, boxes):
+        crops = crop_boxes(frame, boxes)
+        out = np.zeros((len(crops), self.dim), dtype=np.float32)
+        valid = [i for i, crop in enumerate(crops) if crop is not None]
+        if valid:
+            batch = np.stack([cv2.resize(crops[i], self.input_size) for i in valid])
+            batch = (batch[..., ::-1].astype(np.float32) / 255.0 - IMAGENET_MEAN) / IMAGENET_STD
+            out[valid] = self._run(np.ascontiguousarray(batch.transpose(0, 3, 1, 2))).reshape(len(valid), -1)
+        return _normalize(out)
+
+
+class HistogramEncoder:
+    """Model-free fallback: hue/saturation histograms of the upper and lower half of each box"""
+
+    def __init__(self, bins=HIST_BINS):
+        self.bins = list(bins)
+        self.dim = 2 * bins[0] * bins[1]
+
+    def encode(self, frame, boxes):
+        out = np.zeros((len(boxes), self.dim), dtype=np.float32)
+        for i, crop in enumerate(crop_boxes(frame, boxes)):
+            if crop is None:
+                continue
+            hsv = cv2.cvtColor(crop, cv2.COLOR_BGR2HSV)
+            half = max(1, len(hsv) // 2)
+            hists = [cv2.calcHist([part], [0, 1], None, self.bins, [0, 180, 0, 256]).ravel()
+                     for part in (hsv[:half], hsv[half:] if len(hsv) > half else hsv[:half])]
+            # Square root of the normalised histogram: cosine similarity becomes the Bhattacharyya coefficient
+            out[i] = np.sqrt(np.concatenate([h / max(h.sum(), 1.0) for h in hists]))
+        return _normalize(out)
+
+
+def load_reid_encoder(model_path=REID_MODEL):
+    """ReIDEncoder for model_path, or HistogramEncoder when the model is missing or fails to load"""
+    if model_path and os.path.exists(model_path):
+        try:
+            encoder = ReIDEncoder(model_path)
+            print(f"✅ ReID model loaded: {os.path.basename(model_path)} ({encoder.dim}-d)")
+            return encoder
+        except Exception as e:
+            print(f"⚠️ ReID model {os.path.basename(model_path)} unavailable ({e}), using colour histograms")
+    else:
+        print(f"⚠️ ReID model not found at {model_path}, using colour histograms")
+    return HistogramEncoder()
@@ -0,0 +1,250 @@
+"""
+store.py
+Struct-of-arrays track store with stable rows.
+
+Every per-track field is one preallocated NumPy column (row i of every column
+is one track). An id -> row index finds a track in O(1); rows of dead tracks
+go to a free-list and are reused by the next new tracks, so adding and
+removing tracks writes in place instead of reallocating every column or
+creating a Python object per track. Columns double when full.
+
+    store = TrackStore({'boxes': ('float32', (4,)), 'missed': ('int32',)})
+    rows = store.add([7, 8], boxes=det_boxes)
+    live = store.rows()                  # live rows, ascending id
+    store.missed[live] += 1
+    store.remove(live[store.missed[live] > 30])
+
+Counting code reads tracks through small __slots__ views (TrackView
+subclasses with column() properties) instead of per-track dicts.
+
+Finished tracks that still matter for the totals go to a TrackArchive: an
+append-only columnar record (a few bytes per track, no views, no id index).
+
+    archive = TrackArchive({'frames_seen': ('int32',)})
+    gone = live[store.missed[live] > 30]
+    archive.record(store, gone)          # copies the archive's columns
+    store.remove(gone)
+    archive.frames_seen                  # (len(archive),) array
+"""
+
+import numpy as np
+
+INITIAL_CAPACITY = 64
+
+
+def _parse_columns(columns):
+    """{name: (dtype,) | (dtype, shape) | (dtype, shape, fill)} -> {name: (dtype, shape, fill)}"""
+    parsed = {}
+    for name, spec in columns.items():
+        dtype, shape, fill = (tuple(spec) + ((), 0)[len(spec) - 1:])[:3]
+        parsed[name] = (np.dtype(dtype), tuple(shape), fill)
+    return parsed
+
+
+class TrackStore:
+    """
+    columns: {name: (dtype,) | (dtype, shape) | (dtype, shape, fill)}; each
+             becomes an attribute of shape (capacity,) + shape
+    view: TrackView subclass returned by get() / items()
+    Rows of removed tracks keep stale values until reused: index the columns
+    with rows() (or row()), never with a bare slice.
+    """
+
+    def __init__(self, columns, capacity=INITIAL_CAPACITY, view=None):
+        self.capacity = max(1, int(capacity))
+        self._spec = _parse_columns(columns)
+        for name, (dtype, shape, fill) in self._spec.items():
+            setattr(self, name, np.full((self.capacity,) + shape, fill, dtype=dtype))
+        self.ids = np.full(self.capacity, -1, dtype=np.int64)
+        self.alive = np.zeros(self.capacity, dtype=bool)
+        self.row_of = {}
+        self.free = list(range(self.capacity - 1, -1, -1))
+        self.view = view or TrackView
+        self._rows = np.empty(0, dtype=np.intp)  # cached live rows; None when stale
+
+    def _grow(self, needed):
+        old = self.capacity
+        new = max(2 * old, old + needed)
+        for name, (dtype, shape, fill) in self._spec.items():
+            column = np.full((new,) + shape, fill, dtype=dtype)
+            column[:old] = getattr(self, name)
+            setattr(self, name, column)
+        ids = np.full(new, -1, dtype=np.int64)
+        ids[:old] = self.ids
+        alive = np.zeros(new, dtype=bool)
+        alive[:old] = self.alive
+        self.ids, self.alive, self.capacity = ids, alive, new
+        self.free[:0] = range(new - 1, old - 1, -1)
+
+    def add(self, ids, **values):
+        """
+        Start tracks with the given ids; values fill their columns (others get
+        the column's fill value). Returns their rows.
+        """
+        unknown = set(values) - set(self._spec)
+        if unknown:
+            raise KeyError(f"Unknown track columns {sorted(unknown)}")
+        ids = np.asarray(ids, dtype=np.int64).reshape(-1)
+        n = len(ids)
+        if n > len(self.free):
+            self._grow(n - len(self.free))
+        rows = np.array(self.free[-n:][::-1], dtype=np.intp) if n else np.empty(0, dtype=np.intp)
+        del self.free[len(self.free) - n:]
+
+        for name, (dtype, shape, fill) in self._spec.items():
+            getattr(self, name)[rows] = values.get(name, fill)
+        self.ids[rows] = ids
+        self.alive[rows] = True
+        self.row_of.update(zip(ids.tolist(), rows.tolist()))
+        self._rows = None
+        return rows
+
+    def remove(self, rows):
+        """Retire the tracks at rows; their rows go back to the free-list"""
+        rows = np.asarray(rows, dtype=np.intp).reshape(-1)
+        if not len(rows):
+            return
+        for track_id in self.ids[rows].tolist():
+            del self.row_of[track_id]
+        self.alive[rows] = False
+        self.ids[rows] = -1
+        self.free.extend(rows.tolist())
+        self._rows = None
+
+    def discard(self, track_id):
+        row = self.row_of.get(track_id)
+        if row is not None:
+            self.remove([row])
+
+    def rows(self):
+        """Live rows ordered by ascending track id (cached until the next add/remove)"""
+        if self._rows is None:
+            rows = np.flatnonzero(self.alive)
+            self._rows = rows[np.argsort(self.ids[rows], kind='stable')]
+        return self._rows
+
+    def row(self, track_id):
+        """Row of a live track id, or None"""
+        return self.row_of.get(track_id)
+
+    def rows_of(self, track_ids):
+        return np.fromiter((self.row_of[t] for t in track_ids), dtype=np.intp, count=len(track_ids))
+
+    def live_ids(self):
+        return self.ids[self.rows()]
+
+    def get(self, track_id, default=None):
+        """__slots__ view of a live track (valid until the track is removed)"""
+        row = self.row_of.get(track_id)
+        return default if row is None else self.view(self, row)
+
+    def items(self):
+        rows = self.rows()
+        view = self.view
+        return [(track_id, view(self, row)) for track_id, row in zip(self.ids[rows].tolist(), rows.tolist())]
+
+    def __getitem__(self, track_id):
+        return self.view(self, self.row_of[track_id])
+
+    def __contains__(self, track_id):
+        return track_id in self.row_of
+
+    def __iter__(self):
+        return iter(self.live_ids().tolist())
+
+    def __len__(self):
+        return len(self.row_of)
+
+    @property
+    def nbytes(self):
+        return sum(getattr(self, name).nbytes for name in self._spec) + self.ids.nbytes + self.alive.nbytes
+
+
+class TrackArchive:
+    """
+    Append-only columnar record of finished tracks.
+    columns: same spec as TrackStore; each column (and ids) reads as an array
+             of length len(archive), in the order tracks were archived
+    """
+
+    def __init__(self, columns, capacity=INITIAL_CAPACITY):
+        self._spec = _parse_columns(columns)
+        self._data = {name: np.full((max(1, int(capacity)),) + shape, fill, dtype=dtype)
+                      for name, (dtype, shape, fill) in self._spec.items()}
+        self._data['ids'] = np.full(max(1, int(capacity)), -1, dtype=np.int64)
+        self.size = 0
+
+    def __getattr__(self, name):
+        data = self.__dict__.get('_data')
+        if data is None or name not in data:
+            raise AttributeError(name)
+        return data[name][:self.size]
+
+    def __len__(self):
+        return self.size
+
+    def append(self, ids, **values):
+        """Archive tracks with the given ids; values fill their columns (others get the fill value)"""
+        unknown = set(values) - set(self._spec)
+        if unknown:
+            raise KeyError(f"Unknown archive columns {sorted(unknown)}")
+        ids = np.asarray(ids, dtype=np.int64).reshape(-1)
+        n = len(ids)
+        if not n:
+            return
+        capacity = len(self._data['ids'])
+        if self.size + n > capacity:
+            capacity = max(2 * capacity, self.size + n)
+            for name, old in self._data.items():
+                fill = -1 if name == 'ids' else self._spec[name][2]
+                column = np.full((capacity,) + old.shape[1:], fill, dtype=old.dtype)
+                column[:self.size] = old[:self.size]
+                self._data[name] = column
+        end = self.size + n
+        for name, (dtype, shape, fill) in self._spec.items():
+            self._data[name][self.size:end] = values.get(name, fill)
+        self._data['ids'][self.size:end] = ids
+        self.size = end
+
+    def record(self, store, rows):
+        """Archive the tracks at rows of a TrackStore (columns with matching names are copied)"""
+        rows = np.asarray(rows, dtype=np.intp).reshape(-1)
+        if len(rows):
+            self.append(store.ids[rows], **{name: getattr(store, name)[rows]
+                                            for name in self._spec if name in store._spec})
+
+    @property
+    def nbytes(self):
+        return sum(column.nbytes for column in self._data.values())
+
+
+def column(name, doc=None):
+    """Property reading / writing one row of a store column as plain Python values"""
+
+    def fget(self):
+        return getattr(self.store, name)[self.row].tolist()
+
+    def fset(self, value):
+        getattr(self.store, name)[self.row] = value
+
+    return property(fget, fset, doc=doc or f"Track's {name} column")
+
+
+class TrackView:
+    """
+    Lightweight handle on one row of a TrackStore. Subclasses add column()
+    properties and keep __slots__ = () so no per-track __dict__ is created.
+    """
+
+    __slots__ = ('store', 'row')
+
+    def __init__(self, store, row):
+        self.store = store
+        self.row = row
+
+    @property
+    def id(self):
+        return int(self.store.ids[self.row])
+
+    def __repr__(self):
+        return f"{type(self).__name__}(id={self.id})"
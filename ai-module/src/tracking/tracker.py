@@ -0,0 +1,280 @@
+"""
+tracker.py
+Shared multi-object tracker for the SmartEye counters.
+
+Track state lives in parallel NumPy arrays (one row per live track) and each
+frame is associated in one shot from vectorized IoU / centroid-distance
+matrices (utils.box_utils), instead of a Python loop over tracks x detections.
+
+    tracker = create_tracker('vectorized', metric='iou', iou_threshold=0.3)
+    ids = tracker.update(boxes, scores, classes, frame_idx)
+
+The counter scripts keep their own trackers by default. SMARTEYE_TRACKER
+(or the --tracker option of a script) switches them to a tracker from this
+package.
+
+SMARTEYE_TRACKER_GRID=1 (or grid=True) gates association through a uniform
+grid (utils.box_utils.grid_candidates): only track/detection pairs within a
+track's reach are scored, which keeps wide frames with hundreds of boxes
+near-linear. Pairs outside the reach score 0 anyway, so matches are the same.
+"""
+
+import os
+
+import numpy as np
+
+from utils.box_utils import (
+    pairwise_iou, pairwise_centroid_distance, paired_iou, paired_centroid_distance, centroids,
+    greedy_assignment, optimal_assignment, grid_candidates, xyxy_to_xyah, xyah_to_xyxy
+)
+from .kalman import KalmanBoxFilter
+
+TRACKER_KIND = os.environ.get('SMARTEYE_TRACKER', 'legacy').lower()
+TRACKER_KINDS = ('legacy', 'vectorized', 'bytetrack', 'deepsort')
+METRICS = ('iou', 'centroid', 'iou+centroid')
+
+GRID_GATING = os.environ.get('SMARTEYE_TRACKER_GRID', '0').lower() in ('1', 'true', 'yes')
+# Below this many track x detection pairs scoring all of them is cheaper than the grid
+GRID_MIN_PAIRS = 256 * 256
+
+
+class Tracker:
+    """
+    IoU / centroid tracker over a NumPy track store.
+
+    max_missed: frames a track survives without a matching detection
+    metric: 'iou' (match when IoU >= iou_threshold), 'centroid' (match when the
+            centroid distance < max_distance) or 'iou+centroid' (IoU matches
+            first, nearby centroids as the fallback)
+    assignment: 'greedy' (highest score first) or 'hungarian'
+    class_aware: only match detections to tracks of the same class
+    kalman: keep a constant-velocity Kalman filter per track; tracks are matched
+            on their predicted boxes and coast along their velocity while missed
+    grid: only score the pairs a spatial grid finds within reach() of each track
+          (used once there are at least GRID_MIN_PAIRS pairs)
+    """
+
+    def __init__(self, max_missed=30, metric='iou', iou_threshold=0.3, max_distance=80.0,
+                 assignment='greedy', class_aware=True, first_id=1, kalman=False, grid=GRID_GATING):
+        if metric not in METRICS:
+            raise ValueError(f"Unknown metric '{metric}', expected one of {METRICS}")
+        self.max_missed = max_missed
+        self.metric = metric
+        self.iou_threshold = iou_threshold
+        self.max_distance = max_distance
+        self.assign = greedy_assignment if assignment == 'greedy' else optimal_assignment
+        self.class_aware = class_aware
+        self.grid = grid
+        self.next_id = first_id
+        self.frame_idx = -1
+
+        # One row per live track, ids ascending
+        self.ids = np.empty(0, dtype=np.int64)
+        self.boxes = np.empty((0, 4), dtype=np.float32)  # x1, y1, x2, y2
+        self.scores = np.empty(0, dtype=np.float32)
+        self.classes = np.empty(0, dtype=np.int32)
+        self.first_frame = np.empty(0, dtype=np.int64)
+        self.last_frame = np.empty(0, dtype=np.int64)
+        self.hits = np.empty(0, dtype=np.int32)
+        self.missed = np.empty(0, dtype=np.int32)
+        self.matched = np.empty(0, dtype=bool)  # matched a detection in the last update()
+        self.lost = np.empty(0, dtype=bool)     # missed the last update(); predict() leaves it alone
+        self.det_track_ids = np.empty(0, dtype=np.int64)  # track id of each detection of the last update()
+
+        self.kf = KalmanBoxFilter() if kalman else None
+        self.mean = np.empty((0, 8), dtype=np.float64)
+        self.covariance = np.empty((0, 8, 8), dtype=np.float64)
+        self._columns = self._COLUMNS + (('mean', 'covariance') if kalman else ())
+
+    _COLUMNS = ('ids', 'boxes', 'scores', 'classes', 'first_frame', 'last_frame', 'hits', 'missed',
+                'matched', 'lost')
+
+    def __len__(self):
+        return len(self.ids)
+
+    @staticmethod
+    def _as_arrays(boxes, scores, classes):
+        boxes = np.asarray(boxes, dtype=np.float32).reshape(-1, 4)
+        n = len(boxes)
+        scores = np.ones(n, dtype=np.float32) if scores is None else np.asarray(scores, dtype=np.float32).reshape(n)
+        classes = np.zeros(n, dtype=np.int32) if classes is None else np.asarray(classes, dtype=np.int32).reshape(n)
+        return boxes, scores, classes
+
+    def _append(self, boxes, scores, classes, frame_idx):
+        n = len(boxes)
+        ids = np.arange(self.next_id, self.next_id + n, dtype=np.int64)
+        self.next_id += n
+        self.ids = np.concatenate([self.ids, ids])
+        self.boxes = np.concatenate([self.boxes, boxes])
+        self.scores = np.concatenate([self.scores, scores])
+        self.classes = np.concatenate([self.classes, classes])
+        self.first_frame = np.concatenate([self.first_frame, np.full(n, frame_idx, dtype=np.int64)])
+        self.last_frame = np.concatenate([self.last_frame, np.full(n, frame_idx, dtype=np.int64)])
+        self.hits = np.concatenate([self.hits, np.ones(n, dtype=np.int32)])
+        self.missed = np.concatenate([self.missed, np.zeros(n, dtype=np.int32)])
+        self.matched = np.concatenate([self.matched, np.ones(n, dtype=bool)])
+        self.lost = np.concatenate([self.lost, np.zeros(n, dtype=bool)])
+        if self.kf is not None:
+            mean, covariance = self.kf.initiate(xyxy_to_xyah(boxes))
+            self.mean = np.concatenate([self.mean, mean])
+            self.covariance = np.concatenate([self.covariance, covariance])
+        return ids
+
+    def _drop_missed(self):
+        keep = self.missed <= self.max_missed
+        if not keep.all():
+            for name in self._columns:
+                setattr(self, name, getattr(self, name)[keep])
+
+    def _predict(self):
+        """Move Kalman tracks one frame ahead (boxes become the predictions)"""
+        if self.kf is not None and len(self.ids):
+            self.mean, self.covariance = self.kf.predict(self.mean, self.covariance)
+            self.boxes = xyah_to_xyxy(self.mean[:, :4])
+
+    def _correct(self, rows, boxes):
+        """Set matched track boxes from their detections (Kalman-filtered when enabled)"""
+        if self.kf is None:
+            self.boxes[rows] = boxes
+            return
+        self.mean[rows], self.covariance[rows] = self.kf.update(
+            self.mean[rows], self.covariance[rows], xyxy_to_xyah(boxes))
+        self.boxes[rows] = xyah_to_xyxy(self.mean[rows, :4])
+
+    def reach(self):
+        """Largest displacement (px) over which a track can still match a detection"""
+        # IoU needs the boxes to overlap; centroid matches stop at max_distance
+        return 0.0 if self.metric == 'iou' else self.max_distance
+
+    def candidate_pairs(self, track_boxes, det_boxes, reach=None):
+        """(rows, cols) pairs the grid lets through, or None to score every pair"""
+        if not self.grid or len(track_boxes) * len(det_boxes) < GRID_MIN_PAIRS:
+            return None
+        return grid_candidates(track_boxes, det_boxes, self.reach() if reach is None else reach)
+
+    def _metric_scores(self, iou, dist):
+        """Scores from IoU and centroid distances of the same shape (either may be None if unused)"""
+        if self.metric == 'centroid':
+            return np.where(dist < self.max_distance, 1.0 - dist / self.max_distance, 0.0)
+        score = np.where(iou >= self.iou_threshold, iou, 0.0)
+        if self.metric == 'iou+centroid':
+            # Overlapping pairs (score 1..2) always beat distance-only pairs (0..1)
+            near = np.where(dist < self.max_distance, 1.0 / (1.0 + dist), 0.0)
+            score = np.where(score > 0, 1.0 + score, near)
+        return score
+
+    def association_scores(self, track_boxes, det_boxes, track_classes=None, det_classes=None):
+        """
+        Score matrix (tracks x detections); pairs scoring <= 0 never match.
+        IoU below iou_threshold and centroids beyond max_distance score 0.
+        With grid gating only the candidate pairs are scored, the rest stay 0.
+        """
+        pairs = self.candidate_pairs(track_boxes, det_boxes)
+        if pairs is None:
+            a, b = track_boxes, det_boxes
+            iou_fn, dist_fn = pairwise_iou, pairwise_centroid_distance
+        else:
+            a, b = track_boxes[pairs[0]], det_boxes[pairs[1]]
+            iou_fn, dist_fn = paired_iou, paired_centroid_distance
+        score = self._metric_scores(iou_fn(a, b) if self.metric != 'centroid' else None,
+                                    dist_fn(a, b) if self.metric != 'iou' else None)
+
+        if self.class_aware and track_classes is not None and det_classes is not None:
+            if pairs is None:
+                score = np.where(track_classes[:, None] == det_classes[None, :], score, 0.0)
+            else:
+                score = np.where(track_classes[pairs[0]] == det_classes[pairs[1]], score, 0.0)
+        if pairs is None:
+            return score
+        dense = np.zeros((len(track_boxes), len(det_boxes)), dtype=score.dtype)
+        dense[pairs] = score
+        return dense
+
+    def update(self, boxes, scores=None, classes=None, frame_idx=None, frame=None):
+        """
+        boxes: (N, 4) x1, y1, x2, y2 detections of this frame (may be empty)
+        scores, classes: optional (N,) detector confidences and class ids
+        frame_idx: frame number (defaults to the previous one + 1)
+        frame: image the boxes come from (only appearance-based trackers use it)
+        Call it on every frame detection ran on, even with no boxes; use predict()
+        for frames where detection was skipped.
+        Returns the ids of all live tracks. Afterwards self.matched flags the tracks
+        updated by this frame and self.det_track_ids gives the track of each detection.
+        """
+        self.frame_idx = self.frame_idx + 1 if frame_idx is None else int(frame_idx)
+        boxes, scores, classes = self._as_arrays(boxes, scores, classes)
+        self._predict()
+
+        self.matched = np.zeros(len(self.ids), dtype=bool)
+        rows = cols = np.empty(0, dtype=np.intp)
+        if len(self.ids) and len(boxes):
+            score = self.association_scores(self.boxes, boxes, self.classes, classes)
+            rows, cols = self.assign(score, 0.0)
+
+        self._correct(rows, boxes[cols])
+        self.scores[rows] = scores[cols]
+        self.last_frame[rows] = self.frame_idx
+        self.hits[rows] += 1
+        self.missed[rows] = 0
+        self.matched[rows] = True
+
+        self.det_track_ids = np.empty(len(boxes), dtype=np.int64)
+        self.det_track_ids[cols] = self.ids[rows]
+
+        self.lost = ~self.matched
+        self.missed[self.lost] += 1
+        self._drop_missed()
+
+        new = np.ones(len(boxes), dtype=bool)
+        new[cols] = False
+        if new.any():
+            self.det_track_ids[new] = self._append(boxes[new], scores[new], classes[new], self.frame_idx)
+        return self.ids.copy()
+
+    def predict(self, frame_idx=None):
+        """
+        Advance over a frame without detection (skipped by the caller). Kalman
+        tracks move to their predicted boxes, others keep theirs; tracks age as
+        missed but are not marked lost, since nothing was looked for.
+        Returns the ids of all live tracks.
+        """
+        self.frame_idx = self.frame_idx + 1 if frame_idx is None else int(frame_idx)
+        self._predict()
+        self.matched = np.zeros(len(self.ids), dtype=bool)
+        self.det_track_ids = np.empty(0, dtype=np.int64)
+        self.missed += 1
+        self._drop_missed()
+        return self.ids.copy()
+
+    def index(self, track_id):
+        """Row of a live track id, or None"""
+        row = int(np.searchsorted(self.ids, track_id))
+        if row < len(self.ids) and self.ids[row] == track_id:
+            return row
+        return None
+
+    def centroids(self):
+        return centroids(self.boxes)
+
+    def as_dict(self):
+        """{track_id: (x1, y1, x2, y2)} of the live tracks, as ints"""
+        return dict(zip(self.ids.tolist(), map(tuple, self.boxes.astype(np.int64).tolist())))
+
+
+def create_tracker(kind=None, **kwargs):
+    """
+    Tracker for kind (default SMARTEYE_TRACKER). 'legacy' means the caller's
+    own tracker and returns None.
+    """
+    kind = (kind or TRACKER_KIND).lower()
+    if kind == 'legacy':
+        return None
+    if kind == 'vectorized':
+        return Tracker(**kwargs)
+    if kind == 'bytetrack':
+        from .bytetrack import ByteTracker
+        return ByteTracker(**kwargs)
+    if kind == 'deepsort':
+        from .deepsort import DeepSortTracker
+        return DeepSortTracker(**kwargs)
+    raise ValueError(f"Unknown tracker '{kind}', expected one of {TRACKER_KINDS}")
@@ -0,0 +1,212 @@
+"""
+box_utils.py
+Vectorized box geometry and assignment helpers for the trackers.
+Boxes are float arrays of shape (N, 4) in (x1, y1, x2, y2) order.
+
+On wide frames with hundreds of boxes, grid_candidates() finds the pairs
+that can possibly match through a uniform grid, and the pairwise functions
+then only compute those (pairs=...), instead of every track x detection.
+"""
+
+import numpy as np
+
+try:
+    from scipy.optimize import linear_sum_assignment
+    SCIPY_AVAILABLE = True
+except Exception:
+    linear_sum_assignment = None
+    SCIPY_AVAILABLE = False
+
+
+def xywh_to_xyxy(boxes):
+    boxes = np.asarray(boxes, dtype=np.float32).reshape(-1, 4)
+    out = boxes.copy()
+    out[:, 2] = boxes[:, 0] + boxes[:, 2]
+    out[:, 3] = boxes[:, 1] + boxes[:, 3]
+    return out
+
+
+def pairwise_iou(a, b, pairs=None):
+    """
+    IoU matrix of shape (len(a), len(b)).
+    pairs: optional (rows, cols) from grid_candidates(); only those entries are
+           computed, the others are 0
+    """
+    a = np.asarray(a, dtype=np.float32).reshape(-1, 4)
+    b = np.asarray(b, dtype=np.float32).reshape(-1, 4)
+    if len(a) == 0 or len(b) == 0:
+        return np.zeros((len(a), len(b)), dtype=np.float32)
+    if pairs is not None:
+        out = np.zeros((len(a), len(b)), dtype=np.float32)
+        out[pairs] = paired_iou(a[pairs[0]], b[pairs[1]])
+        return out
+
+    x1 = np.maximum(a[:, None, 0], b[None, :, 0])
+    y1 = np.maximum(a[:, None, 1], b[None, :, 1])
+    x2 = np.minimum(a[:, None, 2], b[None, :, 2])
+    y2 = np.minimum(a[:, None, 3], b[None, :, 3])
+    inter = np.clip(x2 - x1, 0, None) * np.clip(y2 - y1, 0, None)
+
+    area_a = np.clip(a[:, 2] - a[:, 0], 0, None) * np.clip(a[:, 3] - a[:, 1], 0, None)
+    area_b = np.clip(b[:, 2] - b[:, 0], 0, None) * np.clip(b[:, 3] - b[:, 1], 0, None)
+    union = area_a[:, None] + area_b[None, :] - inter
+    return np.where(union > 0, inter / np.maximum(union, 1e-9), 0.0).astype(np.float32)
+
+
+def paired_iou(a, b):
+    """IoU of a[i] with b[i], shape (N,)"""
+    x1 = np.maximum(a[:, 0], b[:, 0])
+    y1 = np.maximum(a[:, 1], b[:, 1])
+    x2 = np.minimum(a[:, 2], b[:, 2])
+    y2 = np.minimum(a[:, 3], b[:, 3])
+    inter = np.clip(x2 - x1, 0, None) * np.clip(y2 - y1, 0, None)
+    area_a = np.clip(a[:, 2] - a[:, 0], 0, None) * np.clip(a[:, 3] - a[:, 1], 0, None)
+    area_b = np.clip(b[:, 2] - b[:, 0], 0, None) * np.clip(b[:, 3] - b[:, 1], 0, None)
+    union = area_a + area_b - inter
+    return np.where(union > 0, inter / np.maximum(union, 1e-9), 0.0).astype(np.float32)
+
+
+def centroids(boxes):
+    boxes = np.asarray(boxes, dtype=np.float32).reshape(-1, 4)
+    return np.stack([(boxes[:, 0] + boxes[:, 2]) * 0.5, (boxes[:, 1] + boxes[:, 3]) * 0.5], axis=1)
+
+
+def pairwise_centroid_distance(a, b, pairs=None):
+    """
+    Euclidean centroid distance matrix of shape (len(a), len(b)).
+    pairs: optional (rows, cols) from grid_candidates(); only those entries are
+           computed, the others are inf
+    """
+    ca = centroids(a)
+    cb = centroids(b)
+    if len(ca) == 0 or len(cb) == 0:
+        return np.zeros((len(ca), len(cb)), dtype=np.float32)
+    if pairs is not None:
+        out = np.full((len(ca), len(cb)), np.inf, dtype=np.float32)
+        out[pairs] = paired_centroid_distance(a[pairs[0]], b[pairs[1]])
+        return out
+    diff = ca[:, None, :] - cb[None, :, :]
+    return np.sqrt((diff ** 2).sum(axis=2)).astype(np.float32)
+
+
+def paired_centroid_distance(a, b):
+    """Centroid distance of a[i] to b[i], shape (N,)"""
+    diff = centroids(a) - centroids(b)
+    return np.sqrt((diff ** 2).sum(axis=1)).astype(np.float32)
+
+
+def _grid_cells(lo, hi):
+    """Box index, cell x, cell y and cell key for every grid cell of the (N, 2) cell ranges lo..hi"""
+    span = np.maximum(hi - lo + 1, 0)
+    count = span[:, 0] * span[:, 1]
+    idx = np.repeat(np.arange(len(lo)), count)
+    k = np.arange(int(count.sum())) - np.repeat(np.cumsum(count) - count, count)
+    cx = lo[idx, 0] + k % span[idx, 0]
+    cy = lo[idx, 1] + k // span[idx, 0]
+    return idx, cx, cy, (cx << 32) + cy
+
+
+def grid_candidates(a, b, reach=0.0, cell_size=None):
+    """
+    Pairs (i, j) where box b[j] intersects box a[i] grown by reach[i] on every
+    side, found through a uniform grid over b (bucketed in one pass per frame)
+    instead of testing all len(a) x len(b) pairs.
+    reach: scalar or (len(a),) largest plausible displacement, in pixels.
+           IoU > 0 needs reach 0; a centroid distance below d needs reach d.
+    cell_size: grid cell side (default: from the box and search-window sizes)
+    Returns (rows, cols) index arrays (each pair once, in no particular order).
+    """
+    a = np.asarray(a, dtype=np.float32).reshape(-1, 4)
+    b = np.asarray(b, dtype=np.float32).reshape(-1, 4)
+    if len(a) == 0 or len(b) == 0:
+        return np.empty(0, dtype=np.intp), np.empty(0, dtype=np.intp)
+    reach = np.broadcast_to(np.asarray(reach, dtype=np.float32), (len(a),))
+    window = a + reach[:, None] * np.array([-1, -1, 1, 1], dtype=np.float32)
+
+    if cell_size is None:
+        # Cells about as large as a box and half a search window: each box
+        # lands in a few cells and each window covers a few cells
+        sides = np.concatenate([b[:, 2] - b[:, 0], b[:, 3] - b[:, 1]])
+        cell_size = max(float(np.median(sides)), float(np.median(window[:, 2:] - window[:, :2])) / 2, 1.0)
+
+    # Windows are clipped to the extent of b: no cells where nothing can match
+    extent = np.concatenate([b[:, :2].min(axis=0), b[:, 2:].max(axis=0)])
+    a_lo = np.floor(np.maximum(window[:, :2], extent[:2]) / cell_size).astype(np.int64)
+    a_hi = np.floor(np.minimum(window[:, 2:], extent[2:]) / cell_size).astype(np.int64)
+    b_lo = np.floor(b[:, :2] / cell_size).astype(np.int64)
+    b_hi = np.floor(b[:, 2:] / cell_size).astype(np.int64)
+
+    b_idx, _, _, b_key = _grid_cells(b_lo, b_hi)
+    order = np.argsort(b_key, kind='stable')
+    b_idx, b_key = b_idx[order], b_key[order]
+    a_idx, cx, cy, a_key = _grid_cells(a_lo, a_hi)
+    start = np.searchsorted(b_key, a_key, side='left')
+    count = np.searchsorted(b_key, a_key, side='right') - start
+    offset = np.arange(int(count.sum())) - np.repeat(np.cumsum(count) - count, count)
+    rows = np.repeat(a_idx, count)
+    cols = b_idx[np.repeat(start, count) + offset]
+
+    # A pair sharing several cells shows up once per cell: keep it in the
+    # top-left cell the two have in common
+    first = ((np.repeat(cx, count) == np.maximum(a_lo[:, 0].take(rows), b_lo[:, 0].take(cols)))
+             & (np.repeat(cy, count) == np.maximum(a_lo[:, 1].take(rows), b_lo[:, 1].take(cols))))
+    rows, cols = rows[first], cols[first]
+    w, d = window[rows], b[cols]
+    hit = (w[:, 0] <= d[:, 2]) & (d[:, 0] <= w[:, 2]) & (w[:, 1] <= d[:, 3]) & (d[:, 1] <= w[:, 3])
+    return rows[hit].astype(np.intp), cols[hit].astype(np.intp)
+
+
+def greedy_assignment(score, min_score):
+    """
+    Sorted-greedy matching: take the highest-scoring (row, col) pairs first,
+    skipping rows/cols that are already used. Returns (rows, cols) arrays.
+    """
+    rows, cols = np.nonzero(score > min_score)
+    if len(rows) == 0:
+        return np.empty(0, dtype=np.intp), np.empty(0, dtype=np.intp)
+
+    order = np.argsort(-score[rows, cols], kind='stable')
+    used_rows = np.zeros(score.shape[0], dtype=bool)
+    used_cols = np.zeros(score.shape[1], dtype=bool)
+    out_rows, out_cols = [], []
+    for r, c in zip(rows[order], cols[order]):
+        if used_rows[r] or used_cols[c]:
+            continue
+        used_rows[r] = True
+        used_cols[c] = True
+        out_rows.append(r)
+        out_cols.append(c)
+    return np.asarray(out_rows, dtype=np.intp), np.asarray(out_cols, dtype=np.intp)
+
+
+def optimal_assignment(score, min_score):
+    """
+    Hungarian matching that maximises the total score over pairs above
+    min_score. Falls back to sorted-greedy when scipy is not installed.
+    """
+    if score.size == 0:
+        return np.empty(0, dtype=np.intp), np.empty(0, dtype=np.intp)
+    if not SCIPY_AVAILABLE:
+        return greedy_assignment(score, min_score)
+
+    valid = score > min_score
+    cost = np.where(valid, -score, 0.0)
+    rows, cols = linear_sum_assignment(cost)
+    keep = valid[rows, cols]
+    return rows[keep].astype(np.intp), cols[keep].astype(np.intp)
+
+
+def xyxy_to_xyah(boxes):
+    """(x1, y1, x2, y2) -> (center x, center y, aspect w/h, height), the Kalman measurement space"""
+    boxes = np.asarray(boxes, dtype=np.float64).reshape(-1, 4)
+    w = boxes[:, 2] - boxes[:, 0]
+    h = np.maximum(boxes[:, 3] - boxes[:, 1], 1e-6)
+    return np.stack([boxes[:, 0] + w * 0.5, boxes[:, 1] + h * 0.5, w / h, h], axis=1)
+
+
+def xyah_to_xyxy(xyah):
+    xyah = np.asarray(xyah, dtype=np.float64).reshape(-1, 4)
+    h = np.maximum(xyah[:, 3], 0.0)
+    w = np.maximum(xyah[:, 2], 0.0) * h
+    return np.stack([xyah[:, 0] - w * 0.5, xyah[:, 1] - h * 0.5,
+                     xyah[:, 0] + w * 0.5, xyah[:, 1] + h * 0.5], axis=1).astype(np.float32)
@@ -0,0 +1,71 @@
+"""
+event_log.py
+Append-only event log with a bounded in-memory tail.
+
+The newest max_in_memory events stay in memory; once that is exceeded the
+older half is written to a spill file as JSON lines (an anonymous temp file,
+deleted automatically, unless spill_path is given). len() and iteration cover
+every event, reading the spilled ones back from disk in order.
+"""
+
+import os
+import json
+import tempfile
+from collections import deque
+
+EVENT_LOG_MEMORY = int(os.environ.get('SMARTEYE_EVENT_LOG_MEMORY', 1000))
+
+
+class EventLog:
+
+    def __init__(self, max_in_memory=EVENT_LOG_MEMORY, spill_path=None, spill_dir=None):
+        self.max_in_memory = max(2, int(max_in_memory))
+        self.spill_path = spill_path
+        self.spill_dir = spill_dir
+        self.spilled = 0
+        self._recent = deque()
+        self._file = None
+
+    def _spill_file(self):
+        if self._file is None:
+            if self.spill_path:
+                self._file = open(self.spill_path, 'w+', encoding='utf-8')
+            else:
+                self._file = tempfile.TemporaryFile('w+', encoding='utf-8', dir=self.spill_dir)
+        return self._file
+
+    def _spill(self):
+        n = len(self._recent) - self.max_in_memory // 2
+        f = self._spill_file()
+        f.seek(0, os.SEEK_END)
+        f.write(''.join(json.dumps(self._recent.popleft(), default=str) + '\n' for _ in range(n)))
+        self.spilled += n
+
+    def append(self, event):
+        self._recent.append(event)
+        if len(self._recent) > self.max_in_memory:
+            self._spill()
+
+    def recent(self, n=None):
+        """The newest n events still in memory (all of them by default)"""
+        events = list(self._recent)
+        return events if n is None else events[-n:]
+
+    def __len__(self):
+        return self.spilled + len(self._recent)
+
+    def __iter__(self):
+        if self._file is not None:
+            self._file.flush()
+            self._file.seek(0)
+            for line in self._file:
+                yield json.loads(line)
+        yield from list(self._recent)
+
+    def to_list(self):
+        return list(self)
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
@@ -0,0 +1,34 @@
+"""
+image_utils.py
+Decoding and resizing helpers shared by the detection entry points.
+"""
+
+import cv2
+import numpy as np
+
+
+def resize_to_max_dim(image, max_dim):
+    """
+    Downscale image so its longest side is at most max_dim (never upscales).
+    Returns (resized_image, scale) where scale = resized / original.
+    """
+    h, w = image.shape[:2]
+    if not max_dim or max(h, w) <= max_dim:
+        return image, 1.0
+    scale = max_dim / float(max(h, w))
+    resized = cv2.resize(image, (int(round(w * scale)), int(round(h * scale))), interpolation=cv2.INTER_AREA)
+    return resized, scale
+
+
+def unscale_box(box, scale):
+    """Map an (x1, y1, x2, y2) box from a resized image back to original coordinates"""
+    if scale == 1.0:
+        return [int(v) for v in box]
+    return [int(round(v / scale)) for v in box]
+
+
+def decode_image(data):
+    """Decode encoded image bytes (JPEG/PNG) to a BGR frame; None if undecodable"""
+    if not data:
+        return None
+    return cv2.imdecode(np.frombuffer(data, np.uint8), cv2.IMREAD_COLOR)
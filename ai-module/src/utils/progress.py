@@ -0,0 +1,133 @@
+"""
+progress.py
+Structured, rate-limited progress events for long video runs.
+
+The same event dict is sent to the detection service's SSE stream and, for the
+CLI counter scripts, printed as one JSON object per line (NDJSON) on stdout:
+
+    {"event": "progress", "frames": 1200, "total_frames": 9000, "percentage": 13.3,
+     "fps": 41.7, "eta_seconds": 187.1, "elapsed_seconds": 28.8, "counts": {...}}
+
+The final result line printed by a script has no "event" key.
+"""
+
+import os
+import sys
+import json
+import time
+
+PROGRESS_MIN_INTERVAL = float(os.environ.get('SMARTEYE_PROGRESS_INTERVAL', 1.0))
+# Weight of the newest interval in the smoothed fps
+FPS_SMOOTHING = 0.3
+
+
+class ProgressReporter:
+    """
+    Turns per-frame update() calls into progress events, emitted at most once
+    every min_interval seconds (plus a final event from finish()).
+    sink: callable(event_dict), or a list of them
+    """
+
+    def __init__(self, sink, total_frames=None, min_interval=PROGRESS_MIN_INTERVAL, job_id=None):
+        self.sinks = sink if isinstance(sink, (list, tuple)) else [sink]
+        self.total_frames = int(total_frames) if total_frames and total_frames > 0 else None
+        self.min_interval = float(min_interval)
+        self.job_id = job_id
+
+        self.start_time = time.perf_counter()
+        self._last_emit = None
+        self._last_frames = 0
+        self._last_time = self.start_time
+        self.fps = 0.0
+        self.events_emitted = 0
+
+    def _event(self, event, frames, counts, now):
+        elapsed = now - self.start_time
+        percentage = None
+        eta = None
+        if self.total_frames:
+            percentage = round(min(100.0, frames * 100.0 / self.total_frames), 1)
+            if self.fps > 0:
+                eta = round(max(0, self.total_frames - frames) / self.fps, 1)
+        data = {
+            'event': event,
+            'frames': int(frames),
+            'total_frames': self.total_frames,
+            'percentage': percentage,
+            'fps': round(self.fps, 1),
+            'eta_seconds': eta,
+            'elapsed_seconds': round(elapsed, 1),
+            'counts': dict(counts or {}),
+            'timestamp': time.time(),
+        }
+        if self.job_id is not None:
+            data['job_id'] = self.job_id
+        return data
+
+    def _emit(self, data):
+        self.events_emitted += 1
+        for sink in self.sinks:
+            try:
+                sink(data)
+            except Exception as e:
+                print(f"⚠️ Progress sink failed: {e}", file=sys.stderr)
+
+    def due(self):
+        """True when the next update() would emit; lets callers skip building counts"""
+        return self._last_emit is None or time.perf_counter() - self._last_emit >= self.min_interval
+
+    def update(self, frames, counts=None, force=False):
+        """
+        frames: frames read so far (same unit as total_frames)
+        counts: running counts to include, e.g. {'male': 3, 'female': 5}
+        Returns the emitted event, or None when rate-limited.
+        """
+        now = time.perf_counter()
+        if not force and not self.due():
+            return None
+
+        dt = now - self._last_time
+        if dt > 0 and frames > self._last_frames:
+            current = (frames - self._last_frames) / dt
+            self.fps = current if self.fps == 0 else (FPS_SMOOTHING * current + (1 - FPS_SMOOTHING) * self.fps)
+        self._last_frames = frames
+        self._last_time = now
+        self._last_emit = now
+
+        data = self._event('progress', frames, counts, now)
+        self._emit(data)
+        return data
+
+    def finish(self, frames, counts=None, status='completed'):
+        now = time.perf_counter()
+        elapsed = now - self.start_time
+        if elapsed > 0:
+            self.fps = frames / elapsed
+        data = self._event('done', frames, counts, now)
+        data['status'] = status
+        if status == 'completed':
+            data['percentage'] = 100.0
+            data['eta_seconds'] = 0.0
+        self._emit(data)
+        return data
+
+
+def ndjson_sink(stream=None):
+    """Sink printing each event as one JSON line (stdout by default), flushed immediately"""
+    def emit(data):
+        out = stream or sys.stdout
+        out.write(json.dumps(data, default=str) + '\n')
+        out.flush()
+    return emit
+
+
+def log_sink(prefix='Progress'):
+    """Human-readable sink for console logs"""
+    def emit(data):
+        if data['event'] != 'progress':
+            return
+        pct = f"{data['percentage']:.1f}%" if data['percentage'] is not None else '?%'
+        eta = f", ETA {data['eta_seconds']:.0f}s" if data['eta_seconds'] is not None else ''
+        print(f"{prefix}: {pct} ({data['frames']}/{data['total_frames'] or '?'} frames, "
+              f"{data['fps']:.1f} fps{eta})", file=sys.stderr)
+    return emit
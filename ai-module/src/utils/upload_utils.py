@@ -0,0 +1,135 @@
+"""
+upload_utils.py
+Stream uploads to collision-free temp files, hashing and size-checking on the fly,
+and split length-prefixed multi-frame bodies.
+"""
+
+import os
+import struct
+import hashlib
+import tempfile
+
+UPLOAD_CHUNK_SIZE = 1024 * 1024
+
+
+class UploadTooLargeError(Exception):
+    """Raised while streaming when an upload exceeds its maximum size"""
+
+
+class HashingTempFile:
+    """
+    Writable temp file (unique name from mkstemp) that keeps a running sha256
+    and byte count of everything written to it and refuses to grow past
+    max_bytes. Writes go through a buffer of chunk_size bytes.
+
+    Set keep=True once the path has been handed off; discard() removes the file.
+    """
+
+    def __init__(self, dest_dir=None, suffix='', max_bytes=None, chunk_size=UPLOAD_CHUNK_SIZE):
+        fd, self.path = tempfile.mkstemp(prefix='upload_', suffix=suffix, dir=dest_dir)
+        self._file = os.fdopen(fd, 'w+b', buffering=chunk_size)
+        self._hash = hashlib.sha256()
+        self.size = 0
+        self.max_bytes = max_bytes
+        self.keep = False
+
+    @property
+    def sha256(self):
+        return self._hash.hexdigest()
+
+    @property
+    def closed(self):
+        return self._file.closed
+
+    def write(self, data):
+        self.size += len(data)
+        if self.max_bytes is not None and self.size > self.max_bytes:
+            self.discard()
+            raise UploadTooLargeError(f"Upload exceeds the maximum size of {self.max_bytes / (1024 * 1024):g} MB")
+        self._hash.update(data)
+        return self._file.write(data)
+
+    def read(self, *args):
+        return self._file.read(*args)
+
+    def seek(self, *args):
+        return self._file.seek(*args)
+
+    def tell(self):
+        return self._file.tell()
+
+    def flush(self):
+        self._file.flush()
+
+    def readable(self):
+        return True
+
+    def writable(self):
+        return True
+
+    def seekable(self):
+        return True
+
+    def close(self):
+        if not self._file.closed:
+            self._file.close()
+
+    def discard(self):
+        self.close()
+        try:
+            os.remove(self.path)
+        except OSError:
+            pass
+
+    def __iter__(self):
+        return iter(lambda: self._file.read(UPLOAD_CHUNK_SIZE), b'')
+
+
+def stream_to_temp(src, dest_dir=None, suffix='', max_bytes=None, chunk_size=UPLOAD_CHUNK_SIZE):
+    """
+    Copy a readable stream into a HashingTempFile in fixed-size chunks.
+    Returns the closed HashingTempFile (path, sha256, size).
+    """
+    upload = HashingTempFile(dest_dir, suffix=suffix, max_bytes=max_bytes, chunk_size=chunk_size)
+    try:
+        for chunk in iter(lambda: src.read(chunk_size), b''):
+            upload.write(chunk)
+    except Exception:
+        upload.discard()
+        raise
+    upload.close()
+    return upload
+
+
+def _read_exact(stream, n):
+    parts = []
+    while n > 0:
+        chunk = stream.read(n)
+        if not chunk:
+            break
+        parts.append(chunk)
+        n -= len(chunk)
+    return b''.join(parts)
+
+
+def read_length_prefixed(stream, max_items, max_item_bytes):
+    """
+    Split a body of [4-byte big-endian length][payload] records into a list of
+    payloads. Raises ValueError on truncated records or when a limit is exceeded.
+    """
+    items = []
+    while True:
+        header = _read_exact(stream, 4)
+        if not header:
+            return items
+        if len(header) < 4:
+            raise ValueError('Truncated length prefix')
+        size = struct.unpack('>I', header)[0]
+        if size > max_item_bytes:
+            raise ValueError(f"Record {len(items)} exceeds {max_item_bytes} bytes")
+        if len(items) >= max_items:
+            raise ValueError(f"More than {max_items} records")
+        payload = _read_exact(stream, size)
+        if len(payload) < size:
+            raise ValueError(f"Truncated record {len(items)}")
+        items.append(payload)
@@ -0,0 +1,76 @@
+"""
+video_utils.py
+Frame sampling helpers for cv2.VideoCapture sources.
+"""
+
+import cv2
+
+
+class FrameSampler:
+    """
+    Iterate over only the frames of a capture that will be analysed.
+
+    Skipped frames are advanced with cap.grab(), which leaves them undecoded
+    to BGR and uncopied; cap.retrieve() is called only for kept frames.
+
+    Two sampling modes:
+      - by_timestamp=True (default): keep the first frame at or after every
+        1/sample_fps seconds of media time (CAP_PROP_POS_MSEC), which stays
+        correct for variable-frame-rate uploads (phone recordings).
+      - by_timestamp=False: keep every `every_n`-th frame
+        (derived from sample_fps and the nominal fps when not given).
+
+    Yields (frame_index, timestamp_seconds, frame).
+    """
+
+    def __init__(self, cap, sample_fps=4.0, every_n=None, by_timestamp=True):
+        self.cap = cap
+        self.fps = cap.get(cv2.CAP_PROP_FPS) or 25.0
+        self.sample_fps = float(sample_fps) if sample_fps else self.fps
+        self.by_timestamp = by_timestamp
+        if every_n is None:
+            every_n = max(1, int(self.fps / self.sample_fps))
+        self.every_n = max(1, int(every_n))
+        self.interval = 1.0 / self.sample_fps if self.sample_fps > 0 else 0.0
+
+        self.frames_read = 0      # frames grabbed (decoded or skipped)
+        self.frames_decoded = 0   # frames retrieved and yielded
+        self._last_ts = -1.0
+
+    def _timestamp(self, frame_index):
+        ts = self.cap.get(cv2.CAP_PROP_POS_MSEC) / 1000.0
+        # Some backends/containers report 0 or go backwards; fall back to the nominal rate
+        if (ts <= 0 and frame_index > 0) or ts < self._last_ts:
+            ts = frame_index / self.fps
+        self._last_ts = ts
+        return ts
+
+    def __iter__(self):
+        next_sample_ts = 0.0
+        frame_index = 0
+
+        while True:
+            if not self.cap.grab():
+                break
+            self.frames_read += 1
+
+            if self.by_timestamp:
+                ts = self._timestamp(frame_index)
+                keep = ts + 1e-6 >= next_sample_ts
+                if keep:
+                    # Skip whole intervals on gaps instead of bursting to catch up
+                    while next_sample_ts <= ts + 1e-6:
+                        next_sample_ts += self.interval or 1e-6
+            else:
+                keep = frame_index % self.every_n == 0
+                ts = None
+
+            if keep:
+                ret, frame = self.cap.retrieve()
+                if ret and frame is not None:
+                    if ts is None:
+                        ts = self._timestamp(frame_index)
+                    self.frames_decoded += 1
+                    yield frame_index, ts, frame
+
+            frame_index += 1
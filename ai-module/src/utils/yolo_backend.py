@@ -0,0 +1,134 @@
+"""
+yolo_backend.py
+Pluggable CPU inference backend for ultralytics YOLO models.
+
+load_yolo('yolov8n.pt') exports the weights once to ONNX (or OpenVINO IR),
+caches the artifact next to the .pt file and returns an ultralytics YOLO
+object running on that runtime. Calls and results (boxes.xyxy / conf / cls,
+names) are the same as with the PyTorch model, so callers do not change.
+
+Backend selection: SMARTEYE_INFERENCE_BACKEND = onnx (default) | openvino | torch.
+Falls back to PyTorch when the runtime is missing or the export fails.
+"""
+
+import os
+import time
+import importlib.util
+
+INFERENCE_BACKEND = os.environ.get('SMARTEYE_INFERENCE_BACKEND', 'onnx').lower()
+EXPORT_IMGSZ = int(os.environ.get('SMARTEYE_EXPORT_IMGSZ', 640))
+# Another process exporting the same weights holds the lock at most this long
+EXPORT_LOCK_TIMEOUT = 600
+
+BACKEND_FORMATS = {
+    'onnx': 'onnx',
+    'openvino': 'openvino',
+}
+BACKEND_RUNTIMES = {
+    'onnx': 'onnxruntime',
+    'openvino': 'openvino',
+}
+
+
+def exported_path(weights, backend):
+    """Where the exported artifact for weights lives (ultralytics naming)"""
+    stem, _ = os.path.splitext(weights)
+    if backend == 'onnx':
+        return stem + '.onnx'
+    if backend == 'openvino':
+        return stem + '_openvino_model'
+    return weights
+
+
+def runtime_available(backend):
+    module = BACKEND_RUNTIMES.get(backend)
+    return module is not None and importlib.util.find_spec(module) is not None
+
+
+def _resolve_weights(weights):
+    """
+    Bare names like 'yolov8n.pt' are auto-downloaded by ultralytics into the
+    working directory; load once to learn the real path.
+    """
+    if os.path.exists(weights):
+        return os.path.abspath(weights)
+    from ultralytics import YOLO
+    model = YOLO(weights)
+    path = getattr(model, 'ckpt_path', None) or weights
+    return os.path.abspath(path) if os.path.exists(path) else weights
+
+
+class _ExportLock:
+    """Cross-process lock file so concurrent workers export a model only once"""
+
+    def __init__(self, path):
+        self.path = path + '.export.lock'
+        self.fd = None
+
+    def __enter__(self):
+        deadline = time.time() + EXPORT_LOCK_TIMEOUT
+        while True:
+            try:
+                self.fd = os.open(self.path, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+                return self
+            except FileExistsError:
+                # Stale lock from a crashed export
+                try:
+                    if time.time() - os.path.getmtime(self.path) > EXPORT_LOCK_TIMEOUT:
+                        os.remove(self.path)
+                        continue
+                except OSError:
+                    continue
+                if time.time() > deadline:
+                    raise TimeoutError(f"Timed out waiting for export lock {self.path}")
+                time.sleep(0.5)
+
+    def __exit__(self, *exc):
+        os.close(self.fd)
+        try:
+            os.remove(self.path)
+        except OSError:
+            pass
+
+
+def export_model(weights, backend, imgsz=EXPORT_IMGSZ):
+    """Export weights for backend unless a cached artifact exists; returns the artifact path"""
+    weights = _resolve_weights(weights)
+    target = exported_path(weights, backend)
+    if os.path.exists(target):
+        return target
+
+    with _ExportLock(weights):
+        if os.path.exists(target):
+            return target
+        from ultralytics import YOLO
+        print(f"📦 Exporting {os.path.basename(weights)} to {backend} (one-time)...")
+        start = time.perf_counter()
+        # dynamic: keep batched calls (list of frames) working on the exported graph
+        out = YOLO(weights).export(format=BACKEND_FORMATS[backend], imgsz=imgsz, dynamic=True, verbose=False)
+        print(f"✅ Exported {os.path.basename(str(out))} in {time.perf_counter() - start:.1f}s")
+        return str(out)
+
+
+def load_yolo(weights, backend=None, task='detect'):
+    """
+    Return an ultralytics YOLO model for weights on the requested backend.
+    The chosen backend is available as model.inference_backend.
+    """
+    from ultralytics import YOLO
+
+    backend = (backend or INFERENCE_BACKEND).lower()
+    if backend in BACKEND_FORMATS:
+        if not runtime_available(backend):
+            print(f"⚠️ {BACKEND_RUNTIMES[backend]} not installed, using PyTorch for {os.path.basename(weights)}")
+        else:
+            try:
+                model = YOLO(export_model(weights, backend), task=task)
+                model.inference_backend = backend
+                return model
+            except Exception as e:
+                print(f"⚠️ {backend} backend unavailable for {os.path.basename(weights)} ({e}), using PyTorch")
+
+    model = YOLO(weights)
+    model.inference_backend = 'torch'
+    return model
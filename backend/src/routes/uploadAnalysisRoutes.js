@@ -460,6 +460,9 @@ router.post('/detection/process-video', authenticate, upload.single('video'), as
       filename: req.file.originalname,
       contentType: req.file.mimetype
     });
+    // Video jobs are queued by the detection service; wait=true keeps this route synchronous.
+    // Async clients can use the job's events_url (SSE) for live progress instead.
+    formData.append('wait', 'true');
 
     // Forward to Python detection service
     console.log(`🔄 Forwarding to detection service: ${DETECTION_SERVICE_URL}`);
@@ -11,6 +11,53 @@ const { Op, fn, col } = require('sequelize');
 class DetectionIntegrationService {
   constructor() {
     this.detectionServiceUrl = process.env.DETECTION_SERVICE_URL || 'http://localhost:5000';
+    this.jobPollIntervalMs = parseInt(process.env.DETECTION_JOB_POLL_MS || '2000', 10);
+    this.jobTimeoutMs = parseInt(process.env.DETECTION_JOB_TIMEOUT_MS || '3600000', 10);
+  }
+
+  /**
+   * Poll a queued video job until it finishes and return its result payload
+   */
+  async waitForVideoJob(jobId) {
+    const deadline = Date.now() + this.jobTimeoutMs;
+
+    while (Date.now() < deadline) {
+      const response = await axios.get(
+        `${this.detectionServiceUrl}/api/detection/jobs/${jobId}/result`,
+        { timeout: 30000, validateStatus: (status) => status < 500 }
+      );
+
+      if (response.status === 404) {
+        throw new Error(`Detection job ${jobId} not found`);
+      }
+
+      // 202 = still queued or running
+      if (response.status !== 202) {
+        return response.data;
+      }
+
+      await new Promise((resolve) => setTimeout(resolve, this.jobPollIntervalMs));
+    }
+
+    await this.cancelVideoJob(jobId);
+    throw new Error(`Detection job ${jobId} timed out`);
+  }
+
+  /**
+   * Cancel a queued or running video job
+   */
+  async cancelVideoJob(jobId) {
+    try {
+      const response = await axios.post(
+        `${this.detectionServiceUrl}/api/detection/jobs/${jobId}/cancel`,
+        null,
+        { timeout: 10000 }
+      );
+      return response.data;
+    } catch (error) {
+      console.error(`❌ Failed to cancel detection job ${jobId}:`, error.message);
+      return null;
+    }
   }
 
   /**
@@ -28,19 +75,30 @@ class DetectionIntegrationService {
       const formData = new FormData();
       formData.append('video', fs.createReadStream(filePath));
 
-      const response = await axios.post(
+      const submitResponse = await axios.post(
         `${this.detectionServiceUrl}/api/detection/process-video`,
         formData,
         {
           headers: formData.getHeaders(),
           maxContentLength: Infinity,
           maxBodyLength: Infinity,
-          timeout: 600000 // 10 minutes
+          timeout: 600000 // upload only; processing is polled below
         }
       );
 
-      if (response.data.success) {
-        const { detections, summary } = response.data;
+      let result;
+      if (submitResponse.data.cache_hit) {
+        // Same file + parameters were processed before; the result comes back directly
+        console.log('♻️ Detection result served from cache');
+        result = submitResponse.data;
+      } else {
+        const detectionJobId = submitResponse.data.job_id;
+        console.log(`🧾 Detection job queued: ${detectionJobId}`);
+        result = await this.waitForVideoJob(detectionJobId);
+      }
+
+      if (result.success) {
+        const { detections, summary } = result;
 
         console.log(`✅ Detection complete: ${summary.total_count} detections`);
         console.log(`   Male: ${summary.male_count}, Female: ${summary.female_count}`);
@@ -57,13 +115,14 @@ class DetectionIntegrationService {
         return {
           success: true,
           detections: savedDetections,
+          cache_hit: Boolean(result.cache_hit),
           summary: {
             ...summary,
             saved_count: savedDetections.length
           }
         };
       } else {
-        throw new Error(response.data.message || 'Detection failed');
+        throw new Error(result.message || 'Detection failed');
       }
 
     } catch (error) {
@@ -106,6 +165,45 @@ class DetectionIntegrationService {
     }
   }
 
+  /**
+   * Process a batch of frames (e.g. one second of camera frames) in a single request.
+   * Returns per-frame results in the same order as frameBuffers.
+   */
+  async processFramesWithGenderDetection(frameBuffers, options = {}) {
+    try {
+      const { camera_id } = options;
+
+      const formData = new FormData();
+      frameBuffers.forEach((buffer, index) => {
+        formData.append('frames', buffer, {
+          filename: `frame_${index}.jpg`,
+          contentType: 'image/jpeg'
+        });
+      });
+
+      if (camera_id) {
+        formData.append('camera_id', camera_id);
+      }
+
+      const response = await axios.post(
+        `${this.detectionServiceUrl}/api/detection/detect-frames`,
+        formData,
+        {
+          headers: formData.getHeaders(),
+          maxContentLength: Infinity,
+          maxBodyLength: Infinity,
+          timeout: 60000
+        }
+      );
+
+      return response.data;
+
+    } catch (error) {
+      console.error('❌ Batch frame detection error:', error.message);
+      throw error;
+    }
+  }
+
   /**
    * Save detections to your database with gender information
    */
@@ -392,6 +490,29 @@ class DetectionIntegrationService {
     }
   }
 
+  /**
+   * Check whether the detection models are loaded and warmed up
+   */
+  async checkServiceReadiness() {
+    try {
+      const response = await axios.get(
+        `${this.detectionServiceUrl}/api/detection/ready`,
+        { timeout: 5000, validateStatus: (status) => status === 200 || status === 503 }
+      );
+
+      return {
+        ready: response.status === 200,
+        details: response.data
+      };
+
+    } catch (error) {
+      return {
+        ready: false,
+        error: error.message
+      };
+    }
+  }
+
   /**
    * Get detection service capabilities
    */
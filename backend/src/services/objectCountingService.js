@@ -10,6 +10,7 @@ const { error } = require('console');
 
 const runLineCounter = require("./python/runLineCounter");
 const runObjectCounter = require("./python/runObjectCounter");
+const { createProgressParser, parseFinalResult, jobProgressFromEvent } = require("./python/progressEvents");
 
 
 class ObjectCountingService {
@@ -391,23 +392,20 @@ captureStreamVideo(streamUrl, outputPath, duration) {
       let stderr = '';
       let lastProgress = 10;
 
-      pythonProcess.stdout.on('data', async (data) => {
-        const output = data.toString();
-        stdout += output;
-        // console.log(`[Job ${jobId} stdout]`, output);
-
-        // try parse progress lines that we might have emitted to stderr only;
-        // but if python ever writes progress to stdout (shouldn't), handle it.
-        const progressMatch = output.match(/Progress.*?(\d+\.?\d*)%/);
-        if (progressMatch) {
-          const progress = Math.min(95, parseInt(progressMatch[1]));
-          if (progress > lastProgress) {
-            lastProgress = progress;
-            try { await job.update({ progress }); } catch (e) { /* ignore */ }
-          }
+      // NDJSON progress events from the script (see python/progressEvents.js)
+      const onStdout = createProgressParser(async (event) => {
+        const progress = jobProgressFromEvent(event);
+        if (progress !== null && progress > lastProgress) {
+          lastProgress = progress;
+          try { await job.update({ progress }); } catch (e) { /* ignore */ }
         }
       });
 
+      pythonProcess.stdout.on('data', (data) => {
+        stdout += data.toString();
+        onStdout(data);
+      });
+
       pythonProcess.stderr.on('data', (data) => {
         const error = data.toString();
         stderr += error;
@@ -434,7 +432,7 @@ captureStreamVideo(streamUrl, outputPath, duration) {
 
         if (code === 0) {
           try {
-            // stdout should be a final JSON line (as designed). We'll attempt to parse last non-empty line.
+            // stdout ends with the final JSON result line; earlier lines may be NDJSON progress events.
             const lines = stdout.trim().split(/\r?\n/).filter(l => l.trim().length > 0);
             let jsonLine = null;
             if (lines.length > 0) {
@@ -444,7 +442,7 @@ captureStreamVideo(streamUrl, outputPath, duration) {
             let results = null;
             if (jsonLine) {
               try {
-                results = JSON.parse(jsonLine);
+                results = parseFinalResult(stdout);
               } catch (err) {
                 // fallback: try to find JSON substring anywhere in stdout
                 const jsonMatch = stdout.match(/\{[\s\S]*\}$/);
@@ -4,6 +4,7 @@ const { sequelize } = require("@config/database");
 const { spawn } = require('child_process');
 const path = require('path');
 const fs = require('fs');
+const { createProgressParser, parseFinalResult } = require('./python/progressEvents');
 
 
 class PeopleCountService {
@@ -363,8 +364,16 @@ class PeopleCountService {
     let stdoutData = '';
     let stderrData = '';
 
+    // NDJSON progress events precede the final result line
+    const onStdout = createProgressParser((event) => {
+      if (event.event === 'progress') {
+        console.log(`🔄 Progress: ${event.percentage ?? '?'}% (${event.frames}/${event.total_frames ?? '?'} frames, ${event.fps} fps, ETA ${event.eta_seconds ?? '?'}s)`);
+      }
+    });
+
     pythonProcess.stdout.on('data', (data) => {
       stdoutData += data.toString();
+      onStdout(data);
     });
 
     pythonProcess.stderr.on('data', (data) => {
@@ -384,8 +393,8 @@ class PeopleCountService {
       }
 
       try {
-        // Parse JSON output from stdout
-        const result = JSON.parse(stdoutData);
+        // Final JSON result is the last stdout line without an "event" key
+        const result = parseFinalResult(stdoutData);
         
         if (!result.success) {
           console.error('❌ Processing failed:', result.error);
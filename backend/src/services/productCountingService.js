@@ -9,6 +9,7 @@ const fsSync = require('fs');
 const { v4: uuidv4 } = require('uuid');
 const { ObjectCountingJob } = require('../models');
 const { Op } = require('sequelize');
+const { createProgressParser, parseFinalResult, jobProgressFromEvent } = require('./python/progressEvents');
 
 class ProductCountingService {
   constructor() {
@@ -177,20 +178,21 @@ class ProductCountingService {
       let stderr = '';
       let lastProgress = 10;
 
+      // NDJSON progress events from the script (see python/progressEvents.js)
+      const onStdout = createProgressParser(async (event) => {
+        const progress = jobProgressFromEvent(event);
+        if (progress !== null && progress > lastProgress) {
+          lastProgress = progress;
+          try { await job.update({ progress }); } catch (e) { /* ignore */ }
+        }
+      });
+
       pythonProcess.stdout.on('data', async (data) => {
         const output = data.toString();
         stdout += output;
         console.log(`[Job ${jobId}] ${output}`);
 
-        // Parse progress
-        const progressMatch = output.match(/Progress.*?(\d+\.?\d*)%/);
-        if (progressMatch) {
-          const progress = Math.min(95, parseInt(progressMatch[1]));
-          if (progress > lastProgress) {
-            lastProgress = progress;
-            await job.update({ progress });
-          }
-        }
+        onStdout(data);
 
         // Update metadata with logs
         try {
@@ -219,9 +221,7 @@ class ProductCountingService {
 
         if (code === 0) {
           try {
-            const lines = stdout.trim().split('\n');
-            const lastLine = lines[lines.length - 1];
-            const results = JSON.parse(lastLine);
+            const results = parseFinalResult(stdout);
             
             console.log(`✅ Job ${jobId} completed:`, {
               total_counted: results.total_counted,
@@ -0,0 +1,71 @@
+// backend/src/services/python/progressEvents.js
+/**
+ * Helpers for the NDJSON progress protocol of the Python counter scripts.
+ *
+ * While running, a script prints one JSON object per line with an "event" key
+ * ("progress" or "done") carrying frames, total_frames, percentage, fps,
+ * eta_seconds and running counts. The final result is the last line that has
+ * no "event" key. Any other stdout text is ignored.
+ */
+
+/**
+ * Returns a function to feed raw stdout chunks into; onEvent is called once
+ * per complete progress line (partial lines are buffered across chunks).
+ */
+function createProgressParser(onEvent) {
+  let buffer = '';
+
+  return (chunk) => {
+    buffer += chunk.toString();
+    const lines = buffer.split(/\r?\n/);
+    buffer = lines.pop();
+
+    for (const line of lines) {
+      const event = parseEventLine(line);
+      if (event) onEvent(event);
+    }
+  };
+}
+
+function parseEventLine(line) {
+  const trimmed = line.trim();
+  if (!trimmed.startsWith('{')) return null;
+  try {
+    const data = JSON.parse(trimmed);
+    return data && typeof data.event === 'string' ? data : null;
+  } catch (e) {
+    return null;
+  }
+}
+
+/**
+ * Extract the final result object from complete stdout (last JSON line without "event")
+ */
+function parseFinalResult(stdout) {
+  const lines = stdout.trim().split(/\r?\n/).filter((l) => l.trim().length > 0);
+  for (let i = lines.length - 1; i >= 0; i -= 1) {
+    const trimmed = lines[i].trim();
+    if (!trimmed.startsWith('{')) continue;
+    try {
+      const data = JSON.parse(trimmed);
+      if (data && data.event === undefined) return data;
+    } catch (e) {
+      // not a JSON line, keep looking
+    }
+  }
+  throw new Error('No JSON result line in python stdout');
+}
+
+/**
+ * Job progress for a progress event (capped at 95 until the result is saved)
+ */
+function jobProgressFromEvent(event) {
+  if (event.percentage === null || event.percentage === undefined) return null;
+  return Math.min(95, Math.floor(event.percentage));
+}
+
+module.exports = {
+  createProgressParser,
+  parseFinalResult,
+  jobProgressFromEvent
+};
@@ -2,6 +2,7 @@
 const { spawn } = require("child_process");
 const path = require("path");
 const fs = require("fs");
+const { createProgressParser, parseFinalResult } = require("./progressEvents");
 
 // ✅ Use virtual environment Python
 const VENV_PYTHON = path.resolve(__dirname, "../../../../ai-module/venv/Scripts/python.exe");
@@ -49,8 +50,14 @@ module.exports = function runLineCounter(videoPath, outputPath, options = {}) {
     let stdout = "";
     let stderr = "";
 
+    // NDJSON progress events precede the final result line
+    const onStdout = createProgressParser((event) => {
+      if (typeof options.onProgress === "function") options.onProgress(event);
+    });
+
     py.stdout.on("data", d => {
       stdout += d.toString();
+      onStdout(d);
     });
 
     py.stderr.on("data", d => {
@@ -69,13 +76,10 @@ module.exports = function runLineCounter(videoPath, outputPath, options = {}) {
       }
 
       try {
-        // Parse JSON from last line of stdout
-        const lines = stdout.trim().split('\n').filter(l => l.trim());
-        const jsonLine = lines[lines.length - 1];
-        
-        console.log("📊 Raw output (last line):", jsonLine);
-        
-        const result = JSON.parse(jsonLine);
+        // Final result: last JSON line without an "event" key
+        const result = parseFinalResult(stdout);
+        console.log("📊 Raw output (result):", JSON.stringify(result));
+
         console.log("✅ Line counter completed successfully");
         console.log("   Total counted:", result.total_counted);
         console.log("   Processing time:", result.processing_time?.toFixed(2) + "s");